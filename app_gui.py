@@ -2,22 +2,37 @@
 Google Sheets Test App - Giao diện GUI với Tkinter
 """
 
+import os
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
-import threading
-from google_sheets_service import GoogleSheetsService
+from sheets_manager import SheetsManager
+from sheets_range import index_to_column, parse_range
+from gui_grid_view import GridView
+from gui_log_sink import LogSink
+from gui_task_scheduler import TaskScheduler
 from datetime import datetime
 
 
 class GoogleSheetsApp:
+    # Số dòng mỗi lần đọc và mỗi lần nạp vào bảng
+    READ_CHUNK_ROWS = 2000
+
     def __init__(self, root):
         self.root = root
         self.root.title("Google Sheets API Test Application")
         self.root.geometry("900x700")
         self.root.resizable(True, True)
         
-        self.service = GoogleSheetsService()
+        # Manager giữ credentials và kết nối HTTP (mỗi thread một kết nối);
+        # mỗi spreadsheet là một handle nhẹ lấy từ manager
+        self.manager = SheetsManager()
+        self.service = self.manager.open(os.getenv('SPREADSHEET_ID'))
         self.is_authenticated = False
+        self._read_generation = 0
+
+        # Thread pool dùng chung cho mọi thao tác, kết quả trả về main loop
+        self.scheduler = TaskScheduler(self.root)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
         self.setup_ui()
         
@@ -260,14 +275,30 @@ class GoogleSheetsApp:
         output_frame = tk.LabelFrame(main_frame, text="Kết quả", font=("Arial", 10, "bold"), padx=10, pady=10)
         output_frame.pack(fill=tk.BOTH, expand=True)
         
+        # Tab Log và tab Dữ liệu (bảng kết quả đọc)
+        self.output_tabs = ttk.Notebook(output_frame)
+        self.output_tabs.pack(fill=tk.BOTH, expand=True)
+
+        log_tab = tk.Frame(self.output_tabs)
+        self.output_tabs.add(log_tab, text="Log")
+
+        self.grid_tab = tk.Frame(self.output_tabs)
+        self.output_tabs.add(self.grid_tab, text="Dữ liệu")
+
+        self.grid_view = GridView(self.grid_tab)
+        self.grid_view.pack(fill=tk.BOTH, expand=True)
+
         self.output_text = scrolledtext.ScrolledText(
-            output_frame,
+            log_tab,
             font=("Consolas", 9),
             wrap=tk.WORD,
             bg="#f5f5f5",
             fg="#333333"
         )
         self.output_text.pack(fill=tk.BOTH, expand=True)
+
+        # Log được gom theo lô và đẩy lên widget theo chu kỳ
+        self.log_sink = LogSink(self.root, self.output_text)
         
         # Clear output button
         clear_output_btn = tk.Button(
@@ -279,10 +310,22 @@ class GoogleSheetsApp:
             font=("Arial", 8),
             cursor="hand2"
         )
-        clear_output_btn.pack(pady=5)
+        clear_output_btn.pack(side=tk.LEFT, pady=5)
+
+        # Hủy các tác vụ đang xếp hàng (khi bấm nhiều lần liên tiếp)
+        cancel_tasks_btn = tk.Button(
+            output_frame,
+            text="⏹️ Hủy tác vụ chờ",
+            command=self.cancel_pending_tasks,
+            bg="#607d8b",
+            fg="white",
+            font=("Arial", 8),
+            cursor="hand2"
+        )
+        cancel_tasks_btn.pack(side=tk.LEFT, padx=5, pady=5)
         
     def log(self, message, level="INFO"):
-        """Ghi log vào output text"""
+        """Ghi log vào output text (gọi được từ bất kỳ thread nào)"""
         timestamp = datetime.now().strftime("%H:%M:%S")
         
         if level == "ERROR":
@@ -295,13 +338,11 @@ class GoogleSheetsApp:
             prefix = "📝"
         
         log_message = f"[{timestamp}] {prefix} {message}\n"
-        self.output_text.insert(tk.END, log_message)
-        self.output_text.see(tk.END)
-        self.root.update()
+        self.log_sink.write(log_message)
         
     def clear_output(self):
         """Xóa nội dung output"""
-        self.output_text.delete(1.0, tk.END)
+        self.log_sink.clear()
 
     def extract_spreadsheet_id(self, url_or_id):
         """
@@ -337,8 +378,8 @@ class GoogleSheetsApp:
             # Trích xuất ID
             spreadsheet_id = self.extract_spreadsheet_id(url_or_id)
 
-            # Cập nhật service
-            self.service.spreadsheet_id = spreadsheet_id
+            # Đổi sang handle của spreadsheet mới (dùng lại credentials và kết nối)
+            self.service = self.manager.open(spreadsheet_id)
 
             # Cập nhật lại entry với ID đã trích xuất
             self.sheet_url_entry.delete(0, tk.END)
@@ -346,23 +387,6 @@ class GoogleSheetsApp:
 
             self.log(f"Đã cập nhật Spreadsheet ID: {spreadsheet_id}", "SUCCESS")
 
-            # Nếu đã xác thực, reset trạng thái để xác thực lại với sheet mới
-            if self.is_authenticated:
-                self.log("Vui lòng xác thực lại để kết nối với sheet mới", "INFO")
-                self.is_authenticated = False
-                self.status_label.config(text="⚪ Chưa kết nối", fg="gray")
-                self.auth_button.config(text="🔐 Xác thực & Kết nối", bg="#34a853", state=tk.NORMAL)
-
-                # Disable các nút khác
-                self.info_button.config(state=tk.DISABLED)
-                self.read_button.config(state=tk.DISABLED)
-                self.write_button.config(state=tk.DISABLED)
-                self.append_button.config(state=tk.DISABLED)
-                self.update_button.config(state=tk.DISABLED)
-                self.batch_button.config(state=tk.DISABLED)
-                self.clear_button.config(state=tk.DISABLED)
-                self.get_sheets_button.config(state=tk.DISABLED)
-
         except Exception as e:
             self.log(f"Lỗi khi cập nhật Spreadsheet ID: {str(e)}", "ERROR")
             messagebox.showerror("Lỗi", f"Không thể cập nhật Spreadsheet ID:\n{str(e)}")
@@ -404,66 +428,61 @@ https://docs.google.com/spreadsheets/d/1ABC123xyz456/edit
         
     def authenticate(self):
         """Xác thực với Google Sheets API"""
-        def auth_thread():
-            try:
-                self.log("Đang xác thực với Google Sheets API...")
-                self.auth_button.config(state=tk.DISABLED, text="Đang xác thực...")
-                
-                self.service.authenticate()
-                
-                self.is_authenticated = True
-                self.status_label.config(text="🟢 Đã kết nối", fg="green")
-                self.log("Xác thực thành công!", "SUCCESS")
-                self.auth_button.config(text="✅ Đã kết nối", bg="#34a853")
-                
-                self.enable_buttons()
-                
-            except Exception as e:
-                self.log(f"Lỗi xác thực: {str(e)}", "ERROR")
-                self.auth_button.config(state=tk.NORMAL, text="🔐 Xác thực & Kết nối")
-                self.status_label.config(text="🔴 Lỗi kết nối", fg="red")
-        
-        threading.Thread(target=auth_thread, daemon=True).start()
+        self.log("Đang xác thực với Google Sheets API...")
+        self.auth_button.config(state=tk.DISABLED, text="Đang xác thực...")
+
+        def on_success(_):
+            self.is_authenticated = True
+            self.status_label.config(text="🟢 Đã kết nối", fg="green")
+            self.log("Xác thực thành công!", "SUCCESS")
+            self.auth_button.config(text="✅ Đã kết nối", bg="#34a853")
+
+            self.enable_buttons()
+
+        def on_error(e):
+            self.log(f"Lỗi xác thực: {str(e)}", "ERROR")
+            self.auth_button.config(state=tk.NORMAL, text="🔐 Xác thực & Kết nối")
+            self.status_label.config(text="🔴 Lỗi kết nối", fg="red")
+
+        self.scheduler.submit(self.service.authenticate, key='authenticate',
+                              on_success=on_success, on_error=on_error)
+
+    def log_error(self, e):
+        """Callback lỗi chung cho các tác vụ nền"""
+        self.log(f"Lỗi: {str(e)}", "ERROR")
 
     def get_info(self):
         """Lấy thông tin spreadsheet"""
-        def info_thread():
-            try:
-                self.log("Đang lấy thông tin spreadsheet...")
-                info = self.service.get_spreadsheet_info()
-
-                self.log(f"Tên: {info['title']}", "SUCCESS")
-                self.log(f"Sheets: {', '.join(info['sheets'])}", "INFO")
-                self.log(f"URL: {info['url']}", "INFO")
+        self.log("Đang lấy thông tin spreadsheet...")
 
-            except Exception as e:
-                self.log(f"Lỗi: {str(e)}", "ERROR")
+        def on_success(info):
+            self.log(f"Tên: {info['title']}", "SUCCESS")
+            self.log(f"Sheets: {', '.join(info['sheets'])}", "INFO")
+            self.log(f"URL: {info['url']}", "INFO")
 
-        threading.Thread(target=info_thread, daemon=True).start()
+        self.scheduler.submit(self.service.get_spreadsheet_info, key='info',
+                              on_success=on_success, on_error=self.log_error)
 
     def list_sheets(self):
         """Lấy danh sách các sheets và cho phép chọn"""
-        def list_thread():
-            try:
-                self.log("Đang lấy danh sách sheets...")
-                info = self.service.get_spreadsheet_info()
-                sheets = info['sheets']
+        self.log("Đang lấy danh sách sheets...")
 
-                if not sheets:
-                    self.log("Không tìm thấy sheet nào", "INFO")
-                    return
+        def on_success(info):
+            sheets = info['sheets']
 
-                self.log(f"Tìm thấy {len(sheets)} sheet(s):", "SUCCESS")
-                for i, sheet in enumerate(sheets, 1):
-                    self.log(f"  {i}. {sheet}")
+            if not sheets:
+                self.log("Không tìm thấy sheet nào", "INFO")
+                return
 
-                # Tạo dialog để chọn sheet
-                self.root.after(0, lambda: self.show_sheet_selector(sheets))
+            self.log(f"Tìm thấy {len(sheets)} sheet(s):", "SUCCESS")
+            for i, sheet in enumerate(sheets, 1):
+                self.log(f"  {i}. {sheet}")
 
-            except Exception as e:
-                self.log(f"Lỗi: {str(e)}", "ERROR")
+            # Tạo dialog để chọn sheet
+            self.show_sheet_selector(sheets)
 
-        threading.Thread(target=list_thread, daemon=True).start()
+        self.scheduler.submit(self.service.get_spreadsheet_info, key='list_sheets',
+                              on_success=on_success, on_error=self.log_error)
 
     def show_sheet_selector(self, sheets):
         """Hiển thị dialog chọn sheet"""
@@ -531,143 +550,171 @@ https://docs.google.com/spreadsheets/d/1ABC123xyz456/edit
             return sheet_name
 
     def read_data(self):
-        """Đọc dữ liệu từ sheet"""
-        def read_thread():
-            try:
-                range_name = self.get_full_range()
-                self.log(f"Đang đọc dữ liệu từ {range_name}...")
-
-                data = self.service.read_data(range_name)
-
-                if not data:
-                    self.log("Không có dữ liệu trong phạm vi này", "INFO")
-                    return
-
-                self.log(f"Đọc được {len(data)} dòng:", "SUCCESS")
-                self.log("─" * 80)
-
-                for i, row in enumerate(data, 1):
-                    self.log(f"Dòng {i}: {' | '.join(str(cell) for cell in row)}")
-
-                self.log("─" * 80)
-
-            except Exception as e:
-                self.log(f"Lỗi: {str(e)}", "ERROR")
+        """Đọc dữ liệu từ sheet và hiển thị dần trong tab Dữ liệu"""
+        range_name = self.get_full_range()
+        self.log(f"Đang đọc dữ liệu từ {range_name}...")
+
+        rng = parse_range(range_name)
+        self._read_generation += 1
+        generation = self._read_generation
+        self.grid_view.reset(start_row=rng.start_row if rng else 1,
+                             start_col=rng.start_col if rng else 1)
+        self.output_tabs.select(self.grid_tab)
+
+        def show_chunk(chunk):
+            # Bỏ qua phần kết quả của lần đọc cũ
+            if generation == self._read_generation:
+                self.grid_view.append_rows(chunk)
+
+        def stream():
+            # Nút đọc luôn lấy dữ liệu mới nhất (có thể đã sửa trên trình duyệt)
+            if rng is None or rng.sheet is None:
+                rows = self.service.read_data(range_name, use_cache=False)
+                self.scheduler.call_in_main(show_chunk, rows)
+                return len(rows)
+
+            rows = self.service.iter_rows(
+                rng.sheet,
+                chunk_rows=self.READ_CHUNK_ROWS,
+                first_col=index_to_column(rng.start_col),
+                # Chỉ có tên sheet: iter_rows đọc đến cột cuối của lưới
+                last_col=index_to_column(rng.end_col) if rng.end_col else None,
+                start_row=rng.start_row,
+                end_row=rng.end_row
+            )
+            total, chunk = 0, []
+            for row in rows:
+                if generation != self._read_generation:
+                    break
+                chunk.append(row)
+                if len(chunk) >= self.READ_CHUNK_ROWS:
+                    self.scheduler.call_in_main(show_chunk, chunk)
+                    total, chunk = total + len(chunk), []
+            if chunk:
+                self.scheduler.call_in_main(show_chunk, chunk)
+            return total + len(chunk)
+
+        def on_success(total):
+            if not total:
+                self.log("Không có dữ liệu trong phạm vi này", "INFO")
+                return
+            self.log(f"Đọc được {total} dòng (xem tab Dữ liệu)", "SUCCESS")
 
-        threading.Thread(target=read_thread, daemon=True).start()
+        # Không gộp theo key: lần đọc mới thay thế lần đọc cũ đang chạy
+        self.scheduler.submit(stream, on_success=on_success, on_error=self.log_error)
 
     def write_sample_data(self):
         """Ghi dữ liệu mẫu vào sheet"""
-        def write_thread():
-            try:
-                self.log("Đang ghi dữ liệu mẫu...")
-
-                sheet_name = self.sheet_name_entry.get().strip() or "Sheet1"
+        self.log("Đang ghi dữ liệu mẫu...")
 
-                # Headers
-                headers = [['ID', 'Họ tên', 'Email', 'Tuổi', 'Thành phố']]
-                cells_updated = self.service.write_data(f'{sheet_name}!A1:E1', headers)
-                self.log(f"Đã ghi header ({cells_updated} cells)", "SUCCESS")
+        sheet_name = self.sheet_name_entry.get().strip() or "Sheet1"
 
-                # Sample data
-                sample_data = [
-                    ['1', 'Nguyễn Văn A', 'nguyenvana@email.com', '25', 'Hà Nội'],
-                    ['2', 'Trần Thị B', 'tranthib@email.com', '30', 'TP.HCM'],
-                    ['3', 'Lê Văn C', 'levanc@email.com', '28', 'Đà Nẵng'],
-                    ['4', 'Phạm Thị D', 'phamthid@email.com', '22', 'Cần Thơ'],
-                ]
+        # Headers
+        headers = [['ID', 'Họ tên', 'Email', 'Tuổi', 'Thành phố']]
 
-                cells_updated = self.service.write_data(f'{sheet_name}!A2:E5', sample_data)
-                self.log(f"Đã ghi {len(sample_data)} dòng dữ liệu ({cells_updated} cells)", "SUCCESS")
+        # Sample data
+        sample_data = [
+            ['1', 'Nguyễn Văn A', 'nguyenvana@email.com', '25', 'Hà Nội'],
+            ['2', 'Trần Thị B', 'tranthib@email.com', '30', 'TP.HCM'],
+            ['3', 'Lê Văn C', 'levanc@email.com', '28', 'Đà Nẵng'],
+            ['4', 'Phạm Thị D', 'phamthid@email.com', '22', 'Cần Thơ'],
+        ]
 
-                self.log("✅ Hoàn thành ghi dữ liệu mẫu!", "SUCCESS")
+        def write():
+            header_cells = self.service.write_data(f'{sheet_name}!A1:E1', headers)
+            data_cells = self.service.write_data(f'{sheet_name}!A2:E5', sample_data)
+            return header_cells, data_cells
 
-            except Exception as e:
-                self.log(f"Lỗi: {str(e)}", "ERROR")
+        def on_success(result):
+            header_cells, data_cells = result
+            self.log(f"Đã ghi header ({header_cells} cells)", "SUCCESS")
+            self.log(f"Đã ghi {len(sample_data)} dòng dữ liệu ({data_cells} cells)", "SUCCESS")
+            self.log("✅ Hoàn thành ghi dữ liệu mẫu!", "SUCCESS")
 
-        threading.Thread(target=write_thread, daemon=True).start()
+        self.scheduler.submit(write, key=('write_sample', sheet_name),
+                              on_success=on_success, on_error=self.log_error)
 
     def append_data(self):
         """Thêm dữ liệu mới vào cuối sheet"""
-        def append_thread():
-            try:
-                self.log("Đang thêm dữ liệu mới...")
+        self.log("Đang thêm dữ liệu mới...")
 
-                sheet_name = self.sheet_name_entry.get().strip() or "Sheet1"
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                new_data = [
-                    ['5', f'Người dùng mới {timestamp}', 'newuser@email.com', '27', 'Hải Phòng'],
-                    ['6', f'Test User {timestamp}', 'testuser@email.com', '24', 'Huế'],
-                ]
+        sheet_name = self.sheet_name_entry.get().strip() or "Sheet1"
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        new_data = [
+            ['5', f'Người dùng mới {timestamp}', 'newuser@email.com', '27', 'Hải Phòng'],
+            ['6', f'Test User {timestamp}', 'testuser@email.com', '24', 'Huế'],
+        ]
 
-                # Sử dụng format đơn giản cho append
-                rows_added = self.service.append_data(f'{sheet_name}!A1', new_data)
-                self.log(f"Đã thêm {rows_added} dòng mới", "SUCCESS")
+        def on_success(rows_added):
+            self.log(f"Đã thêm {rows_added} dòng mới", "SUCCESS")
 
-            except Exception as e:
-                self.log(f"Lỗi: {str(e)}", "ERROR")
-
-        threading.Thread(target=append_thread, daemon=True).start()
+        # Sử dụng format đơn giản cho append; không gộp vì mỗi lần bấm là một lần thêm
+        self.scheduler.submit(self.service.append_data, f'{sheet_name}!A1', new_data,
+                              on_success=on_success, on_error=self.log_error)
 
     def update_cell(self):
         """Cập nhật một cell cụ thể"""
-        def update_thread():
-            try:
-                self.log("Đang cập nhật cell...")
+        self.log("Đang cập nhật cell...")
 
-                sheet_name = self.sheet_name_entry.get().strip() or "Sheet1"
-                # Update tuổi của người đầu tiên
-                cells_updated = self.service.write_data(f'{sheet_name}!D2', [['26']])
-                self.log(f"Đã cập nhật cell D2 thành '26' ({cells_updated} cells)", "SUCCESS")
+        sheet_name = self.sheet_name_entry.get().strip() or "Sheet1"
 
-            except Exception as e:
-                self.log(f"Lỗi: {str(e)}", "ERROR")
+        def on_success(cells_updated):
+            self.log(f"Đã cập nhật cell D2 thành '26' ({cells_updated} cells)", "SUCCESS")
 
-        threading.Thread(target=update_thread, daemon=True).start()
+        # Update tuổi của người đầu tiên
+        self.scheduler.submit(self.service.write_data, f'{sheet_name}!D2', [['26']],
+                              key=('update_cell', sheet_name),
+                              on_success=on_success, on_error=self.log_error)
 
     def batch_update(self):
         """Cập nhật nhiều vị trí cùng lúc"""
-        def batch_thread():
-            try:
-                self.log("Đang thực hiện batch update...")
-
-                sheet_name = self.sheet_name_entry.get().strip() or "Sheet1"
-                batch_data = [
-                    {'range': f'{sheet_name}!E2', 'values': [['Hà Nội (Updated)']]},
-                    {'range': f'{sheet_name}!E3', 'values': [['TP.HCM (Updated)']]},
-                    {'range': f'{sheet_name}!E4', 'values': [['Đà Nẵng (Updated)']]},
-                ]
+        self.log("Đang thực hiện batch update...")
 
-                cells_updated = self.service.batch_update(batch_data)
-                self.log(f"Đã cập nhật {cells_updated} cells", "SUCCESS")
+        sheet_name = self.sheet_name_entry.get().strip() or "Sheet1"
+        batch_data = [
+            {'range': f'{sheet_name}!E2', 'values': [['Hà Nội (Updated)']]},
+            {'range': f'{sheet_name}!E3', 'values': [['TP.HCM (Updated)']]},
+            {'range': f'{sheet_name}!E4', 'values': [['Đà Nẵng (Updated)']]},
+        ]
 
-            except Exception as e:
-                self.log(f"Lỗi: {str(e)}", "ERROR")
+        def on_success(cells_updated):
+            self.log(f"Đã cập nhật {cells_updated} cells", "SUCCESS")
 
-        threading.Thread(target=batch_thread, daemon=True).start()
+        self.scheduler.submit(self.service.batch_update, batch_data,
+                              key=('batch_update', sheet_name),
+                              on_success=on_success, on_error=self.log_error)
 
     def clear_data(self):
         """Xóa dữ liệu"""
-        def clear_thread():
-            try:
-                result = messagebox.askyesno(
-                    "Xác nhận",
-                    "Bạn có chắc muốn xóa dữ liệu trong phạm vi này?"
-                )
+        # Hộp thoại phải chạy trên main thread
+        result = messagebox.askyesno(
+            "Xác nhận",
+            "Bạn có chắc muốn xóa dữ liệu trong phạm vi này?"
+        )
+
+        if not result:
+            return
 
-                if not result:
-                    return
+        range_name = self.get_full_range()
+        self.log(f"Đang xóa dữ liệu từ {range_name}...")
 
-                range_name = self.get_full_range()
-                self.log(f"Đang xóa dữ liệu từ {range_name}...")
+        def on_success(_):
+            self.log(f"Đã xóa dữ liệu từ {range_name}", "SUCCESS")
 
-                self.service.clear_data(range_name)
-                self.log(f"Đã xóa dữ liệu từ {range_name}", "SUCCESS")
+        self.scheduler.submit(self.service.clear_data, range_name, key=('clear', range_name),
+                              on_success=on_success, on_error=self.log_error)
 
-            except Exception as e:
-                self.log(f"Lỗi: {str(e)}", "ERROR")
+    def cancel_pending_tasks(self):
+        """Hủy các tác vụ đang xếp hàng chờ chạy"""
+        cancelled = self.scheduler.cancel_pending()
+        self.log(f"Đã hủy {cancelled} tác vụ đang chờ", "INFO")
 
-        threading.Thread(target=clear_thread, daemon=True).start()
+    def on_close(self):
+        """Dừng thread pool, log và đóng kết nối rồi đóng cửa sổ"""
+        self.scheduler.shutdown()
+        self.log_sink.close()
+        self.manager.close()
+        self.root.destroy()
 
 
 def main():
@@ -0,0 +1,303 @@
+"""
+Async Google Sheets Service - Thao tác với Google Sheets API bằng asyncio
+"""
+
+import asyncio
+import json
+import os
+import time
+from urllib.parse import quote
+
+import aiohttp
+from google.auth.transport.requests import Request
+from dotenv import load_dotenv
+
+from google_sheets_service import SheetsApiError, limiter_from_env, load_credentials
+from sheets_metadata import METADATA_FIELDS
+from sheets_metrics import CallStats, count_cells
+from sheets_quota import QuotaStats, RetryPolicy, parse_retry_after
+
+# Load environment variables
+load_dotenv()
+
+DEFAULT_API_ENDPOINT = 'https://sheets.googleapis.com'
+
+# Thời gian tối đa (giây) cho một request, bằng mặc định của googleapiclient ở bản đồng bộ
+DEFAULT_TIMEOUT = 60.0
+
+
+class AsyncGoogleSheetsService:
+    """
+    Phiên bản asyncio của GoogleSheetsService
+
+    Dùng chung một aiohttp.ClientSession (pool kết nối keep-alive) cho mọi
+    request và một semaphore giới hạn số request đang chạy cùng lúc, nên có
+    thể chạy hàng trăm thao tác đồng thời mà không cần thread cho mỗi request.
+
+    Ví dụ:
+        async with AsyncGoogleSheetsService(max_concurrency=50) as sheets:
+            await sheets.authenticate()
+            results = await asyncio.gather(*(sheets.read_data(r) for r in ranges))
+    """
+
+    def __init__(self, spreadsheet_id=None, creds=None, max_concurrency=20, api_endpoint=None,
+                 timeout=None):
+        """
+        Args:
+            spreadsheet_id: ID của spreadsheet (mặc định lấy từ SPREADSHEET_ID)
+            creds: Credentials có sẵn; None thì gọi authenticate() để lấy
+            max_concurrency: Số request tối đa đang chạy cùng lúc
+            api_endpoint: Địa chỉ API (mặc định lấy từ SHEETS_API_ENDPOINT hoặc
+                Google), dùng để trỏ tới server giả lập khi test
+            timeout: Thời gian tối đa (giây) cho mỗi request (mặc định REQUEST_TIMEOUT
+                hoặc 60); quá hạn được xử lý như lỗi kết nối
+        """
+        self.spreadsheet_id = spreadsheet_id or os.getenv('SPREADSHEET_ID')
+        self.credentials_file = os.getenv('CREDENTIALS_FILE', 'credentials.json')
+        self.api_endpoint = (api_endpoint or os.getenv('SHEETS_API_ENDPOINT')
+                             or DEFAULT_API_ENDPOINT).rstrip('/')
+        self.creds = creds
+        self.max_concurrency = max_concurrency
+        self.timeout = aiohttp.ClientTimeout(
+            total=timeout or float(os.getenv('REQUEST_TIMEOUT', DEFAULT_TIMEOUT))
+        )
+
+        self.limiter = limiter_from_env()
+        self.retry_policy = RetryPolicy()
+        self.quota_stats = QuotaStats()
+        # SheetsMetrics (tùy chọn), có thể dùng chung với GoogleSheetsService
+        self.metrics = None
+
+        self._session = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._refresh_lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def open(self):
+        """Tạo session HTTP dùng chung (được gọi tự động ở request đầu tiên)"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+
+    async def close(self):
+        """Đóng session và các kết nối trong pool"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def authenticate(self):
+        """
+        Xác thực với Google Sheets API
+
+        Việc đọc token/đăng nhập chạy trong executor để không chặn event loop.
+        """
+        loop = asyncio.get_running_loop()
+        self.creds = await loop.run_in_executor(None, load_credentials, self.credentials_file)
+        return True
+
+    async def _auth_headers(self):
+        if self.creds is None:
+            return {}
+        if not self.creds.valid:
+            async with self._refresh_lock:
+                # Chỉ một coroutine refresh, các coroutine khác chờ rồi dùng token mới
+                if not self.creds.valid:
+                    loop = asyncio.get_running_loop()
+                    await loop.run_in_executor(None, self.creds.refresh, Request())
+        return {'Authorization': f'Bearer {self.creds.token}'}
+
+    def _url(self, path):
+        return f"{self.api_endpoint}/v4/spreadsheets/{self.spreadsheet_id}{path}"
+
+    async def _request(self, method, path, error_message, params=None, body=None,
+                       idempotent=True):
+        """
+        Gửi một request qua bộ giới hạn tốc độ, thử lại như GoogleSheetsService._execute
+
+        idempotent=False (values:append) chỉ được thử lại khi bị 429; lỗi 5xx,
+        mất kết nối hay timeout được ném ra ngay vì request có thể đã được thực hiện.
+        """
+        if self.metrics is None:
+            return await self._request_with_retry(method, path, error_message, params, body,
+                                                  idempotent=idempotent)
+
+        call = CallStats()
+        started_ns = time.time_ns()
+        started = time.perf_counter()
+        status, result = 'ok', None
+        try:
+            result = await self._request_with_retry(method, path, error_message, params, body, call,
+                                                    idempotent)
+            return result
+        except SheetsApiError as error:
+            status = str(error.status or 'error')
+            raise
+        except Exception:
+            status = 'error'
+            raise
+        finally:
+            cells_read, cells_written = count_cells(result)
+            request_bytes = len(self._url(path)) + (len(json.dumps(body)) if body is not None else 0)
+            self.metrics.record(f'{method} {path.split(":")[0] or "/"}', self.spreadsheet_id,
+                                time.perf_counter() - started, status=status,
+                                request_bytes=request_bytes, response_bytes=call.response_bytes,
+                                cells_read=cells_read, cells_written=cells_written,
+                                retries=call.retries, quota_errors=call.quota_errors,
+                                started_ns=started_ns)
+
+    async def _request_with_retry(self, method, path, error_message, params=None, body=None,
+                                  call=None, idempotent=True):
+        session = await self.open()
+        kind = 'read' if method == 'GET' else 'write'
+        attempt = 0
+        while True:
+            wait = self.limiter.reserve(kind)
+            if wait > 0:
+                self.quota_stats.increment('throttled')
+                self.quota_stats.increment('throttled_seconds', wait)
+                await asyncio.sleep(wait)
+
+            headers = await self._auth_headers()
+            self.quota_stats.increment('requests')
+            try:
+                async with self._semaphore:
+                    async with session.request(method, self._url(path), params=params,
+                                               json=body, headers=headers) as response:
+                        if response.status < 400:
+                            if call is not None:
+                                content = await response.read()
+                                call.response_bytes += len(content)
+                                return json.loads(content)
+                            return await response.json()
+                        details = await response.text()
+                        status = response.status
+                        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                if not self.retry_policy.should_retry_network_error(attempt, idempotent):
+                    self.quota_stats.increment('failed')
+                    raise SheetsApiError(f"{error_message}: {error!r}") from error
+                status, retry_after = None, None
+
+            if status == 429:
+                self.quota_stats.increment('rate_limited')
+                if call is not None:
+                    call.quota_errors += 1
+            if status is not None and not self.retry_policy.should_retry(status, attempt, idempotent):
+                self.quota_stats.increment('failed')
+                raise SheetsApiError(
+                    f"{error_message}: HTTP {status} {details}",
+                    status=status, retry_after=retry_after
+                )
+            self.quota_stats.increment('retried')
+            if call is not None:
+                call.retries += 1
+            await asyncio.sleep(self.retry_policy.delay(attempt, retry_after))
+            attempt += 1
+
+    def get_quota_stats(self):
+        """Lấy các bộ đếm giới hạn tốc độ/thử lại (giống GoogleSheetsService)"""
+        return self.quota_stats.as_dict()
+
+    @staticmethod
+    def _range_path(range_name):
+        return '/values/' + quote(range_name, safe='')
+
+    async def get_spreadsheet_info(self):
+        """Lấy thông tin về spreadsheet"""
+        sheet_metadata = await self._request(
+            'GET', '', "Lỗi khi lấy thông tin spreadsheet",
+            params={'fields': METADATA_FIELDS}
+        )
+
+        title = sheet_metadata.get('properties', {}).get('title', 'Unknown')
+        sheets = sheet_metadata.get('sheets', [])
+        sheet_names = [sheet.get('properties', {}).get('title', '') for sheet in sheets]
+
+        return {
+            'title': title,
+            'sheets': sheet_names,
+            'url': f"https://docs.google.com/spreadsheets/d/{self.spreadsheet_id}"
+        }
+
+    async def read_data(self, range_name):
+        """
+        Đọc dữ liệu từ sheet
+
+        Args:
+            range_name: Phạm vi đọc (ví dụ: 'Sheet1!A1:D10' hoặc 'Sheet1')
+
+        Returns:
+            List of lists chứa dữ liệu
+        """
+        result = await self._request(
+            'GET', self._range_path(range_name), "Lỗi khi đọc dữ liệu"
+        )
+        return result.get('values', [])
+
+    async def write_data(self, range_name, values):
+        """
+        Ghi dữ liệu vào sheet (ghi đè dữ liệu cũ)
+
+        Returns:
+            Số lượng cells đã cập nhật
+        """
+        result = await self._request(
+            'PUT', self._range_path(range_name), "Lỗi khi ghi dữ liệu",
+            params={'valueInputOption': 'USER_ENTERED'},
+            body={'values': values}
+        )
+        return result.get('updatedCells', 0)
+
+    async def append_data(self, range_name, values):
+        """
+        Thêm dữ liệu vào cuối sheet
+
+        Returns:
+            Số lượng rows đã thêm
+        """
+        result = await self._request(
+            'POST', self._range_path(range_name) + ':append', "Lỗi khi thêm dữ liệu",
+            params={'valueInputOption': 'USER_ENTERED', 'insertDataOption': 'INSERT_ROWS'},
+            body={'values': values},
+            idempotent=False
+        )
+        return result.get('updates', {}).get('updatedRows', 0)
+
+    async def clear_data(self, range_name):
+        """
+        Xóa dữ liệu trong một phạm vi
+
+        Returns:
+            True nếu thành công
+        """
+        await self._request(
+            'POST', self._range_path(range_name) + ':clear', "Lỗi khi xóa dữ liệu",
+            body={}
+        )
+        return True
+
+    async def batch_update(self, data_list):
+        """
+        Cập nhật nhiều phạm vi cùng lúc
+
+        Args:
+            data_list: List of dicts với format {'range': 'Sheet1!A1', 'values': [[...]]}
+
+        Returns:
+            Tổng số cells đã cập nhật
+        """
+        body = {
+            'valueInputOption': 'USER_ENTERED',
+            'data': [{'range': item['range'], 'values': item['values']} for item in data_list]
+        }
+        result = await self._request(
+            'POST', '/values:batchUpdate', "Lỗi khi batch update", body=body
+        )
+        return result.get('totalUpdatedCells', 0)
@@ -0,0 +1,264 @@
+"""
+Benchmark theo kịch bản - Chạy GoogleSheetsService trọn vẹn trên server Sheets giả lập
+
+Các kịch bản: đọc khối lớn (read_data, iter_rows, batch_read), ghi từng ô so với
+ghi gom lô (batch_update, bộ đệm ghi) và thêm nhiều dòng (append_data). Mỗi kịch
+bản in thông lượng, độ trễ p50/p99 của từng thao tác và bộ nhớ đỉnh (tracemalloc).
+
+Chạy:
+    python benchmarks/bench_scenarios.py
+    python benchmarks/bench_scenarios.py --latency 0.02 --reject-rate 0.05 --json result.json
+    python benchmarks/bench_scenarios.py --scenario write_per_cell --scenario write_batched
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+SPREADSHEET_ID = 'bench'
+
+
+def _percentile(samples, percent):
+    """Phân vị theo thứ hạng gần nhất"""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def _timed(samples, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    samples.append(time.perf_counter() - start)
+    return result
+
+
+# ---- Kịch bản: mỗi hàm trả về (thời gian từng thao tác, số ô đã đọc/ghi) ----
+
+def read_full(service, args):
+    """read_data cả sheet Read trong một request"""
+    range_name = f'Read!A1:{_last_col(args)}{args.rows}'
+    samples, cells = [], 0
+    for _ in range(args.repeat):
+        values = _timed(samples, service.read_data, range_name, False)
+        cells += sum(len(row) for row in values)
+    return samples, cells
+
+
+def iter_rows(service, args):
+    """iter_rows qua cả sheet Read, mỗi lần là một lượt đọc hết sheet"""
+    samples, cells = [], 0
+
+    def scan():
+        return sum(len(row) for row in service.iter_rows('Read', chunk_rows=args.chunk_rows,
+                                                          last_col=_last_col(args)))
+
+    for _ in range(args.repeat):
+        cells += _timed(samples, scan)
+    return samples, cells
+
+
+def batch_read(service, args):
+    """batch_read 50 khối 100 dòng rải đều trên sheet Read"""
+    step = max(args.rows // 50, 100)
+    ranges = [f'Read!A{row}:{_last_col(args)}{min(row + 99, args.rows)}'
+              for row in range(1, args.rows + 1, step)]
+    samples, cells = [], 0
+    for _ in range(args.repeat):
+        results = _timed(samples, service.batch_read, ranges)
+        cells += sum(len(row) for values in results.values() for row in values)
+    return samples, cells
+
+
+def _cell_writes(args):
+    cols = min(args.cols, 10)
+    return [(f'Cells!{chr(ord("A") + i % cols)}{i // cols + 1}', [[i]]) for i in range(args.cells)]
+
+
+def write_per_cell(service, args):
+    """Mỗi ô một write_data (một request mỗi ô)"""
+    samples = []
+    for range_name, values in _cell_writes(args):
+        _timed(samples, service.write_data, range_name, values)
+    return samples, args.cells
+
+
+def write_batched(service, args):
+    """Cùng số ô như write_per_cell, gửi trong một batch_update"""
+    data = [{'range': range_name, 'values': values} for range_name, values in _cell_writes(args)]
+    samples = []
+    for _ in range(args.repeat):
+        _timed(samples, service.batch_update, data)
+    return samples, args.cells * args.repeat
+
+
+def write_buffered(service, args):
+    """write_data từng ô qua bộ đệm ghi, flush() ở cuối"""
+    writes = _cell_writes(args)
+    service.enable_write_buffer(max_cells=args.cells, max_delay=60.0)
+
+    def run():
+        for range_name, values in writes:
+            service.write_data(range_name, values)
+        service.flush()
+
+    samples = []
+    try:
+        for _ in range(args.repeat):
+            _timed(samples, run)
+    finally:
+        service.disable_write_buffer()
+    return samples, args.cells * args.repeat
+
+
+def append_large(service, args):
+    """Thêm append_rows dòng vào sheet Append, mỗi append_data append_chunk dòng"""
+    from fake_sheets_server import sample_rows
+
+    chunk = sample_rows(args.append_chunk + 1, args.cols)[1:]
+    samples = []
+    for _ in range(max(args.append_rows // args.append_chunk, 1)):
+        _timed(samples, service.append_data, 'Append!A1', chunk)
+    return samples, len(samples) * args.append_chunk * args.cols
+
+
+SCENARIOS = {
+    'read_full': read_full,
+    'iter_rows': iter_rows,
+    'batch_read': batch_read,
+    'write_per_cell': write_per_cell,
+    'write_batched': write_batched,
+    'write_buffered': write_buffered,
+    'append_large': append_large,
+}
+
+
+def _last_col(args):
+    from sheets_range import index_to_column
+    return index_to_column(args.cols)
+
+
+def make_service(url, args):
+    """GoogleSheetsService trỏ tới server giả lập, không cache và không giới hạn tốc độ phía client"""
+    from google.oauth2.credentials import Credentials
+
+    from google_sheets_service import GoogleSheetsService, build_sheets_resource
+    from sheets_quota import QuotaLimiter, RetryPolicy
+
+    creds = Credentials(token='benchmark')
+    service = GoogleSheetsService(SPREADSHEET_ID)
+    service.api_endpoint = url
+    service.creds = creds
+    service.service = build_sheets_resource(creds, url)
+    service.cache = None
+    service.limiter = QuotaLimiter(read_per_minute=10 ** 9, write_per_minute=10 ** 9)
+    service.retry_policy = RetryPolicy(base_delay=args.retry_delay, max_delay=args.retry_delay * 8)
+    return service
+
+
+def run_scenario(name, service, args):
+    """Chạy một kịch bản hai lần: lần đo thời gian và lần đo bộ nhớ (tracemalloc làm chậm code)"""
+    scenario = SCENARIOS[name]
+    requests_before = service.get_quota_stats()['requests']
+    gc.collect()
+    start = time.perf_counter()
+    samples, cells = scenario(service, args)
+    elapsed = time.perf_counter() - start
+    requests = service.get_quota_stats()['requests'] - requests_before
+
+    peak = None
+    if not args.no_memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            scenario(service, args)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return {
+        'scenario': name,
+        'ops': len(samples),
+        'requests': requests,
+        'cells': cells,
+        'seconds': elapsed,
+        'ops_per_second': len(samples) / elapsed if elapsed else 0.0,
+        'cells_per_second': cells / elapsed if elapsed else 0.0,
+        'p50_ms': _percentile(samples, 50) * 1000,
+        'p99_ms': _percentile(samples, 99) * 1000,
+        'peak_mib': None if peak is None else peak / 2 ** 20,
+    }
+
+
+def print_results(results):
+    print(f"{'kịch bản':<16}{'thao tác':>9}{'request':>9}{'ops/s':>10}{'ô/s':>12}"
+          f"{'p50 ms':>10}{'p99 ms':>10}{'đỉnh MiB':>10}")
+    for r in results:
+        peak = '-' if r['peak_mib'] is None else f"{r['peak_mib']:.1f}"
+        print(f"{r['scenario']:<16}{r['ops']:>9}{r['requests']:>9}{r['ops_per_second']:>10.1f}"
+              f"{r['cells_per_second']:>12.0f}{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}{peak:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark GoogleSheetsService trên server giả lập')
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='Kịch bản cần chạy (lặp lại để chọn nhiều; mặc định tất cả)')
+    parser.add_argument('--rows', type=int, default=20000, help='Số dòng dữ liệu của sheet Read')
+    parser.add_argument('--cols', type=int, default=10, help='Số cột dữ liệu')
+    parser.add_argument('--chunk-rows', type=int, default=5000, help='Cửa sổ dòng của iter_rows')
+    parser.add_argument('--cells', type=int, default=200, help='Số ô của các kịch bản ghi')
+    parser.add_argument('--append-rows', type=int, default=50000)
+    parser.add_argument('--append-chunk', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.002, help='Độ trễ mỗi request (giây)')
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--reject-rate', type=float, default=0.0, help='Tỷ lệ trả 429 (0..1)')
+    parser.add_argument('--retry-delay', type=float, default=0.05, help='base_delay khi thử lại')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--in-process', action='store_true',
+                        help='Chạy server trong cùng process (mặc định: process riêng)')
+    parser.add_argument('--no-memory', action='store_true', help='Bỏ lần đo bộ nhớ')
+    parser.add_argument('--json', help='Ghi kết quả ra file JSON')
+    args = parser.parse_args()
+
+    from fake_sheets_server import FakeSheetsServer, start_server_process
+
+    spreadsheets = {SPREADSHEET_ID: {
+        'Read': {'rows': args.rows, 'cols': args.cols, 'fill_rows': args.rows},
+        'Cells': {'rows': max(args.cells, 1000), 'cols': args.cols},
+        'Append': {'rows': 1000, 'cols': args.cols},
+    }}
+    options = {'latency': args.latency, 'jitter': args.jitter,
+               'reject_rate': args.reject_rate, 'seed': args.seed}
+
+    if args.in_process:
+        server = FakeSheetsServer(**options)
+        server.create_spreadsheet(SPREADSHEET_ID, spreadsheets[SPREADSHEET_ID])
+        server.start()
+        url, stop = server.url, server.stop
+    else:
+        process, url = start_server_process(spreadsheets, **options)
+        stop = process.terminate
+
+    print(f"== Server giả lập {url} (độ trễ {args.latency * 1000:.1f} ms, 429 {args.reject_rate:.0%}) ==")
+    try:
+        service = make_service(url, args)
+        results = [run_scenario(name, service, args) for name in (args.scenario or SCENARIOS)]
+    finally:
+        stop()
+
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'options': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark khởi động - So sánh thời gian import và build service cũ/mới
+
+Chạy:
+    python benchmarks/bench_startup.py
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+REPEAT = 20
+
+
+# Khởi động kiểu cũ: import đầy đủ như trước và build() từ đầu
+LEGACY_STARTUP = """
+from google.oauth2.credentials import Credentials
+from google.oauth2 import service_account
+from google_auth_oauthlib.flow import InstalledAppFlow
+from google.auth.transport.requests import Request
+from googleapiclient.discovery import build
+creds = Credentials.from_authorized_user_file('token.json', ['https://www.googleapis.com/auth/spreadsheets'])
+service = build('sheets', 'v4', credentials=creds)
+service.spreadsheets().values().get(spreadsheetId='benchmark', range='Sheet1!A1')
+"""
+
+CURRENT_STARTUP = """
+from google_sheets_service import GoogleSheetsService
+service = GoogleSheetsService()
+service.authenticate()
+service.service.spreadsheets().values().get(spreadsheetId='benchmark', range='Sheet1!A1')
+"""
+
+
+def _write_token(directory):
+    """Tạo token.json giả còn hạn để authenticate không cần mạng"""
+    expiry = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(time.time() + 3600))
+    token = {
+        'token': 'benchmark', 'refresh_token': 'benchmark', 'client_id': 'benchmark',
+        'client_secret': 'benchmark', 'token_uri': 'https://oauth2.googleapis.com/token',
+        'scopes': ['https://www.googleapis.com/auth/spreadsheets'], 'expiry': expiry,
+    }
+    with open(os.path.join(directory, 'token.json'), 'w') as f:
+        json.dump(token, f)
+
+
+def _cold_start_seconds(code, directory):
+    """Thời gian chạy code trong một process Python mới (cold start), lấy trung vị"""
+    timed = (
+        "import time; t = time.perf_counter()\n"
+        f"{code}\n"
+        "print(time.perf_counter() - t)"
+    )
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    samples = []
+    for _ in range(5):
+        output = subprocess.check_output([sys.executable, '-c', timed], cwd=directory, env=env)
+        samples.append(float(output.decode().strip()))
+    return statistics.median(samples)
+
+
+def _median_seconds(func):
+    samples = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    from google.oauth2.credentials import Credentials
+    from googleapiclient.discovery import build
+
+    import google_sheets_service
+    from google_sheets_service import GoogleSheetsService, build_sheets_resource
+
+    print("== Khởi động đến khi dựng được request đầu tiên (process mới, token.json có sẵn) ==")
+    with tempfile.TemporaryDirectory() as directory:
+        _write_token(directory)
+        legacy = _cold_start_seconds(LEGACY_STARTUP, directory)
+        current = _cold_start_seconds(CURRENT_STARTUP, directory)
+    print(f"  kiểu cũ (build + oauthlib)      : {legacy * 1000:8.1f} ms")
+    print(f"  GoogleSheetsService hiện tại    : {current * 1000:8.1f} ms")
+
+    print("== Build resource 'sheets' ==")
+    creds = Credentials(token='benchmark')
+    legacy = _median_seconds(lambda: build('sheets', 'v4', credentials=creds))
+    print(f"  build('sheets', 'v4') mỗi lần   : {legacy * 1000:8.3f} ms")
+
+    def first_build():
+        google_sheets_service._discovery_doc = None
+        build_sheets_resource(Credentials(token='benchmark'))
+
+    print(f"  build lần đầu (parse discovery) : {_median_seconds(first_build) * 1000:8.3f} ms")
+    print(f"  credentials mới, discovery sẵn  : "
+          f"{_median_seconds(lambda: build_sheets_resource(Credentials(token='benchmark'))) * 1000:8.3f} ms")
+    print(f"  cùng credentials (dùng lại)     : "
+          f"{_median_seconds(lambda: build_sheets_resource(creds)) * 1000:8.3f} ms")
+
+    print("== Dựng một request values().get ==")
+    legacy_resource = build('sheets', 'v4', credentials=creds)
+    legacy = _median_seconds(
+        lambda: legacy_resource.spreadsheets().values().get(spreadsheetId='x', range='A1'))
+    resource = build_sheets_resource(creds)
+    current = _median_seconds(
+        lambda: resource.spreadsheets().values().get(spreadsheetId='x', range='A1'))
+    print(f"  resource từ build()             : {legacy * 1000:8.3f} ms")
+    print(f"  build_sheets_resource           : {current * 1000:8.3f} ms")
+
+    print("== Đổi spreadsheet ==")
+    service = GoogleSheetsService()
+    service.creds = creds
+    service.service = build_sheets_resource(creds)
+    switch = _median_seconds(lambda: service.set_spreadsheet_id('another-spreadsheet'))
+    print(f"  set_spreadsheet_id              : {switch * 1000:8.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
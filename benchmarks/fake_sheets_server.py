@@ -0,0 +1,658 @@
+"""
+Fake Sheets Server - Server HTTP giả lập Google Sheets API v4 cho benchmark và thử nghiệm
+
+Hỗ trợ spreadsheets.get, spreadsheets.batchUpdate (addSheet, deleteSheet,
+appendDimension) và values get/update/append/clear/batchGet/batchUpdate/batchClear.
+Độ trễ, tỷ lệ lỗi 429, quota mỗi phút và kích thước lưới đều cấu hình được.
+
+Chạy độc lập:
+    python benchmarks/fake_sheets_server.py --port 8765 --latency 0.05
+    # rồi đặt SHEETS_API_ENDPOINT=http://127.0.0.1:8765 và SPREADSHEET_ID=local
+"""
+
+import argparse
+import collections
+import json
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sheets_range import A1Range, parse_range  # noqa: E402
+
+_STATUS_NAMES = {400: 'INVALID_ARGUMENT', 404: 'NOT_FOUND', 429: 'RESOURCE_EXHAUSTED'}
+
+
+class FakeApiError(Exception):
+    """Lỗi trả về cho client dưới dạng JSON {'error': {...}} của Google API"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _user_entered(value):
+    """Chuyển chuỗi số/TRUE/FALSE thành giá trị như khi người dùng nhập (USER_ENTERED)"""
+    if not isinstance(value, str) or not value:
+        return value
+    upper = value.upper()
+    if upper in ('TRUE', 'FALSE'):
+        return upper == 'TRUE'
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def _formatted(value):
+    """Giá trị hiển thị (FORMATTED_VALUE) của một ô"""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _is_empty_row(row):
+    return all(value == '' or value is None for value in row)
+
+
+class FakeSheet:
+    """Một sheet: kích thước lưới và dữ liệu (list các dòng, dòng có thể ngắn hơn lưới)"""
+
+    def __init__(self, sheet_id, title, index, row_count, column_count):
+        self.sheet_id = sheet_id
+        self.title = title
+        self.index = index
+        self.row_count = row_count
+        self.column_count = column_count
+        self.rows = []
+
+    def properties(self):
+        return {
+            'sheetId': self.sheet_id,
+            'title': self.title,
+            'index': self.index,
+            'sheetType': 'GRID',
+            'gridProperties': {'rowCount': self.row_count, 'columnCount': self.column_count},
+        }
+
+    def check_grid(self, rng):
+        if rng.end_row > self.row_count or rng.end_col > self.column_count:
+            raise FakeApiError(400, (
+                f"Range ({rng.to_a1()}) exceeds grid limits. "
+                f"Max rows: {self.row_count}, max columns: {self.column_count}"
+            ))
+
+    def read(self, rng):
+        """Giá trị trong phạm vi đã giới hạn theo lưới, bỏ ô/dòng trống ở cuối như API"""
+        values = []
+        for row in self.rows[rng.start_row - 1:rng.end_row]:
+            cells = row[rng.start_col - 1:rng.end_col]
+            while cells and (cells[-1] == '' or cells[-1] is None):
+                cells.pop()
+            values.append(cells)
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def write(self, start_row, start_col, values):
+        missing = start_row - 1 + len(values) - len(self.rows)
+        if missing > 0:
+            self.rows.extend([] for _ in range(missing))
+        for offset, new_cells in enumerate(values):
+            row = self.rows[start_row - 1 + offset]
+            end = start_col - 1 + len(new_cells)
+            if len(row) < end:
+                row.extend([''] * (end - len(row)))
+            if None in new_cells:
+                # null trong values nghĩa là giữ nguyên ô đó
+                for col, value in enumerate(new_cells, start_col - 1):
+                    if value is not None:
+                        row[col] = value
+            else:
+                row[start_col - 1:end] = new_cells
+
+    def clear(self, rng):
+        for row in self.rows[rng.start_row - 1:rng.end_row]:
+            end = min(len(row), rng.end_col)
+            row[rng.start_col - 1:end] = [''] * max(end - rng.start_col + 1, 0)
+
+    def last_data_row(self, start_col, end_col):
+        """Số dòng cuối cùng có dữ liệu trong các cột [start_col, end_col], 0 nếu trống"""
+        for index in range(len(self.rows) - 1, -1, -1):
+            if not _is_empty_row(self.rows[index][start_col - 1:end_col]):
+                return index + 1
+        return 0
+
+
+class FakeSheetsServer:
+    """
+    Server giả lập Sheets API chạy trong một thread nền
+
+    Ví dụ:
+        with FakeSheetsServer(latency=0.01) as server:
+            server.create_spreadsheet('bench', {'Sheet1': {'rows': 10000, 'cols': 10,
+                                                           'fill_rows': 10000}})
+            service = GoogleSheetsService('bench')
+            service.service = build_sheets_resource(creds, server.url)
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, reject_rate=0.0,
+                 quota_per_minute=None, quota_window=60.0, seed=0):
+        """
+        Args:
+            host, port: Địa chỉ lắng nghe (port=0 để hệ điều hành chọn)
+            latency: Độ trễ (giây) thêm vào mỗi request
+            jitter: Độ trễ ngẫu nhiên thêm (0..jitter giây)
+            reject_rate: Tỷ lệ request bị trả HTTP 429 ngẫu nhiên (0..1)
+            quota_per_minute: Số request tối đa mỗi quota_window giây, vượt thì trả 429
+            quota_window: Độ dài cửa sổ quota (giây)
+            seed: Seed cho độ trễ/lỗi ngẫu nhiên, để các lần chạy giống nhau
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.reject_rate = reject_rate
+        self.quota_per_minute = quota_per_minute
+        self.quota_window = quota_window
+        self.stats = collections.Counter()
+
+        self._random = random.Random(seed)
+        self._recent = collections.deque()
+        self._spreadsheets = {}
+        self._next_sheet_id = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='fake-sheets',
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def create_spreadsheet(self, spreadsheet_id, sheets=None, title=None):
+        """
+        Tạo spreadsheet
+
+        Args:
+            sheets: Dict {tên sheet: {'rows', 'cols', 'fill_rows', 'fill_cols'}};
+                fill_rows > 0 để điền sẵn dữ liệu mẫu (dòng đầu là tiêu đề)
+        """
+        sheets = sheets or {'Sheet1': {}}
+        with self._lock:
+            spreadsheet = self._spreadsheets[spreadsheet_id] = {
+                'title': title or spreadsheet_id, 'sheets': []
+            }
+            for sheet_title, options in sheets.items():
+                sheet = self._add_sheet(spreadsheet, sheet_title, options.get('rows', 1000),
+                                        options.get('cols', 26))
+                fill_rows = options.get('fill_rows', 0)
+                if fill_rows:
+                    sheet.write(1, 1, sample_rows(fill_rows, options.get('fill_cols', sheet.column_count)))
+
+    def values(self, spreadsheet_id, range_name):
+        """Đọc trực tiếp dữ liệu của server (để kiểm tra kết quả)"""
+        with self._lock:
+            spreadsheet = self._spreadsheet(spreadsheet_id)
+            sheet, rng = self._resolve(spreadsheet, range_name)
+            return sheet.read(rng)
+
+    # ---- Xử lý request ----
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                # Header và body được gửi bằng hai lần write; tắt Nagle để không bị
+                # delayed ACK cộng thêm ~40ms vào mỗi request keep-alive
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def do_GET(self):
+                self._dispatch('GET')
+
+            def do_PUT(self):
+                self._dispatch('PUT')
+
+            def do_POST(self):
+                self._dispatch('POST')
+
+            def _dispatch(self, method):
+                length = int(self.headers.get('Content-Length') or 0)
+                raw_body = self.rfile.read(length) if length else b''
+                try:
+                    body = json.loads(raw_body) if raw_body else {}
+                    status, result = 200, server.handle(method, self.path, body)
+                except FakeApiError as error:
+                    status, result = error.status, {'error': {
+                        'code': error.status, 'message': error.message,
+                        'status': _STATUS_NAMES.get(error.status, 'UNKNOWN'),
+                    }}
+                except ValueError as error:
+                    status, result = 400, {'error': {'code': 400, 'message': str(error),
+                                                     'status': 'INVALID_ARGUMENT'}}
+                content = json.dumps(result).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=UTF-8')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def handle(self, method, path, body):
+        """Xử lý một request, trả về dict kết quả hoặc raise FakeApiError"""
+        delay = self.latency
+        if self.jitter:
+            with self._lock:
+                delay += self._random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        parts = urlsplit(path)
+        query = parse_qs(parts.query)
+        prefix = '/v4/spreadsheets/'
+        if not parts.path.startswith(prefix):
+            raise FakeApiError(404, f'Unknown path: {parts.path}')
+        rest = parts.path[len(prefix):]
+        spreadsheet_id, _, tail = rest.partition('/')
+        spreadsheet_id, _, verb = spreadsheet_id.partition(':')
+
+        with self._lock:
+            self.stats['requests'] += 1
+            self._check_quota()
+            spreadsheet = self._spreadsheet(unquote(spreadsheet_id))
+            if not tail:
+                if method == 'GET' and not verb:
+                    return self._get_spreadsheet(unquote(spreadsheet_id), spreadsheet)
+                if method == 'POST' and verb == 'batchUpdate':
+                    return self._structural_update(unquote(spreadsheet_id), spreadsheet, body)
+            elif tail.startswith('values:'):
+                verb = tail[len('values:'):]
+                if method == 'GET' and verb == 'batchGet':
+                    return self._batch_get(spreadsheet, query)
+                if method == 'POST' and verb == 'batchUpdate':
+                    return self._batch_update_values(spreadsheet, body)
+                if method == 'POST' and verb == 'batchClear':
+                    return {'clearedRanges': [self._clear(spreadsheet, r) for r in body.get('ranges', [])]}
+            elif tail.startswith('values/'):
+                range_name = unquote(tail[len('values/'):])
+                for suffix in (':append', ':clear'):
+                    if range_name.endswith(suffix):
+                        range_name, verb = range_name[:-len(suffix)], suffix[1:]
+                        break
+                else:
+                    verb = ''
+                if method == 'GET' and not verb:
+                    return self._get_values(spreadsheet, range_name, query)
+                if method == 'PUT' and not verb:
+                    return self._update_values(spreadsheet, range_name, body, _param(query, 'valueInputOption'),
+                                               _param(query, 'includeValuesInResponse') == 'true')
+                if method == 'POST' and verb == 'append':
+                    return self._append_values(spreadsheet, range_name, body, query)
+                if method == 'POST' and verb == 'clear':
+                    return {'clearedRange': self._clear(spreadsheet, range_name)}
+        raise FakeApiError(404, f'Unsupported request: {method} {parts.path}')
+
+    def _check_quota(self):
+        if self.reject_rate and self._random.random() < self.reject_rate:
+            self.stats['rejected'] += 1
+            raise FakeApiError(429, 'Quota exceeded (reject_rate)')
+        if self.quota_per_minute:
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] >= self.quota_window:
+                self._recent.popleft()
+            if len(self._recent) >= self.quota_per_minute:
+                self.stats['rejected'] += 1
+                raise FakeApiError(429, "Quota exceeded for quota metric 'Read requests'")
+            self._recent.append(now)
+
+    def _spreadsheet(self, spreadsheet_id):
+        spreadsheet = self._spreadsheets.get(spreadsheet_id)
+        if spreadsheet is None:
+            raise FakeApiError(404, 'Requested entity was not found.')
+        return spreadsheet
+
+    @staticmethod
+    def _sheet(spreadsheet, title):
+        for sheet in spreadsheet['sheets']:
+            if sheet.title == title:
+                return sheet
+        return None
+
+    def _add_sheet(self, spreadsheet, title, rows, cols, sheet_id=None):
+        if self._sheet(spreadsheet, title) is not None:
+            raise FakeApiError(400, f'A sheet with the name "{title}" already exists.')
+        if sheet_id is None:
+            sheet_id = self._next_sheet_id
+            self._next_sheet_id += 1
+        elif any(sheet.sheet_id == sheet_id for sheet in spreadsheet['sheets']):
+            raise FakeApiError(400, f'A sheet with the id {sheet_id} already exists.')
+        sheet = FakeSheet(sheet_id, title, len(spreadsheet['sheets']), rows, cols)
+        spreadsheet['sheets'].append(sheet)
+        return sheet
+
+    def _resolve(self, spreadsheet, range_name, bounded=True):
+        """
+        Tìm sheet và phạm vi; phạm vi mở được giới hạn theo lưới
+
+        Returns:
+            (FakeSheet, A1Range có tên sheet và đủ end_row/end_col)
+        """
+        rng = parse_range(range_name)
+        if rng is None or not spreadsheet['sheets']:
+            raise FakeApiError(400, f'Unable to parse range: {range_name}')
+        sheet = spreadsheet['sheets'][0] if rng.sheet is None else self._sheet(spreadsheet, rng.sheet)
+        if sheet is None:
+            raise FakeApiError(400, f'Unable to parse range: {range_name}')
+        rng = A1Range(sheet.title, rng.start_row, rng.start_col,
+                      sheet.row_count if rng.end_row is None else rng.end_row,
+                      sheet.column_count if rng.end_col is None else rng.end_col)
+        if bounded:
+            sheet.check_grid(rng)
+        return sheet, rng
+
+    def _get_spreadsheet(self, spreadsheet_id, spreadsheet):
+        return {
+            'spreadsheetId': spreadsheet_id,
+            'properties': {'title': spreadsheet['title']},
+            'sheets': [{'properties': sheet.properties()} for sheet in spreadsheet['sheets']],
+        }
+
+    def _structural_update(self, spreadsheet_id, spreadsheet, body):
+        replies = []
+        for request in body.get('requests', []):
+            if 'addSheet' in request:
+                properties = request['addSheet'].get('properties', {})
+                grid = properties.get('gridProperties', {})
+                sheet = self._add_sheet(spreadsheet, properties.get('title', f"Sheet{self._next_sheet_id + 1}"),
+                                        grid.get('rowCount', 1000), grid.get('columnCount', 26),
+                                        properties.get('sheetId'))
+                replies.append({'addSheet': {'properties': sheet.properties()}})
+            elif 'deleteSheet' in request:
+                sheet_id = request['deleteSheet'].get('sheetId')
+                sheets = [sheet for sheet in spreadsheet['sheets'] if sheet.sheet_id != sheet_id]
+                if len(sheets) == len(spreadsheet['sheets']):
+                    raise FakeApiError(400, f'No sheet with id: {sheet_id}')
+                for index, sheet in enumerate(sheets):
+                    sheet.index = index
+                spreadsheet['sheets'] = sheets
+                replies.append({})
+            elif 'appendDimension' in request:
+                append = request['appendDimension']
+                sheet = self._sheet_by_id(spreadsheet, append.get('sheetId'))
+                if append.get('dimension') == 'COLUMNS':
+                    sheet.column_count += append.get('length', 0)
+                else:
+                    sheet.row_count += append.get('length', 0)
+                replies.append({})
+            elif 'insertDimension' in request or 'deleteDimension' in request:
+                insert = 'insertDimension' in request
+                rng = request['insertDimension' if insert else 'deleteDimension']['range']
+                sheet = self._sheet_by_id(spreadsheet, rng.get('sheetId'))
+                start, end = rng.get('startIndex', 0), rng.get('endIndex')
+                count = end - start
+                if rng.get('dimension') == 'COLUMNS':
+                    sheet.column_count += count if insert else -count
+                    for row in sheet.rows:
+                        if insert:
+                            row[start:start] = [''] * count if len(row) > start else []
+                        else:
+                            del row[start:end]
+                else:
+                    sheet.row_count += count if insert else -count
+                    if insert:
+                        sheet.rows[start:start] = [[] for _ in range(count)] if len(sheet.rows) > start else []
+                    else:
+                        del sheet.rows[start:end]
+                replies.append({})
+            elif 'updateSheetProperties' in request:
+                properties = request['updateSheetProperties'].get('properties', {})
+                sheet = self._sheet_by_id(spreadsheet, properties.get('sheetId'))
+                grid = properties.get('gridProperties', {})
+                sheet.title = properties.get('title', sheet.title)
+                sheet.row_count = grid.get('rowCount', sheet.row_count)
+                sheet.column_count = grid.get('columnCount', sheet.column_count)
+                replies.append({})
+            elif 'updateCells' in request:
+                update = request['updateCells']
+                start = update.get('start', {})
+                sheet = self._sheet_by_id(spreadsheet, start.get('sheetId'))
+                values = [[next(iter(cell.get('userEnteredValue', {'': ''}).values()))
+                           for cell in row.get('values', [])] for row in update.get('rows', [])]
+                sheet.write(start.get('rowIndex', 0) + 1, start.get('columnIndex', 0) + 1, values)
+                replies.append({})
+            elif 'repeatCell' in request or 'autoResizeDimensions' in request:
+                # Định dạng không được lưu
+                replies.append({})
+            else:
+                raise FakeApiError(400, f'Unsupported request: {sorted(request)}')
+        result = {'spreadsheetId': spreadsheet_id, 'replies': replies}
+        if body.get('includeSpreadsheetInResponse'):
+            result['updatedSpreadsheet'] = self._get_spreadsheet(spreadsheet_id, spreadsheet)
+        return result
+
+    def _sheet_by_id(self, spreadsheet, sheet_id):
+        sheet = next((s for s in spreadsheet['sheets'] if s.sheet_id == sheet_id), None)
+        if sheet is None:
+            raise FakeApiError(400, f'No sheet with id: {sheet_id}')
+        return sheet
+
+    def _value_range(self, spreadsheet, range_name, major_dimension='ROWS', render='FORMATTED_VALUE'):
+        sheet, rng = self._resolve(spreadsheet, range_name)
+        values = sheet.read(rng)
+        if render == 'FORMATTED_VALUE':
+            values = [[_formatted(value) for value in row] for row in values]
+        if major_dimension == 'COLUMNS' and values:
+            width = max(len(row) for row in values)
+            values = [[row[col] if col < len(row) else '' for row in values] for col in range(width)]
+            for column in values:
+                while column and column[-1] == '':
+                    column.pop()
+        result = {'range': rng.to_a1(), 'majorDimension': major_dimension}
+        if values:
+            result['values'] = values
+        return result
+
+    def _get_values(self, spreadsheet, range_name, query):
+        self.stats['values.get'] += 1
+        return self._value_range(spreadsheet, range_name, _param(query, 'majorDimension', 'ROWS'),
+                                 _param(query, 'valueRenderOption', 'FORMATTED_VALUE'))
+
+    def _batch_get(self, spreadsheet, query):
+        self.stats['values.batchGet'] += 1
+        major_dimension = _param(query, 'majorDimension', 'ROWS')
+        render = _param(query, 'valueRenderOption', 'FORMATTED_VALUE')
+        return {'valueRanges': [self._value_range(spreadsheet, range_name, major_dimension, render)
+                                for range_name in query.get('ranges', [])]}
+
+    def _write(self, spreadsheet, range_name, values, value_input_option, include_values,
+               fit_range=True):
+        sheet, rng = self._resolve(spreadsheet, range_name, bounded=False)
+        rows = len(values)
+        cols = max((len(row) for row in values), default=0)
+        written = rng._replace(end_row=rng.start_row + max(rows, 1) - 1,
+                               end_col=rng.start_col + max(cols, 1) - 1)
+        if fit_range and parse_range(range_name).is_bounded and not rng.contains(written):
+            raise FakeApiError(400, (
+                f'Requested writing within range [{rng.to_a1()}], '
+                f'but tried writing to [{written.to_a1()}]'
+            ))
+        sheet.check_grid(written)
+        if value_input_option == 'USER_ENTERED':
+            values = [[_user_entered(value) for value in row] for row in values]
+        sheet.write(rng.start_row, rng.start_col, values)
+        self.stats['cells_written'] += sum(len(row) for row in values)
+        result = {
+            'updatedRange': written.to_a1(),
+            'updatedRows': rows,
+            'updatedColumns': cols,
+            'updatedCells': sum(len(row) for row in values),
+        }
+        if include_values:
+            result['updatedData'] = self._value_range(spreadsheet, written.to_a1())
+        return result
+
+    def _update_values(self, spreadsheet, range_name, body, value_input_option, include_values):
+        self.stats['values.update'] += 1
+        return self._write(spreadsheet, range_name, body.get('values', []), value_input_option,
+                           include_values)
+
+    def _batch_update_values(self, spreadsheet, body):
+        self.stats['values.batchUpdate'] += 1
+        responses = [
+            self._write(spreadsheet, item['range'], item.get('values', []),
+                        body.get('valueInputOption'), body.get('includeValuesInResponse', False))
+            for item in body.get('data', [])
+        ]
+        return {
+            'totalUpdatedRows': sum(r['updatedRows'] for r in responses),
+            'totalUpdatedColumns': sum(r['updatedColumns'] for r in responses),
+            'totalUpdatedCells': sum(r['updatedCells'] for r in responses),
+            'totalUpdatedSheets': len({parse_range(r['updatedRange']).sheet for r in responses}),
+            'responses': responses,
+        }
+
+    def _append_values(self, spreadsheet, range_name, body, query):
+        self.stats['values.append'] += 1
+        sheet, rng = self._resolve(spreadsheet, range_name, bounded=False)
+        values = body.get('values', [])
+        # Bảng được tìm trong các cột của phạm vi; một ô đơn lẻ thì tìm trên cả dòng
+        end_col = sheet.column_count if (rng.start_row, rng.start_col) == (rng.end_row, rng.end_col) else rng.end_col
+        start_row = max(sheet.last_data_row(rng.start_col, end_col) + 1, rng.start_row)
+        if _param(query, 'insertDataOption') == 'INSERT_ROWS':
+            # Chèn dòng trống rồi ghi vào đó; lưới tăng thêm đúng số dòng được thêm
+            if start_row <= len(sheet.rows):
+                sheet.rows[start_row - 1:start_row - 1] = [[] for _ in values]
+            sheet.row_count += len(values)
+        else:
+            sheet.row_count = max(sheet.row_count, start_row + len(values) - 1)
+        target = A1Range(sheet.title, start_row, rng.start_col, start_row, rng.start_col).to_a1()
+        updates = self._write(spreadsheet, target, values, _param(query, 'valueInputOption'),
+                              _param(query, 'includeValuesInResponse') == 'true', fit_range=False)
+        return {'tableRange': rng.to_a1(), 'updates': updates}
+
+    def _clear(self, spreadsheet, range_name):
+        self.stats['values.clear'] += 1
+        sheet, rng = self._resolve(spreadsheet, range_name)
+        sheet.clear(rng)
+        return rng.to_a1()
+
+
+def _param(query, name, default=None):
+    values = query.get(name)
+    return values[0] if values else default
+
+
+def sample_rows(rows, cols):
+    """Dữ liệu mẫu: dòng tiêu đề và rows - 1 dòng xen kẽ số và chuỗi"""
+    header = [f'Cột {col + 1}' for col in range(cols)]
+    body = [
+        [row * cols + col if col % 2 else f'r{row}c{col}' for col in range(cols)]
+        for row in range(1, rows)
+    ]
+    return [header] + body
+
+
+def _serve_child(connection, spreadsheets, options):
+    server = FakeSheetsServer(**options)
+    for spreadsheet_id, sheets in (spreadsheets or {}).items():
+        server.create_spreadsheet(spreadsheet_id, sheets)
+    server.start()
+    connection.send(server.url)
+    try:
+        connection.recv()
+    except EOFError:
+        pass
+    server.stop()
+
+
+def start_server_process(spreadsheets=None, **options):
+    """
+    Chạy FakeSheetsServer trong một process riêng, để CPU và bộ nhớ của server
+    không lẫn vào số đo của client
+
+    Args:
+        spreadsheets: Dict {spreadsheet_id: sheets} truyền cho create_spreadsheet
+        **options: Tham số của FakeSheetsServer
+
+    Returns:
+        (process, url); dừng bằng process.terminate()
+    """
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=_serve_child, args=(child, spreadsheets, options),
+                                      daemon=True)
+    process.start()
+    return process, parent.recv()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Server giả lập Google Sheets API v4')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--spreadsheet-id', default='local')
+    parser.add_argument('--rows', type=int, default=1000, help='Số dòng lưới của Sheet1')
+    parser.add_argument('--cols', type=int, default=26, help='Số cột lưới của Sheet1')
+    parser.add_argument('--fill-rows', type=int, default=0, help='Số dòng dữ liệu mẫu')
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--reject-rate', type=float, default=0.0)
+    parser.add_argument('--quota-per-minute', type=int, default=None)
+    args = parser.parse_args()
+
+    server = FakeSheetsServer(args.host, args.port, latency=args.latency, jitter=args.jitter,
+                              reject_rate=args.reject_rate, quota_per_minute=args.quota_per_minute)
+    server.create_spreadsheet(args.spreadsheet_id, {'Sheet1': {
+        'rows': args.rows, 'cols': args.cols, 'fill_rows': min(args.fill_rows, args.rows),
+    }})
+    print(f'SHEETS_API_ENDPOINT={server.url}')
+    print(f'SPREADSHEET_ID={args.spreadsheet_id}')
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -2,15 +2,34 @@
 Google Sheets Service - Xử lý kết nối và thao tác với Google Sheets API
 """
 
+import json
 import os
-from google.oauth2.credentials import Credentials
-from google.oauth2 import service_account
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document
 from googleapiclient.errors import HttpError
+from googleapiclient.http import build_http
+from google_auth_httplib2 import AuthorizedHttp
 import pickle
 from dotenv import load_dotenv
+from sheets_batch import DEFAULT_MAX_BYTES, BatchBuilder
+from sheets_cache import SheetValuesCache
+from sheets_credentials import get_provider
+from sheets_journal import SheetsJournal
+from sheets_key_index import KeyIndex
+from sheets_metadata import METADATA_FIELDS, MetadataCache, SpreadsheetMetadata
+from sheets_metrics import SheetsMetrics
+from sheets_quota import QuotaLimiter, QuotaStats, RetryPolicy, parse_retry_after
+from sheets_range import column_to_index, index_to_column, parse_range, quote_sheet_name
+from sheets_sync import DeltaSync
+from sheets_write_buffer import WriteBuffer
+
+# Các phần tùy chọn (query, table, snapshot, transfer, scan, watch) được import trong
+# method dùng tới chúng: numpy/pyarrow và các module đó không làm chậm lúc khởi động
 
 # Load environment variables
 load_dotenv()
@@ -18,93 +37,592 @@ load_dotenv()
 # Phạm vi quyền truy cập
 SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
 
+# Giới hạn mỗi request values().batchGet: số range và độ dài phần range trên URL
+BATCH_GET_MAX_RANGES = 100
+BATCH_GET_MAX_URL_CHARS = 1800
+
+# Discovery document của Sheets v4 (đã parse) và resource đã build theo credentials,
+# dùng chung trong cả process để không phải parse/build lại
+_discovery_doc = None
+_resources = weakref.WeakKeyDictionary()
+_resources_lock = threading.Lock()
+
+
+def _load_discovery_doc():
+    """
+    Đọc discovery document của Sheets v4 từ đĩa, không tải qua mạng
+
+    Ưu tiên file chỉ định bởi SHEETS_DISCOVERY_FILE, nếu không có thì dùng bản
+    đóng gói sẵn trong googleapiclient.
+    """
+    global _discovery_doc
+    if _discovery_doc is None:
+        path = os.getenv('SHEETS_DISCOVERY_FILE')
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                content = f.read()
+        else:
+            content = discovery_cache.get_static_doc('sheets', 'v4')
+        _discovery_doc = json.loads(content)
+    return _discovery_doc
+
+
+def build_sheets_resource(creds, api_endpoint=None):
+    """
+    Lấy resource 'sheets' v4 cho credentials, chỉ build một lần cho mỗi credentials
+
+    Args:
+        creds: Credentials đã xác thực
+        api_endpoint: Địa chỉ API thay thế (ví dụ server giả lập khi test)
+
+    Returns:
+        googleapiclient Resource
+    """
+    with _resources_lock:
+        per_creds = _resources.setdefault(creds, {})
+        resource = per_creds.get(api_endpoint)
+        if resource is None:
+            client_options = {'api_endpoint': api_endpoint} if api_endpoint else None
+            resource = _cache_sub_resources(build_from_document(
+                _load_discovery_doc(), credentials=creds, client_options=client_options
+            ))
+            per_creds[api_endpoint] = resource
+        return resource
+
+
+def _memoized(build):
+    """Hàm không tham số chỉ gọi build() ở lần đầu, các lần sau trả lại kết quả cũ"""
+    cached = []
+
+    def get():
+        if not cached:
+            cached.append(build())
+        return cached[0]
+    return get
+
+
+def _cache_sub_resources(resource):
+    """
+    Dùng lại resource con spreadsheets() và spreadsheets().values()
+
+    Mỗi lần gọi spreadsheets()/values(), googleapiclient dựng lại mọi method
+    của resource con từ discovery document (khoảng 30 ms CPU); resource con
+    không có trạng thái nên được tạo ở lần dùng đầu và dùng chung cho mọi request.
+    """
+    # Phần lớn thời gian dựng resource con là sinh docstring cho từng method (in
+    # toàn bộ schema request/response); docstring đó không bao giờ được dùng
+    schemas = getattr(resource, '_schema', None)
+    if schemas is not None:
+        schemas.prettyPrintByName = lambda name: ''
+        schemas.prettyPrintSchema = lambda schema: ''
+
+    build_spreadsheets = resource.spreadsheets
+
+    def spreadsheets():
+        sub = build_spreadsheets()
+        sub.values = _memoized(sub.values)
+        return sub
+
+    resource.spreadsheets = _memoized(spreadsheets)
+    return resource
+
+
+class SheetsApiError(Exception):
+    """
+    Lỗi khi gọi Google Sheets API
+
+    Giữ lại HTTP status (ví dụ 429, 503), reason và Retry-After (giây) của
+    response để code gọi có thể xử lý theo từng loại lỗi.
+    """
+
+    def __init__(self, message, error=None, status=None, reason=None, retry_after=None):
+        super().__init__(message)
+        if error is not None:
+            status = error.resp.status
+            reason = error.reason
+            retry_after = parse_retry_after(error.resp.get('retry-after'))
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def load_credentials(credentials_file):
+    """
+    Lấy credentials hợp lệ (service account, token.json của user, hoặc đăng nhập mới)
+
+    Credentials được cung cấp bởi CredentialProvider dùng chung trong process:
+    token được refresh nền trước khi hết hạn và chia sẻ giữa các process qua
+    cache có khóa file (xem sheets_credentials.py).
+
+    Args:
+        credentials_file: Đường dẫn file credentials tải từ Google Cloud Console
+
+    Returns:
+        google.oauth2 Credentials
+    """
+    return get_provider(credentials_file, scopes=SCOPES).credentials()
+
+
+def cache_from_env():
+    """Tạo cache đọc theo CACHE_TTL (giây); None nếu CACHE_TTL=0"""
+    cache_ttl = float(os.getenv('CACHE_TTL', '30'))
+    return SheetValuesCache(ttl=cache_ttl) if cache_ttl > 0 else None
+
+
+def limiter_from_env():
+    """Tạo bộ giới hạn tốc độ theo READ_QUOTA_PER_MINUTE/WRITE_QUOTA_PER_MINUTE"""
+    return QuotaLimiter(
+        read_per_minute=int(os.getenv('READ_QUOTA_PER_MINUTE', '60')),
+        write_per_minute=int(os.getenv('WRITE_QUOTA_PER_MINUTE', '60'))
+    )
+
+
+def metadata_cache_from_env():
+    """Tạo cache metadata theo METADATA_TTL (giây)"""
+    return MetadataCache(ttl=float(os.getenv('METADATA_TTL', '300')))
+
 
 class GoogleSheetsService:
     """Class để quản lý kết nối và thao tác với Google Sheets"""
     
-    def __init__(self):
-        self.spreadsheet_id = os.getenv('SPREADSHEET_ID')
+    def __init__(self, spreadsheet_id=None, manager=None):
+        """
+        Args:
+            spreadsheet_id: ID của spreadsheet (mặc định lấy từ SPREADSHEET_ID)
+            manager: SheetsManager để dùng chung credentials, resource, kết nối
+                HTTP, cache và quota với các spreadsheet khác (thường tạo qua
+                SheetsManager.open); None để service tự quản lý
+        """
+        self.manager = manager
+        self.spreadsheet_id = spreadsheet_id or os.getenv('SPREADSHEET_ID')
+
+        # Bộ đệm ghi, bật bằng enable_write_buffer()
+        self.write_buffer = None
+
+        # Kết nối HTTP theo thread cho các thread nền (journal, bộ đệm ghi), xem _thread_http()
+        self._thread_local = threading.local()
+
+        # Journal ghi trước trên đĩa, bật bằng enable_journal()
+        self.journal = None
+
+        # Snapshot của các phạm vi đã sync()
+        self.delta_sync = DeltaSync(self)
+
+        # Truy vấn theo cột (select), tạo ở lần dùng đầu tiên
+        self._query_engine = None
+
+        # Chỉ mục khóa -> dòng theo (spreadsheet, sheet, cột khóa), tạo bằng key_index()
+        self.key_indexes = {}
+
+        # Đo đạc request, bật bằng enable_metrics()
+        self.metrics = None
+
+        # Thread theo dõi thay đổi, tạo ở lần watch() đầu tiên
+        self.watcher = None
+
+        if manager is not None:
+            self.metrics = manager.metrics
+            self.credentials_file = manager.credentials_file
+            self.api_endpoint = manager.api_endpoint
+            self.service = manager.resource
+            self.creds = manager.creds
+            self.cache = manager.cache
+            self.metadata_cache = manager.metadata_cache
+            self.limiter = manager.limiter
+            self.retry_policy = manager.retry_policy
+            self.quota_stats = manager.quota_stats
+            return
+
         self.credentials_file = os.getenv('CREDENTIALS_FILE', 'credentials.json')
+        self.api_endpoint = os.getenv('SHEETS_API_ENDPOINT')
         self.service = None
         self.creds = None
+
+        # Cache đọc trong bộ nhớ; CACHE_TTL=0 để tắt
+        self.cache = cache_from_env()
+
+        # Cache metadata (danh sách sheet, kích thước lưới); METADATA_TTL giây
+        self.metadata_cache = metadata_cache_from_env()
+
+        # Giới hạn tốc độ theo quota mỗi phút và retry khi gặp 429/5xx
+        self.limiter = limiter_from_env()
+        self.retry_policy = RetryPolicy()
+        self.quota_stats = QuotaStats()
         
+    @property
+    def query_engine(self):
+        """QueryEngine của service, giữ cache dòng tiêu đề của từng sheet"""
+        if self._query_engine is None:
+            from sheets_query import QueryEngine
+            self._query_engine = QueryEngine(self)
+        return self._query_engine
+
     def authenticate(self):
         """
         Xác thực với Google Sheets API
-        Sử dụng OAuth 2.0 flow cho user authentication
+        Dùng service account nếu có SERVICE_ACCOUNT_FILE, ngược lại dùng OAuth 2.0 flow cho user
         """
-        creds = None
-        
-        # Token file lưu access và refresh tokens
-        if os.path.exists('token.json'):
-            creds = Credentials.from_authorized_user_file('token.json', SCOPES)
-        
-        # Nếu không có credentials hợp lệ, yêu cầu đăng nhập
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                if not os.path.exists(self.credentials_file):
-                    raise FileNotFoundError(
-                        f"Không tìm thấy file credentials: {self.credentials_file}\n"
-                        "Vui lòng tải file credentials từ Google Cloud Console"
-                    )
-                
-                flow = InstalledAppFlow.from_client_secrets_file(
-                    self.credentials_file, SCOPES)
-                creds = flow.run_local_server(port=0)
-            
-            # Lưu credentials cho lần chạy tiếp theo
-            with open('token.json', 'w') as token:
-                token.write(creds.to_json())
-        
+        if self.manager is not None:
+            # Credentials và resource do manager quản lý cho mọi spreadsheet
+            return self.manager.authenticate()
+
+        if self.creds is not None and self.creds.valid and self.service is not None:
+            # Đã có credentials hợp lệ và resource, không cần build lại
+            return True
+
+        creds = load_credentials(self.credentials_file)
+
         self.creds = creds
-        self.service = build('sheets', 'v4', credentials=creds)
+        self.service = build_sheets_resource(creds, self.api_endpoint)
         return True
+
+    def set_spreadsheet_id(self, spreadsheet_id):
+        """
+        Đổi spreadsheet đang làm việc mà không cần xác thực hay build lại service
+
+        Args:
+            spreadsheet_id: ID của spreadsheet mới
+        """
+        self._flush_pending()
+        self.spreadsheet_id = spreadsheet_id
     
-    def get_spreadsheet_info(self):
+    def get_metadata(self, refresh=False):
+        """
+        Lấy metadata của spreadsheet (tiêu đề, sheetId, kích thước lưới)
+
+        Chỉ yêu cầu các trường cần thiết (fields mask) và cache theo
+        METADATA_TTL; add_sheet/delete_sheet tự làm mới cache.
+
+        Args:
+            refresh: True để bỏ qua cache và lấy lại từ API
+
+        Returns:
+            SpreadsheetMetadata
+        """
+        if not refresh:
+            metadata = self.metadata_cache.get(self.spreadsheet_id)
+            if metadata is not None:
+                return metadata
+
+        try:
+            response = self._execute(self.service.spreadsheets().get(
+                spreadsheetId=self.spreadsheet_id,
+                fields=METADATA_FIELDS
+            ), 'read')
+        except HttpError as error:
+            raise SheetsApiError(f"Lỗi khi lấy thông tin spreadsheet: {error}", error)
+
+        metadata = SpreadsheetMetadata.from_response(response)
+        self.metadata_cache.put(self.spreadsheet_id, metadata)
+        return metadata
+
+    def get_spreadsheet_info(self, refresh=False):
         """Lấy thông tin về spreadsheet"""
+        metadata = self.get_metadata(refresh)
+        return {
+            'title': metadata.title,
+            'sheets': metadata.sheet_titles,
+            'url': f"https://docs.google.com/spreadsheets/d/{self.spreadsheet_id}"
+        }
+
+    def add_sheet(self, title, rows=1000, cols=26, hidden=False):
+        """
+        Thêm một sheet mới
+
+        Returns:
+            sheetId của sheet mới
+        """
         try:
-            sheet_metadata = self.service.spreadsheets().get(
-                spreadsheetId=self.spreadsheet_id
-            ).execute()
-            
-            title = sheet_metadata.get('properties', {}).get('title', 'Unknown')
-            sheets = sheet_metadata.get('sheets', [])
-            sheet_names = [sheet.get('properties', {}).get('title', '') for sheet in sheets]
-            
-            return {
-                'title': title,
-                'sheets': sheet_names,
-                'url': f"https://docs.google.com/spreadsheets/d/{self.spreadsheet_id}"
-            }
+            result = self._execute(self.service.spreadsheets().batchUpdate(
+                spreadsheetId=self.spreadsheet_id,
+                body={'requests': [{'addSheet': {'properties': {
+                    'title': title,
+                    'hidden': hidden,
+                    'gridProperties': {'rowCount': rows, 'columnCount': cols}
+                }}}]}
+            ), 'write', idempotent=False)
         except HttpError as error:
-            raise Exception(f"Lỗi khi lấy thông tin spreadsheet: {error}")
-    
-    def read_data(self, range_name):
+            raise SheetsApiError(f"Lỗi khi thêm sheet '{title}': {error}", error)
+        finally:
+            self.metadata_cache.invalidate(self.spreadsheet_id)
+
+        return result['replies'][0]['addSheet']['properties']['sheetId']
+
+    def delete_sheet(self, title):
+        """
+        Xóa một sheet theo tên
+
+        Returns:
+            True nếu thành công
+        """
+        sheet = self.get_metadata().sheet(title) or self.get_metadata(refresh=True).sheet(title)
+        if sheet is None:
+            raise ValueError(f"Không tìm thấy sheet '{title}'")
+
+        try:
+            self._execute(self.service.spreadsheets().batchUpdate(
+                spreadsheetId=self.spreadsheet_id,
+                body={'requests': [{'deleteSheet': {'sheetId': sheet.sheet_id}}]}
+            ), 'write', idempotent=False)
+        except HttpError as error:
+            raise SheetsApiError(f"Lỗi khi xóa sheet '{title}': {error}", error)
+        finally:
+            self.metadata_cache.invalidate(self.spreadsheet_id)
+
+        self.query_engine.forget(title)
+        self.delta_sync.invalidate(quote_sheet_name(title))
+        for key in [key for key in self.key_indexes
+                    if key[0] == self.spreadsheet_id and key[1] == title]:
+            del self.key_indexes[key]
+        if self.cache is not None:
+            self.cache.invalidate(self.spreadsheet_id, quote_sheet_name(title))
+        return True
+
+    def clamp_range(self, range_name):
+        """
+        Giới hạn phạm vi mở theo kích thước lưới đã cache (ví dụ 'Sheet1!A:C'
+        thành 'Sheet1!A1:C1000'), không cần thêm request khi metadata còn hạn
+
+        Returns:
+            Phạm vi dạng A1 đã giới hạn, hoặc range_name nếu không phân tích được
+        """
+        rng = parse_range(range_name)
+        if rng is None or rng.sheet is None:
+            return range_name
+        return self.get_metadata().clamp(rng).to_a1()
+
+    def read_data(self, range_name, use_cache=True):
         """
         Đọc dữ liệu từ sheet
 
         Args:
             range_name: Phạm vi đọc (ví dụ: 'Sheet1!A1:D10' hoặc 'Sheet1')
+            use_cache: False để luôn đọc mới từ API (kết quả vẫn được đưa vào cache)
 
         Returns:
             List of lists chứa dữ liệu
         """
+        self._flush_pending()
+
+        if self.cache is not None and use_cache:
+            cached = self.cache.get(self.spreadsheet_id, range_name)
+            if cached is not None:
+                return cached
+
         try:
-            result = self.service.spreadsheets().values().get(
+            result = self._execute(self.service.spreadsheets().values().get(
                 spreadsheetId=self.spreadsheet_id,
                 range=range_name
-            ).execute()
+            ), 'read')
 
             values = result.get('values', [])
+            if self.cache is not None:
+                self.cache.put(self.spreadsheet_id, range_name, values)
             return values
         except HttpError as error:
             error_details = str(error)
             if 'Unable to parse range' in error_details:
-                raise Exception(f"Lỗi format range: '{range_name}'. Vui lòng kiểm tra lại tên sheet và format range")
-            raise Exception(f"Lỗi khi đọc dữ liệu: {error}")
+                raise SheetsApiError(f"Lỗi format range: '{range_name}'. Vui lòng kiểm tra lại tên sheet và format range", error)
+            raise SheetsApiError(f"Lỗi khi đọc dữ liệu: {error}", error)
     
+    def batch_read(self, ranges, major_dimension='ROWS', value_render_option='FORMATTED_VALUE'):
+        """
+        Đọc nhiều phạm vi bằng values().batchGet thay vì gọi read_data nhiều lần
+
+        Tự chia thành nhiều request khi vượt giới hạn số range hoặc độ dài URL.
+
+        Args:
+            ranges: List các phạm vi (ví dụ: ['Sheet1!A1:B5', 'Sheet2!C:C'])
+            major_dimension: 'ROWS' hoặc 'COLUMNS'
+            value_render_option: 'FORMATTED_VALUE', 'UNFORMATTED_VALUE' hoặc 'FORMULA'
+
+        Returns:
+            Dict {range: list of lists} theo đúng chuỗi range đã truyền vào
+        """
+        self._flush_pending()
+
+        # Cache chỉ chứa dữ liệu dạng mặc định của read_data
+        use_cache = (self.cache is not None and major_dimension == 'ROWS'
+                     and value_render_option == 'FORMATTED_VALUE')
+
+        results = {}
+        missing = []
+        for range_name in ranges:
+            if range_name in results or range_name in missing:
+                continue
+            cached = self.cache.get(self.spreadsheet_id, range_name) if use_cache else None
+            if cached is not None:
+                results[range_name] = cached
+            else:
+                missing.append(range_name)
+
+        for group in self._split_ranges(missing):
+            try:
+                result = self._execute(self.service.spreadsheets().values().batchGet(
+                    spreadsheetId=self.spreadsheet_id,
+                    ranges=group,
+                    majorDimension=major_dimension,
+                    valueRenderOption=value_render_option
+                ), 'read')
+            except HttpError as error:
+                raise SheetsApiError(f"Lỗi khi đọc nhiều phạm vi: {error}", error)
+
+            # valueRanges trả về theo đúng thứ tự của ranges trong request
+            for range_name, value_range in zip(group, result.get('valueRanges', [])):
+                values = value_range.get('values', [])
+                results[range_name] = values
+                if use_cache:
+                    self.cache.put(self.spreadsheet_id, range_name, values)
+
+        return results
+
+    @staticmethod
+    def _split_ranges(ranges):
+        """Chia list range thành các nhóm nằm trong giới hạn của một request batchGet"""
+        group, group_chars = [], 0
+        for range_name in ranges:
+            chars = len('&ranges=') + len(quote(range_name, safe=''))
+            if group and (len(group) >= BATCH_GET_MAX_RANGES
+                          or group_chars + chars > BATCH_GET_MAX_URL_CHARS):
+                yield group
+                group, group_chars = [], 0
+            group.append(range_name)
+            group_chars += chars
+        if group:
+            yield group
+
+    def read_table(self, range_name, header=True, dtypes=None):
+        """
+        Đọc một phạm vi thành bảng dạng cột (mảng NumPy cho mỗi cột)
+
+        Dùng valueRenderOption=UNFORMATTED_VALUE để số về dạng số và
+        majorDimension=COLUMNS để API trả dữ liệu theo cột, sau đó chuyển kiểu
+        một lần cho mỗi cột. Cần cài numpy.
+
+        Args:
+            range_name: Phạm vi đọc (ví dụ: 'Sheet1!A1:E')
+            header: True nếu dòng đầu là tên cột
+            dtypes: Dict {tên cột: 'float' | 'int' | 'bool' | 'datetime' | 'str'}
+
+        Returns:
+            SheetTable, truy cập cột bằng table['Tuổi'] và ô rỗng bằng table.null_mask('Tuổi')
+        """
+        self._flush_pending()
+
+        try:
+            result = self._execute(self.service.spreadsheets().values().get(
+                spreadsheetId=self.spreadsheet_id,
+                range=range_name,
+                majorDimension='COLUMNS',
+                valueRenderOption='UNFORMATTED_VALUE'
+            ), 'read')
+        except HttpError as error:
+            raise SheetsApiError(f"Lỗi khi đọc dữ liệu: {error}", error)
+
+        rng = parse_range(range_name)
+        start_col = rng.start_col if rng is not None else 1
+        from sheets_table import build_table
+        return build_table(result.get('values', []), header=header, dtypes=dtypes, start_col=start_col)
+
+    def iter_rows(self, sheet_name, chunk_rows=5000, first_col='A', last_col=None,
+                  start_row=1, end_row=None):
+        """
+        Đọc sheet theo từng cửa sổ dòng cố định (generator), dùng cho sheet rất lớn
+
+        Cửa sổ tiếp theo được tải trước trong lúc dòng của cửa sổ hiện tại
+        đang được xử lý. Dừng ở cửa sổ rỗng đầu tiên, nên bộ nhớ chỉ giữ tối
+        đa hai cửa sổ bất kể sheet lớn đến đâu. Kết quả không đi qua cache.
+
+        Args:
+            sheet_name: Tên sheet (ví dụ: 'Sheet1')
+            chunk_rows: Số dòng mỗi cửa sổ
+            first_col, last_col: Cột đầu và cột cuối cần đọc (ví dụ: 'A', 'Z');
+                last_col=None đọc đến cột cuối của lưới
+            start_row: Dòng bắt đầu
+            end_row: Dòng kết thúc (None = đến hết dữ liệu)
+
+        Yields:
+            Từng dòng (list) theo thứ tự, dòng rỗng ở giữa là []
+        """
+        self._flush_pending()
+
+        sheet = quote_sheet_name(sheet_name)
+
+        # Không đọc vượt lưới của sheet (kích thước lấy từ metadata đã cache)
+        limit = end_row
+        info = self.get_metadata().sheet(sheet_name)
+        if info is None and last_col is None:
+            # Sheet mới thêm từ nơi khác: cần số cột của lưới để biết đọc đến đâu
+            info = self.get_metadata(refresh=True).sheet(sheet_name)
+            if info is None:
+                raise ValueError(f"Không tìm thấy sheet '{sheet_name}'")
+        if info is not None and info.row_count is not None:
+            if column_to_index(first_col) > info.column_count:
+                return
+            if last_col is None:
+                last_col = index_to_column(info.column_count)
+            else:
+                last_col = index_to_column(min(column_to_index(last_col), info.column_count))
+            limit = info.row_count if end_row is None else min(end_row, info.row_count)
+        elif last_col is None:
+            raise ValueError(f"Sheet '{sheet_name}' không có lưới ô để đọc")
+
+        def window(row):
+            last = row + chunk_rows - 1
+            if limit is not None:
+                last = min(last, limit)
+            return f"{sheet}!{first_col}{row}:{last_col}{last}", last - row + 1
+
+        # Luồng tải trước cần http riêng vì httplib2.Http không thread-safe
+        prefetch_http = AuthorizedHttp(self.creds, http=build_http()) if self.creds else None
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch_http else None
+
+        def fetch(range_name, http=None):
+            try:
+                result = self._execute(self.service.spreadsheets().values().get(
+                    spreadsheetId=self.spreadsheet_id,
+                    range=range_name
+                ), 'read', http=http)
+                return result.get('values', [])
+            except HttpError as error:
+                raise SheetsApiError(f"Lỗi khi đọc dữ liệu: {error}", error)
+
+        def submit(row):
+            range_name, size = window(row)
+            if executor is None:
+                return size, fetch(range_name)
+            return size, executor.submit(fetch, range_name, prefetch_http)
+
+        row = start_row
+        pending = submit(row) if limit is None or row <= limit else None
+        blank_rows = 0
+        try:
+            while pending is not None:
+                size, result = pending
+                values = result if executor is None else result.result()
+                if not values:
+                    break
+
+                row += size
+                pending = submit(row) if limit is None or row <= limit else None
+                if pending is None and end_row is None and len(values) == size:
+                    # Dữ liệu chạm cuối lưới: metadata có thể đã cũ (sheet được thêm dòng)
+                    info = self.get_metadata(refresh=True).sheet(sheet_name)
+                    if info is not None and info.row_count > limit:
+                        limit = info.row_count
+                        pending = submit(row)
+
+                # Dòng rỗng cuối cửa sổ trước bị API cắt bỏ, trả lại khi còn dữ liệu phía sau
+                for _ in range(blank_rows):
+                    yield []
+                for values_row in values:
+                    yield values_row
+                blank_rows = size - len(values)
+                values = None
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
     def write_data(self, range_name, values):
         """
         Ghi dữ liệu vào sheet (ghi đè dữ liệu cũ)
@@ -114,22 +632,31 @@ class GoogleSheetsService:
             values: List of lists chứa dữ liệu cần ghi
         
         Returns:
-            Số lượng cells đã cập nhật
+            Số lượng cells đã cập nhật. Khi bộ đệm ghi hoặc journal đang bật, trả
+            về một Future sẽ có kết quả là số cells đã cập nhật sau khi gửi
         """
+        if self.journal is not None:
+            return self.journal.write(range_name, values)
+        if self.write_buffer is not None:
+            return self.write_buffer.submit(range_name, values)
+
         try:
             body = {
                 'values': values
             }
-            result = self.service.spreadsheets().values().update(
+            result = self._execute(self.service.spreadsheets().values().update(
                 spreadsheetId=self.spreadsheet_id,
                 range=range_name,
                 valueInputOption='USER_ENTERED',
+                includeValuesInResponse=self.cache is not None,
                 body=body
-            ).execute()
-            
+            ), 'write')
+
+            self._patch_cache(range_name, result)
+            self._update_indexes('write', result.get('updatedRange', range_name), values)
             return result.get('updatedCells', 0)
         except HttpError as error:
-            raise Exception(f"Lỗi khi ghi dữ liệu: {error}")
+            raise SheetsApiError(f"Lỗi khi ghi dữ liệu: {error}", error)
     
     def append_data(self, range_name, values):
         """
@@ -140,27 +667,63 @@ class GoogleSheetsService:
             values: List of lists chứa dữ liệu cần thêm
 
         Returns:
-            Số lượng rows đã thêm
+            Số lượng rows đã thêm. Khi journal đang bật, trả về một Future sẽ có
+            kết quả là số rows đã thêm sau khi gửi
+        """
+        # Journal tự gửi theo đúng thứ tự các mutation trước đó, không cần chờ
+        self._flush_pending(journal=False)
+
+        if self.journal is not None:
+            return self.journal.append(range_name, values)
+        return self._send_append(range_name, values).get('updates', {}).get('updatedRows', 0)
+
+    def _send_append(self, range_name, values, spreadsheet_id=None, retry_policy=None, http=None):
         """
+        Gửi một values().append (không qua journal), trả về response của API
+
+        retry_policy thay cho self.retry_policy; journal dùng RetryPolicy(max_retries=0)
+        để tự xử lý mọi lỗi mơ hồ. http: kết nối riêng khi gửi từ thread nền.
+        """
+        spreadsheet_id = spreadsheet_id or self.spreadsheet_id
         try:
             body = {
                 'values': values
             }
-            result = self.service.spreadsheets().values().append(
-                spreadsheetId=self.spreadsheet_id,
+            result = self._execute(self.service.spreadsheets().values().append(
+                spreadsheetId=spreadsheet_id,
                 range=range_name,
                 valueInputOption='USER_ENTERED',
                 insertDataOption='INSERT_ROWS',
                 body=body
-            ).execute()
+            ), 'write', http=http, idempotent=False, retry_policy=retry_policy)
+
+            updates = result.get('updates', {})
+            updated = parse_range(updates.get('updatedRange', ''))
+            # INSERT_ROWS chèn dòng mới vào lưới: cập nhật số dòng trong cache metadata
+            if updated is None or updated.sheet is None:
+                self.metadata_cache.invalidate(spreadsheet_id)
+            else:
+                self.metadata_cache.add_rows(spreadsheet_id, updated.sheet,
+                                             updates.get('updatedRows', 0), updated.end_col)
 
-            return result.get('updates', {}).get('updatedRows', 0)
+            if self.cache is not None:
+                # INSERT_ROWS đẩy các dòng phía dưới xuống, bỏ cache từ dòng được thêm trở đi
+                if updated is None:
+                    self.cache.invalidate(spreadsheet_id)
+                else:
+                    self.cache.invalidate(
+                        spreadsheet_id,
+                        updated._replace(start_col=1, end_row=None, end_col=None)
+                    )
+            self._update_indexes('append', result.get('updates', {}).get('updatedRange'), values,
+                                 spreadsheet_id)
+            return result
         except HttpError as error:
             # Thêm thông tin chi tiết về lỗi
             error_details = str(error)
             if 'Unable to parse range' in error_details:
-                raise Exception(f"Lỗi format range: '{range_name}'. Vui lòng sử dụng format như 'Sheet1!A1' hoặc 'Sheet1'")
-            raise Exception(f"Lỗi khi thêm dữ liệu: {error}")
+                raise SheetsApiError(f"Lỗi format range: '{range_name}'. Vui lòng sử dụng format như 'Sheet1!A1' hoặc 'Sheet1'", error)
+            raise SheetsApiError(f"Lỗi khi thêm dữ liệu: {error}", error)
     
     def clear_data(self, range_name):
         """
@@ -172,15 +735,20 @@ class GoogleSheetsService:
         Returns:
             True nếu thành công
         """
+        self._flush_pending()
+
         try:
-            self.service.spreadsheets().values().clear(
+            result = self._execute(self.service.spreadsheets().values().clear(
                 spreadsheetId=self.spreadsheet_id,
                 range=range_name
-            ).execute()
-            
+            ), 'write')
+
+            if self.cache is not None:
+                self.cache.clear_cells(self.spreadsheet_id, result.get('clearedRange', range_name))
+            self._update_indexes('clear', result.get('clearedRange', range_name))
             return True
         except HttpError as error:
-            raise Exception(f"Lỗi khi xóa dữ liệu: {error}")
+            raise SheetsApiError(f"Lỗi khi xóa dữ liệu: {error}", error)
     
     def batch_update(self, data_list):
         """
@@ -192,6 +760,16 @@ class GoogleSheetsService:
         Returns:
             Tổng số cells đã cập nhật
         """
+        self._flush_pending()
+        return self._send_batch_update(data_list).get('totalUpdatedCells', 0)
+
+    def _send_batch_update(self, data_list, spreadsheet_id=None, http=None):
+        """
+        Gửi một values().batchUpdate (không qua bộ đệm ghi hay journal), trả về response của API
+
+        http: kết nối riêng khi gửi từ thread nền
+        """
+        spreadsheet_id = spreadsheet_id or self.spreadsheet_id
         try:
             batch_data = []
             for item in data_list:
@@ -202,15 +780,535 @@ class GoogleSheetsService:
             
             body = {
                 'valueInputOption': 'USER_ENTERED',
+                'includeValuesInResponse': self.cache is not None,
                 'data': batch_data
             }
-            
-            result = self.service.spreadsheets().values().batchUpdate(
-                spreadsheetId=self.spreadsheet_id,
+
+            result = self._execute(self.service.spreadsheets().values().batchUpdate(
+                spreadsheetId=spreadsheet_id,
                 body=body
-            ).execute()
-            
-            return result.get('totalUpdatedCells', 0)
+            ), 'write', http=http)
+
+            if self.cache is not None:
+                responses = result.get('responses', [])
+                if len(responses) != len(batch_data):
+                    self.cache.invalidate(spreadsheet_id)
+                for item, response in zip(batch_data, responses):
+                    self._patch_cache(item['range'], response, spreadsheet_id)
+            responses = result.get('responses', [])
+            for i, item in enumerate(batch_data):
+                updated = responses[i].get('updatedRange') if i < len(responses) else None
+                self._update_indexes('write', updated or item['range'], item['values'],
+                                     spreadsheet_id)
+            return result
         except HttpError as error:
-            raise Exception(f"Lỗi khi batch update: {error}")
+            raise SheetsApiError(f"Lỗi khi batch update: {error}", error)
+
+    def _thread_http(self):
+        """
+        Kết nối HTTP riêng của thread hiện tại (httplib2.Http không thread-safe)
+
+        Dùng cho các thread nền gửi qua service. Với SheetsManager trả về None
+        vì _execute đã tự dùng kết nối theo thread của manager.
+        """
+        if self.manager is not None:
+            return None
+        local = self._thread_local
+        if not hasattr(local, 'http'):
+            local.http = AuthorizedHttp(self.creds, http=build_http()) if self.creds else build_http()
+        return local.http
+
+    def _execute(self, request, kind, http=None, idempotent=True, retry_policy=None):
+        """
+        Gửi một request của API qua bộ giới hạn tốc độ, thử lại khi gặp 429/5xx
+
+        Args:
+            request: HttpRequest của googleapiclient (chưa execute)
+            kind: 'read' hoặc 'write', quyết định quota được dùng
+            http: Đối tượng http riêng cho luồng hiện tại (nếu có)
+            idempotent: False cho request gửi lại sẽ ghi trùng (values().append,
+                appendDimension, insertDimension...): chỉ thử lại khi bị 429, lỗi
+                5xx/kết nối được ném ra ngay
+            retry_policy: RetryPolicy thay cho self.retry_policy (ví dụ RetryPolicy(max_retries=0))
+        """
+        if self.metrics is not None:
+            return self.metrics.execute(
+                request, lambda call: self._execute_with_retry(request, kind, http, call,
+                                                               idempotent, retry_policy)
+            )
+        return self._execute_with_retry(request, kind, http, None, idempotent, retry_policy)
+
+    def _execute_with_retry(self, request, kind, http=None, call=None, idempotent=True,
+                            retry_policy=None):
+        """Vòng giới hạn tốc độ/thử lại của _execute; call nhận số lần thử lại khi đang đo"""
+        policy = retry_policy or self.retry_policy
+        attempt = 0
+        while True:
+            if self.manager is not None:
+                # Refresh token dùng chung một khóa; mỗi thread một kết nối HTTP riêng
+                self.manager.refresh_credentials()
+                if http is None:
+                    http = self.manager.thread_http()
+
+            wait = self.limiter.reserve(kind)
+            if wait > 0:
+                self.quota_stats.increment('throttled')
+                self.quota_stats.increment('throttled_seconds', wait)
+                time.sleep(wait)
+
+            self.quota_stats.increment('requests')
+            try:
+                return request.execute(http=http)
+            except HttpError as error:
+                status = error.resp.status
+                if status == 429:
+                    self.quota_stats.increment('rate_limited')
+                    if call is not None:
+                        call.quota_errors += 1
+                if not policy.should_retry(status, attempt, idempotent):
+                    self.quota_stats.increment('failed')
+                    raise
+                retry_after = parse_retry_after(error.resp.get('retry-after'))
+            except (ConnectionError, TimeoutError):
+                if not policy.should_retry_network_error(attempt, idempotent):
+                    self.quota_stats.increment('failed')
+                    raise
+                retry_after = None
+
+            self.quota_stats.increment('retried')
+            if call is not None:
+                call.retries += 1
+            time.sleep(policy.delay(attempt, retry_after))
+            attempt += 1
+
+    def get_quota_stats(self):
+        """
+        Lấy các bộ đếm giới hạn tốc độ/thử lại
+
+        Returns:
+            Dict gồm requests, throttled, throttled_seconds, retried,
+            rate_limited (số lần nhận 429) và failed
+        """
+        return self.quota_stats.as_dict()
+
+    def sync(self, range_name, local_rows, key_column=None, header_rows=1, refresh=False):
+        """
+        Đồng bộ bảng cục bộ lên sheet, chỉ ghi các ô đã thay đổi
+
+        Lần đầu đọc sheet để lấy snapshot, các lần sau so sánh với snapshot đã
+        lưu. Các ô thay đổi được gộp thành phạm vi hình chữ nhật và gửi trong
+        một batch_update. Với key_column (ví dụ 'ID'), dòng được khớp theo
+        khóa nên thêm/xóa dòng không làm ghi lại cả bảng.
+
+        Args:
+            range_name: Phạm vi của bảng (ví dụ: 'Sheet1!A1:E')
+            local_rows: Toàn bộ bảng cục bộ, kể cả dòng header
+            key_column: Tên hoặc chỉ số cột khóa; None để so sánh theo vị trí
+            header_rows: Số dòng header
+            refresh: True để đọc lại sheet thay vì dùng snapshot
+
+        Returns:
+            Dict {'changed_cells', 'ranges', 'updated_cells'}
+        """
+        return self.delta_sync.sync(range_name, local_rows, key_column, header_rows, refresh)
+
+    def save_snapshot(self, range_name, path, revision=None):
+        """
+        Đọc một phạm vi và lưu thành file snapshot nhị phân dạng cột
+
+        Args:
+            range_name: Phạm vi cần lưu (ví dụ: 'Sheet1!A1:F')
+            path: File đích
+            revision: Phiên bản ghi kèm snapshot (None = checksum nội dung)
+
+        Returns:
+            Snapshot (đọc bằng mmap: cell(), column(), row(), to_rows())
+        """
+        values = self.read_data(range_name, use_cache=False)
+        from sheets_snapshot import save_snapshot
+        return save_snapshot(path, values, self.spreadsheet_id, range_name, revision)
+
+    def load_snapshot(self, path, warm=True, max_age=None):
+        """
+        Mở file snapshot và khởi động ấm cache đọc và sync() từ snapshot đó
+
+        Snapshot sync() luôn được nạp. Cache đọc chỉ được nạp khi snapshot
+        chưa cũ hơn max_age giây (mặc định bằng CACHE_TTL), với thời hạn còn lại.
+
+        Args:
+            path: File snapshot
+            warm: False để chỉ mở file, không nạp vào cache/sync
+            max_age: Tuổi tối đa (giây) để nạp vào cache đọc
+
+        Returns:
+            Snapshot
+        """
+        from sheets_snapshot import Snapshot
+        snapshot = Snapshot(path)
+        if not warm:
+            return snapshot
+        if snapshot.spreadsheet_id != self.spreadsheet_id:
+            snapshot.close()
+            raise ValueError(
+                f"Snapshot của spreadsheet '{snapshot.spreadsheet_id}', "
+                f"không phải '{self.spreadsheet_id}'"
+            )
+
+        rows = snapshot.to_rows()
+        self.delta_sync.seed(snapshot.range, rows)
+        if self.cache is not None:
+            remaining = (self.cache.ttl if max_age is None else max_age) - snapshot.age
+            if remaining > 0:
+                self.cache.put(self.spreadsheet_id, snapshot.range, rows, ttl=remaining)
+        return snapshot
+
+    def export_range(self, range_name, path, format=None, header=True, chunk_rows=5000,
+                     progress=None):
+        """
+        Xuất một phạm vi ra file CSV, JSONL hoặc Parquet
+
+        Dữ liệu được đọc theo từng phần bằng iter_rows và ghi ngay xuống đĩa,
+        nên bộ nhớ không tăng theo kích thước sheet.
+
+        Args:
+            range_name: Phạm vi cần xuất (ví dụ: 'Sheet1' hoặc 'Sheet1!A1:F')
+            path: File đích
+            format: 'csv', 'jsonl' hoặc 'parquet' (None = theo đuôi file)
+            header: True nếu dòng đầu là tên cột (dùng cho jsonl/parquet)
+            chunk_rows: Số dòng đọc mỗi lần
+            progress: Callback(stats) nhận {'rows', 'seconds', 'rows_per_second'}
+
+        Returns:
+            Dict {'rows', 'seconds', 'rows_per_second'}
+        """
+        from sheets_transfer import export_range
+        return export_range(self, range_name, path, format, header, chunk_rows, progress)
+
+    def import_file(self, path, sheet_name, format=None, header=True, max_workers=1,
+                    progress=None, **options):
+        """
+        Nhập file CSV, JSONL hoặc Parquet vào sheet
+
+        File được đọc dần và gửi thành các lô ghi khoảng 1MB; max_workers > 1
+        gửi song song các khối dòng rời nhau.
+
+        Args:
+            path: File nguồn
+            sheet_name: Sheet đích
+            format: 'csv', 'jsonl' hoặc 'parquet' (None = theo đuôi file)
+            header: Ghi dòng tên cột (jsonl/parquet)
+            max_workers: Số lô gửi song song
+            progress: Callback(stats) nhận {'rows', 'seconds', 'rows_per_second'}
+            **options: start_row, start_col, batch_bytes, batch_rows, value_input_option
+
+        Returns:
+            Dict {'rows', 'seconds', 'rows_per_second'}
+        """
+        from sheets_transfer import import_file
+        return import_file(self, path, sheet_name, format=format, header=header,
+                           max_workers=max_workers, progress=progress, **options)
+
+    def scan(self, sheets=None, axis='rows', shard_size=None, max_workers=16, initial_workers=4,
+             value_render_option='FORMATTED_VALUE'):
+        """
+        Đọc song song cả sheet (hoặc mọi sheet) theo các shard rời nhau
+
+        Sheet được chia thành các khối dòng (axis='rows') hoặc khối cột
+        (axis='columns') theo kích thước lưới trong metadata; các khối được
+        đọc đồng thời, số request đồng thời tự giảm khi gặp 429 và tăng dần
+        khi không còn lỗi.
+
+        Args:
+            sheets: Tên sheet, list tên sheet, hoặc None cho mọi sheet
+            axis: 'rows' hoặc 'columns'
+            shard_size: Số dòng/cột mỗi shard (mặc định 5000 dòng hoặc 10 cột)
+            max_workers: Số request đồng thời tối đa
+            initial_workers: Số request đồng thời lúc bắt đầu
+
+        Returns:
+            Dict {tên sheet: list of lists}
+        """
+        from sheets_scan import scan
+        return scan(self, sheets, axis, shard_size, max_workers, initial_workers, value_render_option)
+
+    def iter_scan(self, sheets=None, axis='rows', shard_size=None, max_workers=16,
+                  initial_workers=4, ordered=False, value_render_option='FORMATTED_VALUE'):
+        """
+        Như scan() nhưng trả về từng shard ngay khi đọc xong (generator)
+
+        Yields:
+            ShardResult(shard, values); ordered=True để theo thứ tự vị trí
+        """
+        from sheets_scan import iter_scan
+        return iter_scan(self, sheets, axis, shard_size, max_workers, initial_workers,
+                         ordered, value_render_option)
+
+    def select(self, sheet, columns=None, where=None, group_by=None, aggregates=None,
+               header_row=1, chunk_rows=None, dtypes=None):
+        """
+        Chọn cột, lọc và gom nhóm dữ liệu của một sheet có dòng tiêu đề
+
+        Dòng tiêu đề được cache để biết vị trí từng cột; chỉ các cột cần cho
+        columns/where/group_by/aggregates được đọc, mỗi khối cột liền nhau là
+        một range trong cùng một request batchGet. Lọc và gom nhóm chạy trên
+        mảng NumPy. Cần cài numpy.
+
+        Args:
+            sheet: Tên sheet
+            columns: List tên cột cần lấy (None = mọi cột)
+            where: List điều kiện (cột, toán tử, giá trị), kết hợp bằng AND.
+                Toán tử: '==', '!=', '<', '<=', '>', '>=', 'in', 'not in',
+                'isnull', 'notnull'. Dict {cột: giá trị} nghĩa là '=='
+            group_by: Tên cột hoặc list tên cột để gom nhóm
+            aggregates: Dict {cột: hàm hoặc list hàm}, hàm là 'count', 'sum',
+                'mean', 'min', 'max'; {'*': 'count'} đếm số dòng (mặc định khi gom nhóm)
+            header_row: Dòng chứa tên cột
+            chunk_rows: Đọc theo từng khối chunk_rows dòng (None = một lần)
+            dtypes: Dict {tên cột: kiểu} như read_table
+
+        Returns:
+            SheetTable; khi gom nhóm gồm các cột group_by và các cột 'hàm(cột)'
+
+        Ví dụ:
+            table = service.select('Sheet1', ['Tên', 'Tuổi'], where=[('Tuổi', '>=', 18)])
+            stats = service.select('Sheet1', group_by='Thành phố', aggregates={'Tuổi': ['mean', 'max']})
+        """
+        return self.query_engine.select(sheet, columns, where, group_by, aggregates,
+                                        header_row, chunk_rows, dtypes)
+
+    def iter_select(self, sheet, columns=None, where=None, header_row=1, chunk_rows=5000,
+                    dtypes=None):
+        """
+        Như select() không gom nhóm nhưng trả về từng khối kết quả (generator)
+
+        Mỗi lần đọc chunk_rows dòng của các cột cần dùng, nên bộ nhớ chỉ giữ
+        một khối bất kể sheet lớn đến đâu. Dừng ở khối rỗng đầu tiên.
+
+        Yields:
+            SheetTable của các dòng thỏa where trong từng khối
+        """
+        return self.query_engine.iter_select(sheet, columns, where, header_row, chunk_rows, dtypes)
+
+    def key_index(self, sheet, key_column='A', header_rows=1, first_col='A', verify_interval=5.0):
+        """
+        Chỉ mục khóa -> số dòng của một sheet theo cột khóa (tạo ở lần gọi đầu)
+
+        Chỉ mục được xây bằng một lần đọc riêng cột khóa và tự cập nhật theo
+        các lần ghi/thêm/xóa của service này. Thay đổi từ nơi khác được phát
+        hiện bằng một ô checksum trên sheet ẩn '_index' (đọc tối đa mỗi
+        verify_interval giây), khi đó chỉ mục được xây lại.
+
+        Args:
+            sheet: Tên sheet
+            key_column: Cột chứa khóa (ví dụ 'A' cho cột ID)
+            header_rows: Số dòng tiêu đề
+            first_col: Cột đầu tiên của một dòng dữ liệu
+            verify_interval: Số giây tối thiểu giữa hai lần kiểm tra checksum
+
+        Returns:
+            KeyIndex
+        """
+        key = (self.spreadsheet_id, sheet, key_column.upper())
+        index = self.key_indexes.get(key)
+        if index is None:
+            index = self.key_indexes[key] = KeyIndex(self, sheet, key_column, header_rows,
+                                                     first_col, verify_interval)
+        return index
+
+    def get_by_key(self, sheet, key, key_column='A'):
+        """
+        Đọc dòng có khóa key mà không đọc cả sheet (xem key_index)
+
+        Returns:
+            List giá trị của dòng, None nếu không có khóa
+        """
+        return self.key_index(sheet, key_column).get_by_key(key)
+
+    def upsert(self, sheet, key, row, key_column='A'):
+        """
+        Ghi đè dòng có khóa key, hoặc thêm dòng mới nếu khóa chưa có (xem key_index)
+
+        Returns:
+            Số dòng trên sheet đã ghi
+        """
+        return self.key_index(sheet, key_column).upsert(key, row)
+
+    def delete_by_key(self, sheet, key, key_column='A'):
+        """
+        Xóa nội dung dòng có khóa key (xem key_index)
+
+        Returns:
+            True nếu đã xóa, False nếu không có khóa
+        """
+        return self.key_index(sheet, key_column).delete_by_key(key)
+
+    def batch(self, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Tạo BatchBuilder gom thay đổi cấu trúc và ghi giá trị vào ít request nhất
+
+        Khác batch_update (chỉ values().batchUpdate), các thao tác thêm/xóa
+        sheet, chèn/xóa dòng cột, đổi kích thước lưới, định dạng và ghi giá trị
+        được gửi chung bằng spreadsheets().batchUpdate, chia theo max_bytes.
+        Cache metadata được cập nhật từ response, không cần đọc lại.
+
+        Returns:
+            BatchBuilder; gọi .execute() để gửi, nhận BatchResult(replies, sheet_ids, calls)
+
+        Ví dụ:
+            result = (service.batch()
+                      .add_sheet('Báo cáo', rows=200, cols=8)
+                      .values('Báo cáo!A1:C1', [['Tháng', 'Doanh thu', 'Chi phí']])
+                      .format_header('Báo cáo')
+                      .execute())
+        """
+        return BatchBuilder(self, max_bytes)
+
+    def enable_write_buffer(self, max_cells=1000, max_delay=1.0):
+        """
+        Bật chế độ bộ đệm ghi cho write_data
+
+        Các lần gọi write_data sẽ được gom lại và gửi bằng một batchUpdate khi
+        đủ max_cells ô, sau max_delay giây, hoặc khi gọi flush().
+        """
+        if self.write_buffer is None:
+            self.write_buffer = WriteBuffer(self._send_buffered, max_cells, max_delay)
+        return self.write_buffer
+
+    def _send_buffered(self, data_list):
+        # Bộ đệm có thể gửi từ thread hẹn giờ (max_delay): dùng kết nối của thread đang gửi
+        return self._send_batch_update(data_list, http=self._thread_http())
+
+    def disable_write_buffer(self):
+        """Gửi các lần ghi còn lại và tắt bộ đệm ghi"""
+        if self.write_buffer is not None:
+            buffer, self.write_buffer = self.write_buffer, None
+            buffer.close()
+
+    def flush(self):
+        """
+        Gửi ngay các lần ghi đang chờ trong bộ đệm
+
+        Returns:
+            Tổng số cells đã cập nhật (0 nếu không có gì để gửi)
+        """
+        if self.write_buffer is None:
+            return 0
+        return self.write_buffer.flush()
+
+    def watch(self, range_name, callback, tail=False, min_interval=2.0, max_interval=60.0,
+              on_error=None, **options):
+        """
+        Theo dõi thay đổi của một phạm vi, gọi callback(changes) khi có ô thay đổi
+
+        tail=True dành cho sheet chỉ thêm dòng (log của append_data): chỉ đọc
+        các dòng sau dòng cuối đã thấy. Ngược lại, phạm vi được chia thành
+        các khối dòng có ô công thức fingerprint trên sheet ẩn '_watch'; mỗi
+        lần poll chỉ đọc các fingerprint và tải lại khối nào có thay đổi.
+
+        Args:
+            range_name: Phạm vi (ví dụ: 'Sheet1!A1:F' hoặc 'Log!A:D')
+            callback: Hàm nhận list CellChange(row, col, old, new), gọi trong thread nền
+            tail: True để theo dõi cuối sheet chỉ thêm dòng
+            min_interval, max_interval: Khoảng chu kỳ poll (giây), tự điều chỉnh
+                theo tần suất thay đổi
+            on_error: Hàm nhận exception khi poll lỗi (poll vẫn tiếp tục)
+            **options: from_row (tail), block_rows và full_refresh_every (khối)
+
+        Returns:
+            Watch (gọi stop() để ngừng)
+        """
+        if self.watcher is None:
+            from sheets_watch import Watcher
+            self.watcher = Watcher(self)
+        return self.watcher.add(range_name, callback, tail=tail, min_interval=min_interval,
+                                max_interval=max_interval, on_error=on_error, **options)
+
+    def stop_watching(self):
+        """Ngừng mọi watch và dừng thread theo dõi"""
+        watcher, self.watcher = self.watcher, None
+        if watcher is not None:
+            watcher.close()
+
+    def enable_metrics(self, metrics=None, span_file=None, span_endpoint=None):
+        """
+        Bật đo đạc cho mọi request: độ trễ, số byte, số ô, lỗi quota, thử lại
+
+        Args:
+            metrics: SheetsMetrics có sẵn để dùng chung (None = tạo mới)
+            span_file: File JSONL nhận span của từng request
+            span_endpoint: URL nhận span qua POST
+
+        Returns:
+            SheetsMetrics (to_prometheus(), serve(port), snapshot())
+        """
+        if metrics is None:
+            metrics = self.metrics or SheetsMetrics(span_file, span_endpoint)
+        self.metrics = metrics
+        return metrics
+
+    def disable_metrics(self):
+        """Tắt đo đạc; vòng gửi request trở lại như khi chưa bật"""
+        metrics, self.metrics = self.metrics, None
+        if metrics is not None and (self.manager is None or metrics is not self.manager.metrics):
+            metrics.close()
+
+    def enable_journal(self, path=None, **options):
+        """
+        Bật journal ghi trước trên đĩa cho write_data và append_data
+
+        Mỗi lần ghi/thêm được lưu xuống file SQLite trước rồi mới gửi bởi một
+        thread nền, nên không bị mất khi mất mạng, hết quota hay process bị
+        dừng. Mutation còn lại từ lần chạy trước được gửi tiếp ngay khi bật.
+        Các thao tác khác (đọc, clear_data, batch_update, batch()...) chờ journal
+        gửi hết trước khi chạy để giữ đúng thứ tự đã gọi.
+
+        Args:
+            path: File journal (mặc định lấy từ JOURNAL_FILE hoặc 'sheets_journal.db')
+            **options: Tham số thêm cho SheetsJournal (max_batch_rows, retry_interval...)
+        """
+        if self.journal is None:
+            path = path or os.getenv('JOURNAL_FILE', 'sheets_journal.db')
+            self.journal = SheetsJournal(self, path, **options)
+        return self.journal
+
+    def disable_journal(self):
+        """Dừng thread gửi của journal; mutation chưa gửi được giữ lại trong file"""
+        if self.journal is not None:
+            journal, self.journal = self.journal, None
+            journal.close()
+
+    def _flush_pending(self, journal=True):
+        # Các thao tác khác phải thấy được những gì process này đã ghi, theo đúng
+        # thứ tự đã gọi: gửi hết bộ đệm ghi và các mutation còn trong journal trước
+        if self.write_buffer is not None and self.write_buffer.pending:
+            self.write_buffer.flush()
+        if journal and self.journal is not None and self.journal.pending:
+            self.journal.flush()
+
+    def _update_indexes(self, kind, range_name, values=None, spreadsheet_id=None):
+        """
+        Cập nhật các KeyIndex và bỏ snapshot sync() bị ảnh hưởng sau một lần ghi
+        ('write'), thêm ('append') hoặc xóa ('clear')
+        """
+        spreadsheet_id = spreadsheet_id or self.spreadsheet_id
+        self.delta_sync.invalidate(range_name, spreadsheet_id)
+        for index in list(self.key_indexes.values()):
+            if index.spreadsheet_id != spreadsheet_id:
+                continue
+            if kind == 'write':
+                index.observe_write(range_name, values)
+            elif kind == 'append':
+                index.observe_append(range_name, values)
+            else:
+                index.observe_clear(range_name)
 
+    def _patch_cache(self, range_name, result, spreadsheet_id=None):
+        """Cập nhật cache bằng giá trị thực tế API trả về sau khi ghi (updatedData)"""
+        if self.cache is None:
+            return
+        spreadsheet_id = spreadsheet_id or self.spreadsheet_id
+        updated = result.get('updatedData')
+        if updated and 'range' in updated:
+            self.cache.patch(spreadsheet_id, updated['range'], updated.get('values', []))
+        else:
+            self.cache.invalidate(spreadsheet_id, result.get('updatedRange', range_name))
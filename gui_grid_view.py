@@ -0,0 +1,232 @@
+"""
+GUI Grid View - Bảng hiển thị ảo hóa cho kết quả đọc lớn
+"""
+
+import json
+import os
+import tempfile
+import tkinter as tk
+from array import array
+from tkinter import ttk
+
+from sheets_range import index_to_column
+
+
+class RowStore:
+    """
+    Các dòng đã nạp, lưu trong file tạm (mỗi dòng một JSON)
+
+    Trong RAM chỉ giữ vị trí bắt đầu của mỗi khối BLOCK_ROWS dòng; read()
+    đọc các khối chứa phạm vi cần lấy và chỉ giải mã các dòng được yêu cầu,
+    nên bộ nhớ gần như không tăng theo kích thước dữ liệu.
+    """
+
+    BLOCK_ROWS = 256
+
+    def __init__(self):
+        self._file = tempfile.TemporaryFile()
+        self._blocks = array('Q')
+        self._count = 0
+        self._end = 0
+
+    def __len__(self):
+        return self._count
+
+    def extend(self, rows):
+        parts = []
+        for row in rows:
+            if self._count % self.BLOCK_ROWS == 0:
+                self._blocks.append(self._end)
+            line = json.dumps(row, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+            parts.append(line)
+            self._end += len(line)
+            self._count += 1
+        self._file.seek(0, os.SEEK_END)
+        self._file.write(b''.join(parts))
+
+    def read(self, start, stop):
+        """Các dòng [start, stop) dưới dạng tuple"""
+        stop = min(stop, self._count)
+        if start >= stop:
+            return []
+        first, last = start // self.BLOCK_ROWS, (stop - 1) // self.BLOCK_ROWS + 1
+        begin = self._blocks[first]
+        end = self._blocks[last] if last < len(self._blocks) else self._end
+        self._file.seek(begin)
+        lines = self._file.read(end - begin).split(b'\n')
+        skip = start - first * self.BLOCK_ROWS
+        return [tuple(json.loads(line)) for line in lines[skip:skip + stop - start]]
+
+    def close(self):
+        self._file.close()
+
+
+class GridView(tk.Frame):
+    """
+    Bảng dữ liệu chỉ tạo widget cho các dòng đang nhìn thấy
+
+    Treeview chỉ giữ đúng số item vừa với chiều cao khung nhìn; khi cuộn,
+    các item này được gán lại giá trị của dòng tương ứng thay vì tạo mới.
+    Thanh cuộn dọc tự quản lý theo tổng số dòng, nên chi phí vẽ và số
+    widget không phụ thuộc vào kích thước dữ liệu. Dữ liệu được nạp dần
+    bằng append_rows() khi từng phần kết quả về tới và được ghi ra file tạm
+    (RowStore); chỉ các dòng đang nhìn thấy được đọc lại vào bộ nhớ.
+
+    Ví dụ:
+        grid = GridView(parent)
+        grid.reset(start_row=1, start_col=1)
+        grid.append_rows(chunk)   # gọi trên main loop, mỗi khi có chunk mới
+    """
+
+    # Chiều rộng cột (pixel)
+    COLUMN_WIDTH = 120
+    ROW_NUMBER_WIDTH = 60
+
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+
+        self._rows = RowStore()
+        self._num_cols = 0
+        self._start_row = 1
+        self._start_col = 1
+        self._offset = 0
+        self._items = []
+        self._refresh_pending = False
+        self._style = ttk.Style(self)
+
+        # Item được dùng lại cho nhiều dòng nên không cho chọn
+        self.tree = ttk.Treeview(self, show='headings', selectmode='none')
+        self.vbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.hbar = ttk.Scrollbar(self, orient=tk.HORIZONTAL, command=self.tree.xview)
+        self.tree.configure(xscrollcommand=self.hbar.set)
+
+        self.tree.grid(row=0, column=0, sticky='nsew')
+        self.vbar.grid(row=0, column=1, sticky='ns')
+        self.hbar.grid(row=1, column=0, sticky='ew')
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+
+        self.tree.bind('<Configure>', lambda e: self._schedule_refresh())
+        self.tree.bind('<MouseWheel>', self._on_mousewheel)
+        self.tree.bind('<Button-4>', lambda e: self.scroll_rows(-3))
+        self.tree.bind('<Button-5>', lambda e: self.scroll_rows(3))
+        self.tree.bind('<Up>', lambda e: self._on_key(-1))
+        self.tree.bind('<Down>', lambda e: self._on_key(1))
+        self.tree.bind('<Prior>', lambda e: self._on_key(-self._visible_rows()))
+        self.tree.bind('<Next>', lambda e: self._on_key(self._visible_rows()))
+        self.tree.bind('<Home>', lambda e: self._on_key(-len(self._rows)))
+        self.tree.bind('<End>', lambda e: self._on_key(len(self._rows)))
+
+        self._set_columns(0)
+
+    @property
+    def row_count(self):
+        """Số dòng đã nạp"""
+        return len(self._rows)
+
+    def reset(self, start_row=1, start_col=1):
+        """
+        Xóa dữ liệu cũ để chuẩn bị nạp kết quả mới
+
+        Args:
+            start_row: Số thứ tự dòng trên sheet của dòng dữ liệu đầu tiên
+            start_col: Số thứ tự cột trên sheet của cột dữ liệu đầu tiên
+        """
+        self._rows.close()
+        self._rows = RowStore()
+        self._start_row = start_row
+        self._start_col = start_col
+        self._offset = 0
+        self._set_columns(0)
+        self._schedule_refresh()
+
+    def append_rows(self, rows):
+        """Nạp thêm một phần dữ liệu (list of lists); chỉ gọi trên main loop"""
+        if not rows:
+            return
+        self._rows.extend(rows)
+        width = max(len(row) for row in rows)
+        if width > self._num_cols:
+            self._set_columns(width)
+        self._schedule_refresh()
+
+    def destroy(self):
+        self._rows.close()
+        super().destroy()
+
+    def scroll_rows(self, delta):
+        """Cuộn delta dòng (âm là lên trên)"""
+        self._move_to(self._offset + delta)
+
+    def _visible_rows(self):
+        row_height = self._style.lookup('Treeview', 'rowheight') or 20
+        # Trừ một dòng cho phần tiêu đề cột
+        return max(1, self.tree.winfo_height() // int(row_height) - 1)
+
+    def _max_offset(self):
+        return max(0, len(self._rows) - self._visible_rows())
+
+    def _move_to(self, offset):
+        offset = max(0, min(int(offset), self._max_offset()))
+        if offset != self._offset:
+            self._offset = offset
+            self._schedule_refresh()
+
+    def _set_columns(self, num_cols):
+        self._num_cols = num_cols
+        columns = ['row'] + [f'c{i}' for i in range(num_cols)]
+        self.tree.configure(columns=columns, displaycolumns=columns)
+        self.tree.heading('row', text='#')
+        self.tree.column('row', width=self.ROW_NUMBER_WIDTH, minwidth=40, anchor=tk.E, stretch=False)
+        for i in range(num_cols):
+            self.tree.heading(f'c{i}', text=index_to_column(self._start_col + i))
+            self.tree.column(f'c{i}', width=self.COLUMN_WIDTH, minwidth=40, stretch=False)
+
+    def _schedule_refresh(self):
+        # Gộp nhiều thay đổi trong cùng một chu kỳ thành một lần vẽ lại
+        if not self._refresh_pending:
+            self._refresh_pending = True
+            self.after_idle(self._refresh)
+
+    def _refresh(self):
+        self._refresh_pending = False
+        visible = self._visible_rows()
+        self._offset = max(0, min(self._offset, self._max_offset()))
+
+        # Chỉ giữ đúng số item vừa khung nhìn
+        while len(self._items) < visible:
+            self._items.append(self.tree.insert('', tk.END, values=()))
+        while len(self._items) > visible:
+            self.tree.delete(self._items.pop())
+
+        rows = self._rows.read(self._offset, self._offset + len(self._items))
+        for i, item in enumerate(self._items):
+            index = self._offset + i
+            if i < len(rows):
+                row = rows[i]
+                values = (self._start_row + index,) + row + ('',) * (self._num_cols - len(row))
+            else:
+                values = ()
+            self.tree.item(item, values=values)
+
+        total = len(self._rows)
+        if total:
+            self.vbar.set(self._offset / total, min(1.0, (self._offset + visible) / total))
+        else:
+            self.vbar.set(0.0, 1.0)
+
+    def _on_scrollbar(self, *args):
+        if args[0] == 'moveto':
+            self._move_to(float(args[1]) * len(self._rows))
+        elif args[0] == 'scroll':
+            step = self._visible_rows() if args[2] == 'pages' else 1
+            self.scroll_rows(int(args[1]) * step)
+
+    def _on_mousewheel(self, event):
+        # Windows báo bội số của 120, macOS báo số nhỏ
+        delta = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        self.scroll_rows(-3 * delta)
+
+    def _on_key(self, delta):
+        self.scroll_rows(delta)
+        return 'break'
@@ -0,0 +1,90 @@
+"""
+GUI Log Sink - Ghi log vào Text widget theo lô, an toàn với mọi thread
+"""
+
+import collections
+import threading
+import tkinter as tk
+
+
+class LogSink:
+    """
+    Hàng đợi log cho Text widget
+
+    write() chỉ đưa dòng vào hàng đợi (gọi được từ bất kỳ thread nào). Main
+    loop lấy hàng đợi theo chu kỳ after() và chèn cả lô bằng một lần insert.
+    Widget giữ tối đa max_lines dòng, dòng cũ nhất bị cắt bỏ. Khi log được
+    sinh ra nhanh hơn khả năng hiển thị, hàng đợi giữ các dòng mới nhất và
+    thay phần bị bỏ bằng một dòng tóm tắt.
+    """
+
+    def __init__(self, root, widget, max_lines=5000, max_pending=10000,
+                 max_batch=1000, flush_interval=50):
+        """
+        Args:
+            root: Cửa sổ Tk
+            widget: Text/ScrolledText nhận log
+            max_lines: Số dòng tối đa giữ trong widget
+            max_pending: Số dòng tối đa chờ trong hàng đợi; vượt quá thì bỏ dòng cũ
+            max_batch: Số dòng tối đa chèn trong một chu kỳ
+            flush_interval: Chu kỳ (ms) đẩy log lên widget
+        """
+        self.root = root
+        self.widget = widget
+        self.max_lines = max_lines
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+
+        self._pending = collections.deque(maxlen=max_pending)
+        self._dropped = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self.root.after(self.flush_interval, self._drain)
+
+    def write(self, line):
+        """Đưa một dòng (kèm '\\n') vào hàng đợi"""
+        with self._lock:
+            if len(self._pending) == self._pending.maxlen:
+                self._dropped += 1
+            self._pending.append(line)
+
+    def clear(self):
+        """Xóa widget và các dòng đang chờ"""
+        with self._lock:
+            self._pending.clear()
+            self._dropped = 0
+        self.widget.delete('1.0', tk.END)
+
+    def close(self):
+        """Dừng chu kỳ đẩy log"""
+        self._closed = True
+
+    def _take_batch(self):
+        with self._lock:
+            count = min(self.max_batch, len(self._pending))
+            batch = [self._pending.popleft() for _ in range(count)]
+            dropped, self._dropped = self._dropped, 0
+        if dropped:
+            batch.insert(0, f"… bỏ qua {dropped} dòng log do hiển thị không kịp …\n")
+        return batch
+
+    def _drain(self):
+        batch = self._take_batch()
+        if batch:
+            # Chỉ tự cuộn xuống khi người dùng đang xem cuối log
+            at_bottom = self.widget.yview()[1] >= 0.999
+            self.widget.insert(tk.END, ''.join(batch))
+            self._trim()
+            if at_bottom:
+                self.widget.see(tk.END)
+
+        if not self._closed:
+            self.root.after(self.flush_interval, self._drain)
+
+    def _trim(self):
+        # 'end-1c' là vị trí sau ký tự cuối; dòng cuối luôn rỗng vì mỗi log kết thúc bằng '\n'
+        lines = int(self.widget.index('end-1c').split('.')[0]) - 1
+        excess = lines - self.max_lines
+        if excess > 0:
+            self.widget.delete('1.0', f'{excess + 1}.0')
@@ -0,0 +1,122 @@
+"""
+GUI Task Scheduler - Chạy tác vụ nền bằng thread pool và trả kết quả về Tk main loop
+"""
+
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TaskScheduler:
+    """
+    Bộ lập lịch tác vụ cho giao diện Tkinter
+
+    Tác vụ chạy trên một thread pool giới hạn, xếp hàng khi pool bận. Thread
+    nền không bao giờ chạm vào widget: kết quả được đưa vào hàng đợi và được
+    main loop lấy ra theo chu kỳ after(), mỗi lần chỉ xử lý trong một khoảng
+    thời gian ngắn để giao diện vẫn mượt. Tác vụ có cùng key đang chạy/chờ
+    sẽ không bị gửi lại, và tác vụ đang chờ có thể bị hủy.
+    """
+
+    def __init__(self, root, max_workers=4, poll_interval=16, frame_budget=0.008):
+        """
+        Args:
+            root: Cửa sổ Tk
+            max_workers: Số thread làm việc tối đa
+            poll_interval: Chu kỳ (ms) main loop lấy kết quả (16ms ~ 60fps)
+            frame_budget: Thời gian tối đa (giây) xử lý callback trong mỗi chu kỳ
+        """
+        self.root = root
+        self.poll_interval = poll_interval
+        self.frame_budget = frame_budget
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='gui-task')
+        self._callbacks = queue.SimpleQueue()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self.root.after(self.poll_interval, self._poll)
+
+    @property
+    def pending_count(self):
+        """Số tác vụ đang chạy hoặc đang chờ"""
+        with self._lock:
+            return len(self._inflight)
+
+    def submit(self, func, *args, key=None, on_success=None, on_error=None):
+        """
+        Gửi một tác vụ chạy nền
+
+        Args:
+            func: Hàm chạy trên thread nền (không được chạm vào widget)
+            *args: Tham số của func
+            key: Khóa để gộp tác vụ trùng; nếu đang có tác vụ cùng key chưa xong
+                thì không gửi lại. None để không gộp
+            on_success: Callback(result) chạy trên main loop
+            on_error: Callback(exception) chạy trên main loop
+
+        Returns:
+            Future của tác vụ (hoặc Future của tác vụ trùng đang chạy)
+        """
+        with self._lock:
+            if key is not None and key in self._inflight:
+                return self._inflight[key]
+
+            future = self._executor.submit(func, *args)
+            token = key if key is not None else future
+            self._inflight[token] = future
+
+        def done(finished):
+            with self._lock:
+                if self._inflight.get(token) is finished:
+                    del self._inflight[token]
+            if finished.cancelled():
+                return
+            error = finished.exception()
+            if error is not None:
+                if on_error is not None:
+                    self.call_in_main(on_error, error)
+            elif on_success is not None:
+                self.call_in_main(on_success, finished.result())
+
+        future.add_done_callback(done)
+        return future
+
+    def call_in_main(self, func, *args):
+        """Yêu cầu chạy func(*args) trên main loop; gọi được từ bất kỳ thread nào"""
+        self._callbacks.put((func, args))
+
+    def cancel_pending(self):
+        """
+        Hủy các tác vụ đang xếp hàng (tác vụ đang chạy không bị ảnh hưởng)
+
+        Returns:
+            Số tác vụ đã hủy
+        """
+        with self._lock:
+            futures = list(self._inflight.values())
+        return sum(1 for future in futures if future.cancel())
+
+    def _poll(self):
+        deadline = time.monotonic() + self.frame_budget
+        while time.monotonic() < deadline:
+            try:
+                func, args = self._callbacks.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                func(*args)
+            except Exception:
+                # Lỗi trong callback không được làm dừng vòng lấy kết quả
+                self.root.report_callback_exception(*sys.exc_info())
+
+        if not self._closed:
+            self.root.after(self.poll_interval, self._poll)
+
+    def shutdown(self):
+        """Hủy tác vụ đang chờ và dừng thread pool"""
+        self._closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,378 @@
+"""
+Sheets Batch - Gom thay đổi cấu trúc (thêm sheet, chèn dòng, định dạng) và ghi giá trị vào ít lần spreadsheets.batchUpdate nhất
+"""
+
+import json
+import random
+from collections import namedtuple
+
+from googleapiclient.errors import HttpError
+
+from sheets_metadata import METADATA_FIELDS, SpreadsheetMetadata
+from sheets_range import column_to_index, parse_range, quote_sheet_name
+
+# Một request batchUpdate nên nhỏ hơn ~2MB; để dư cho phần JSON bao ngoài
+DEFAULT_MAX_BYTES = 1_000_000
+
+# Response chỉ cần replies và metadata mới để cập nhật cache
+RESPONSE_FIELDS = f'replies,updatedSpreadsheet({METADATA_FIELDS})'
+
+BatchResult = namedtuple('BatchResult', ['replies', 'sheet_ids', 'calls'])
+BatchResult.__doc__ = ("Kết quả execute(): replies theo thứ tự request, "
+                       "{tên sheet mới: sheetId} và số lần gọi API")
+
+
+def _color(value):
+    """'#RRGGBB' -> Color của Sheets API"""
+    value = value.lstrip('#')
+    if len(value) != 6:
+        raise ValueError(f"Màu phải có dạng '#RRGGBB', không phải '{value}'")
+    return {name: int(value[i:i + 2], 16) / 255
+            for name, i in (('red', 0), ('green', 2), ('blue', 4))}
+
+
+def _cell_value(value):
+    """Giá trị Python -> CellData (số, bool, công thức bắt đầu bằng '=', còn lại là chuỗi)"""
+    if value is None or value == '':
+        return {}
+    if isinstance(value, bool):
+        return {'userEnteredValue': {'boolValue': value}}
+    if isinstance(value, (int, float)):
+        return {'userEnteredValue': {'numberValue': value}}
+    text = str(value)
+    if text.startswith('='):
+        return {'userEnteredValue': {'formulaValue': text}}
+    return {'userEnteredValue': {'stringValue': text}}
+
+
+class BatchBuilder:
+    """
+    Gom nhiều thay đổi của một spreadsheet rồi gửi bằng spreadsheets().batchUpdate
+
+    Các thao tác được gửi đúng thứ tự đã thêm, chia thành ít request nhất
+    mà mỗi request không vượt quá max_bytes. Sheet thêm mới được cấp sẵn
+    sheetId nên các thao tác sau trong cùng lô có thể dùng tên của nó.
+
+    Ví dụ:
+        result = (service.batch()
+                  .add_sheet('Báo cáo', rows=200, cols=8)
+                  .values('Báo cáo!A1:C1', [['Tháng', 'Doanh thu', 'Chi phí']])
+                  .format_header('Báo cáo', background='#D9EAD3')
+                  .insert_rows('Sheet1', 2, count=5)
+                  .execute())
+        print(result.sheet_ids['Báo cáo'])
+    """
+
+    def __init__(self, service, max_bytes=DEFAULT_MAX_BYTES):
+        self.service = service
+        self.max_bytes = max_bytes
+        self.requests = []
+        self._sheet_ids = {}
+        self._added = {}
+        self._touched = set()
+        self._metadata = None
+
+    def __len__(self):
+        return len(self.requests)
+
+    # Tra cứu sheet
+
+    def _sheet_id(self, title):
+        if title in self._sheet_ids:
+            if self._sheet_ids[title] is None:
+                raise ValueError(f"Sheet '{title}' đã bị xóa trong lô này")
+            return self._sheet_ids[title]
+        if self._metadata is None:
+            self._metadata = self.service.get_metadata()
+        sheet = self._metadata.sheet(title)
+        if sheet is None:
+            self._metadata = self.service.get_metadata(refresh=True)
+            sheet = self._metadata.sheet(title)
+        if sheet is None:
+            raise ValueError(f"Không tìm thấy sheet '{title}'")
+        self._sheet_ids[title] = sheet.sheet_id
+        return sheet.sheet_id
+
+    def _grid_range(self, range_name):
+        rng = parse_range(range_name)
+        if rng is None:
+            raise ValueError(f"Range không hợp lệ: '{range_name}'")
+        title = rng.sheet
+        if title is None:
+            if self._metadata is None:
+                self._metadata = self.service.get_metadata()
+            title = self._metadata.sheet_titles[0]
+        grid = {'sheetId': self._sheet_id(title),
+                'startRowIndex': rng.start_row - 1, 'startColumnIndex': rng.start_col - 1}
+        if rng.end_row is not None:
+            grid['endRowIndex'] = rng.end_row
+        if rng.end_col is not None:
+            grid['endColumnIndex'] = rng.end_col
+        self._touched.add(title)
+        return grid
+
+    def request(self, request, sheet=None):
+        """Thêm một request bất kỳ của spreadsheets.batchUpdate (dict như tài liệu API)"""
+        self.requests.append(request)
+        if sheet is not None:
+            self._touched.add(sheet)
+        return self
+
+    # Sheet
+
+    def add_sheet(self, title, rows=1000, cols=26, hidden=False, index=None, frozen_rows=0):
+        """Thêm sheet mới; sheetId được cấp sẵn để các thao tác sau dùng được tên sheet"""
+        if self._metadata is None:
+            self._metadata = self.service.get_metadata()
+        if self._metadata.sheet(title) is not None or self._sheet_ids.get(title) is not None:
+            raise ValueError(f"Sheet '{title}' đã tồn tại")
+        used = {sheet.sheet_id for sheet in self._metadata.sheets} | set(self._added.values())
+        sheet_id = random.randint(1, 2 ** 31 - 1)
+        while sheet_id in used:
+            sheet_id = random.randint(1, 2 ** 31 - 1)
+
+        properties = {
+            'sheetId': sheet_id,
+            'title': title,
+            'hidden': hidden,
+            'gridProperties': {'rowCount': rows, 'columnCount': cols, 'frozenRowCount': frozen_rows},
+        }
+        if index is not None:
+            properties['index'] = index
+        self._sheet_ids[title] = self._added[title] = sheet_id
+        return self.request({'addSheet': {'properties': properties}}, title)
+
+    def delete_sheet(self, title):
+        sheet_id = self._sheet_id(title)
+        self._sheet_ids[title] = None
+        self._added.pop(title, None)
+        return self.request({'deleteSheet': {'sheetId': sheet_id}}, title)
+
+    def rename_sheet(self, title, new_title):
+        sheet_id = self._sheet_id(title)
+        self._sheet_ids[title] = None
+        self._sheet_ids[new_title] = sheet_id
+        if title in self._added:
+            self._added[new_title] = self._added.pop(title)
+        self._touched.add(new_title)
+        return self.request({'updateSheetProperties': {
+            'properties': {'sheetId': sheet_id, 'title': new_title}, 'fields': 'title'
+        }}, title)
+
+    def resize(self, sheet, rows=None, cols=None):
+        """Đặt kích thước lưới của sheet"""
+        grid, fields = {}, []
+        if rows is not None:
+            grid['rowCount'] = rows
+            fields.append('gridProperties.rowCount')
+        if cols is not None:
+            grid['columnCount'] = cols
+            fields.append('gridProperties.columnCount')
+        if not fields:
+            return self
+        return self.request({'updateSheetProperties': {
+            'properties': {'sheetId': self._sheet_id(sheet), 'gridProperties': grid},
+            'fields': ','.join(fields)
+        }}, sheet)
+
+    def freeze(self, sheet, rows=0, cols=0):
+        """Cố định rows dòng đầu và cols cột đầu"""
+        return self.request({'updateSheetProperties': {
+            'properties': {'sheetId': self._sheet_id(sheet),
+                           'gridProperties': {'frozenRowCount': rows, 'frozenColumnCount': cols}},
+            'fields': 'gridProperties.frozenRowCount,gridProperties.frozenColumnCount'
+        }}, sheet)
+
+    # Dòng/cột
+
+    def _dimension(self, kind, sheet, dimension, start, count, **extra):
+        body = {'range': {'sheetId': self._sheet_id(sheet), 'dimension': dimension,
+                          'startIndex': start - 1, 'endIndex': start - 1 + count}}
+        body.update(extra)
+        return self.request({kind: body}, sheet)
+
+    def insert_rows(self, sheet, start_row, count=1, inherit_from_before=False):
+        """Chèn count dòng trống tại start_row (bắt đầu từ 1), các dòng cũ bị đẩy xuống"""
+        return self._dimension('insertDimension', sheet, 'ROWS', start_row, count,
+                               inheritFromBefore=inherit_from_before)
+
+    def delete_rows(self, sheet, start_row, count=1):
+        return self._dimension('deleteDimension', sheet, 'ROWS', start_row, count)
+
+    def insert_columns(self, sheet, start_col, count=1, inherit_from_before=False):
+        if isinstance(start_col, str):
+            start_col = column_to_index(start_col)
+        return self._dimension('insertDimension', sheet, 'COLUMNS', start_col, count,
+                               inheritFromBefore=inherit_from_before)
+
+    def delete_columns(self, sheet, start_col, count=1):
+        if isinstance(start_col, str):
+            start_col = column_to_index(start_col)
+        return self._dimension('deleteDimension', sheet, 'COLUMNS', start_col, count)
+
+    def append_rows(self, sheet, count):
+        """Thêm count dòng vào cuối lưới"""
+        return self.request({'appendDimension': {
+            'sheetId': self._sheet_id(sheet), 'dimension': 'ROWS', 'length': count
+        }}, sheet)
+
+    def auto_resize(self, sheet, start_col=1, end_col=None):
+        """Tự chỉnh độ rộng cột theo nội dung"""
+        dimensions = {'sheetId': self._sheet_id(sheet), 'dimension': 'COLUMNS',
+                      'startIndex': start_col - 1}
+        if end_col is not None:
+            dimensions['endIndex'] = end_col
+        return self.request({'autoResizeDimensions': {'dimensions': dimensions}}, sheet)
+
+    # Định dạng và giá trị
+
+    def format(self, range_name, bold=None, italic=None, font_size=None, color=None,
+               background=None, number_format=None, horizontal_alignment=None, wrap=None):
+        """
+        Định dạng một phạm vi (chỉ các thuộc tính được truyền mới bị đổi)
+
+        Args:
+            color, background: Màu chữ/màu nền dạng '#RRGGBB'
+            number_format: Mẫu số, ví dụ '#,##0' hoặc 'dd/mm/yyyy'
+            horizontal_alignment: 'LEFT', 'CENTER' hoặc 'RIGHT'
+            wrap: True để xuống dòng trong ô
+        """
+        cell, fields = {}, []
+        text = {}
+        if bold is not None:
+            text['bold'] = bold
+        if italic is not None:
+            text['italic'] = italic
+        if font_size is not None:
+            text['fontSize'] = font_size
+        if color is not None:
+            text['foregroundColor'] = _color(color)
+        if text:
+            cell['textFormat'] = text
+            fields.extend(f'userEnteredFormat.textFormat.{name}' for name in text)
+        if background is not None:
+            cell['backgroundColor'] = _color(background)
+            fields.append('userEnteredFormat.backgroundColor')
+        if number_format is not None:
+            cell['numberFormat'] = {'type': 'NUMBER', 'pattern': number_format}
+            fields.append('userEnteredFormat.numberFormat')
+        if horizontal_alignment is not None:
+            cell['horizontalAlignment'] = horizontal_alignment
+            fields.append('userEnteredFormat.horizontalAlignment')
+        if wrap is not None:
+            cell['wrapStrategy'] = 'WRAP' if wrap else 'OVERFLOW_CELL'
+            fields.append('userEnteredFormat.wrapStrategy')
+        if not fields:
+            return self
+        return self.request({'repeatCell': {
+            'range': self._grid_range(range_name),
+            'cell': {'userEnteredFormat': cell},
+            'fields': ','.join(fields)
+        }})
+
+    def format_header(self, sheet, header_rows=1, background='#D9EAD3', freeze=True):
+        """Tô đậm, tô nền và (mặc định) cố định các dòng tiêu đề"""
+        self.format(f'{quote_sheet_name(sheet)}!1:{header_rows}', bold=True, background=background)
+        if freeze:
+            self.freeze(sheet, rows=header_rows)
+        return self
+
+    def values(self, range_name, values):
+        """
+        Ghi giá trị bắt đầu từ ô đầu của range_name (updateCells, cùng lô với thay đổi cấu trúc)
+
+        Số và bool được ghi đúng kiểu, chuỗi bắt đầu bằng '=' là công thức, còn
+        lại là chuỗi (không tự chuyển '25' thành số như USER_ENTERED). Dữ liệu
+        lớn được chia thành nhiều updateCells theo max_bytes.
+        """
+        grid = self._grid_range(range_name)
+        start = {'sheetId': grid['sheetId'], 'rowIndex': grid['startRowIndex'],
+                 'columnIndex': grid['startColumnIndex']}
+
+        rows, size = [], 0
+        for row in values:
+            data = {'values': [_cell_value(value) for value in row]}
+            rows.append(data)
+            size += len(json.dumps(data))
+            if size >= self.max_bytes // 2:
+                self.request({'updateCells': {'start': start, 'rows': rows, 'fields': 'userEnteredValue'}})
+                start = dict(start, rowIndex=start['rowIndex'] + len(rows))
+                rows, size = [], 0
+        if rows:
+            self.request({'updateCells': {'start': start, 'rows': rows, 'fields': 'userEnteredValue'}})
+        return self
+
+    # Gửi
+
+    def _chunks(self):
+        """Chia requests thành các nhóm liên tiếp, mỗi nhóm không quá max_bytes"""
+        chunk, size = [], 0
+        for request in self.requests:
+            request_size = len(json.dumps(request)) + 1
+            if chunk and size + request_size > self.max_bytes:
+                yield chunk
+                chunk, size = [], 0
+            chunk.append(request)
+            size += request_size
+        if chunk:
+            yield chunk
+
+    def execute(self):
+        """
+        Gửi mọi thao tác đã gom, cập nhật cache metadata bằng metadata trả về
+
+        Returns:
+            BatchResult(replies, sheet_ids, calls)
+        """
+        service = self.service
+        service._flush_pending()
+        chunks = list(self._chunks())
+        replies, calls = [], 0
+        updated = None
+        try:
+            for index, chunk in enumerate(chunks):
+                last = index == len(chunks) - 1
+                request = service.service.spreadsheets().batchUpdate(
+                    spreadsheetId=service.spreadsheet_id,
+                    body={'requests': chunk, 'includeSpreadsheetInResponse': last},
+                    fields=RESPONSE_FIELDS if last else 'replies'
+                )
+                result = service._execute(request, 'write', idempotent=False)
+                calls += 1
+                replies.extend(result.get('replies', []))
+                if last:
+                    updated = result.get('updatedSpreadsheet')
+        except HttpError as error:
+            # Import muộn để tránh import vòng với google_sheets_service
+            from google_sheets_service import SheetsApiError
+            raise SheetsApiError(
+                f"Lỗi khi gửi batchUpdate (đã gửi xong {calls}/{len(chunks)} lần): {error}", error)
+        finally:
+            self._after_execute(updated if calls == len(chunks) else None)
+
+        sheet_ids = {}
+        for reply in replies:
+            properties = reply.get('addSheet', {}).get('properties')
+            if properties:
+                sheet_ids[properties.get('title')] = properties.get('sheetId')
+        self.requests = []
+        return BatchResult(replies, sheet_ids, calls)
+
+    def _after_execute(self, updated):
+        """Cập nhật cache metadata và bỏ dữ liệu đã cache của các sheet bị ảnh hưởng"""
+        service = self.service
+        if updated and 'sheets' in updated:
+            service.metadata_cache.put(service.spreadsheet_id, SpreadsheetMetadata.from_response(updated))
+        else:
+            service.metadata_cache.invalidate(service.spreadsheet_id)
+
+        for title in self._touched:
+            if service.cache is not None:
+                service.cache.invalidate(service.spreadsheet_id, quote_sheet_name(title))
+            service.query_engine.forget(title)
+            service.delta_sync.invalidate(quote_sheet_name(title))
+            for index in service.key_indexes.values():
+                if index.spreadsheet_id == service.spreadsheet_id and index.sheet == title:
+                    index.stale = True
+        self._touched = set()
+        self._metadata = None
@@ -0,0 +1,252 @@
+"""
+Sheets Cache - Cache đọc trong bộ nhớ cho dữ liệu Google Sheets
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from sheets_range import A1Range, parse_range
+
+
+def _count_cells(values):
+    return sum(len(row) for row in values)
+
+
+def _min_end(a, b):
+    """min của hai biên, trong đó None nghĩa là không giới hạn"""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a, b)
+
+
+def _trim(rows):
+    """Bỏ các ô rỗng cuối mỗi dòng và các dòng rỗng cuối, giống cách API trả về"""
+    for row in rows:
+        while row and row[-1] in ('', None):
+            row.pop()
+    while rows and not rows[-1]:
+        rows.pop()
+    return rows
+
+
+class _Block:
+    """Một khối dữ liệu đã cache: phạm vi đã đọc và giá trị của nó"""
+
+    __slots__ = ('rng', 'values', 'cells', 'expires_at')
+
+    def __init__(self, rng, values, expires_at):
+        self.rng = rng
+        self.values = [list(row) for row in values]
+        self.cells = _count_cells(self.values)
+        self.expires_at = expires_at
+
+    @property
+    def data_end_row(self):
+        """Dòng cuối cùng có dữ liệu trong khối (hoặc dòng trước start_row nếu rỗng)"""
+        return self.rng.start_row + len(self.values) - 1
+
+    def slice(self, rng):
+        """Cắt ra giá trị của phạm vi rng (phải nằm trong khối)"""
+        base_row, base_col = self.rng.start_row, self.rng.start_col
+        end_row = rng.end_row if rng.end_row is not None else self.data_end_row
+        if rng.end_col is not None:
+            end_col = rng.end_col
+        else:
+            widest = max((len(row) for row in self.values), default=0)
+            end_col = base_col + widest - 1
+
+        rows = []
+        for r in range(rng.start_row, end_row + 1):
+            offset = r - base_row
+            source = self.values[offset] if offset < len(self.values) else []
+            rows.append(source[rng.start_col - base_col:end_col - base_col + 1])
+        return _trim(rows)
+
+    def assign(self, rng, values):
+        """
+        Ghi giá trị vào phần giao giữa rng và khối
+
+        values bằng None nghĩa là xóa trắng các ô. Ô nằm trong rng nhưng
+        không có trong values (dòng ngắn hơn) cũng được coi là rỗng.
+        """
+        block = self.rng
+        start_row = max(rng.start_row, block.start_row)
+        start_col = max(rng.start_col, block.start_col)
+        end_row = _min_end(rng.end_row, block.end_row)
+        end_col = _min_end(rng.end_col, block.end_col)
+
+        # Khi xóa, chỉ cần duyệt phần đang có dữ liệu
+        if values is None:
+            end_row = _min_end(end_row, self.data_end_row)
+        if end_row < start_row:
+            return
+
+        for r in range(start_row, end_row + 1):
+            offset = r - block.start_row
+            while offset >= len(self.values):
+                self.values.append([])
+            row = self.values[offset]
+            source = values[r - rng.start_row] if values is not None and r - rng.start_row < len(values) else []
+            last_col = end_col
+            if last_col is None:
+                last_col = max(block.start_col + len(row) - 1, rng.start_col + len(source) - 1)
+            for c in range(start_col, last_col + 1):
+                i = c - block.start_col
+                j = c - rng.start_col
+                value = source[j] if j < len(source) else ''
+                if i >= len(row):
+                    if value == '':
+                        continue
+                    row.extend([''] * (i - len(row) + 1))
+                row[i] = value
+
+        _trim(self.values)
+        self.cells = _count_cells(self.values)
+
+
+class SheetValuesCache:
+    """
+    Cache đọc (read-through) cho giá trị của sheet
+
+    Khóa theo (spreadsheet_id, range A1 đã chuẩn hóa). Mỗi mục có TTL và
+    cache bị giới hạn theo số mục lẫn tổng số ô, loại bỏ theo LRU. Một lần
+    đọc phạm vi con sẽ được trả lời từ khối cha đã cache nếu có.
+    """
+
+    def __init__(self, ttl=30.0, max_entries=256, max_cells=1_000_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_cells = max_cells
+        self._blocks = OrderedDict()
+        self._total_cells = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _parse(range_name):
+        if isinstance(range_name, A1Range):
+            return range_name
+        return parse_range(range_name)
+
+    def _drop(self, key):
+        block = self._blocks.pop(key)
+        self._total_cells -= block.cells
+
+    def get(self, spreadsheet_id, range_name):
+        """
+        Lấy giá trị từ cache
+
+        Returns:
+            List of lists giống read_data, hoặc None nếu không có trong cache
+        """
+        rng = self._parse(range_name)
+        if rng is None:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            exact = (spreadsheet_id, rng.to_a1())
+            candidates = [exact] if exact in self._blocks else []
+            candidates += [key for key in self._blocks if key[0] == spreadsheet_id and key != exact]
+
+            for key in candidates:
+                block = self._blocks[key]
+                if block.expires_at <= now:
+                    self._drop(key)
+                    continue
+                if block.rng.contains(rng):
+                    self._blocks.move_to_end(key)
+                    self.hits += 1
+                    return block.slice(rng)
+
+            self.misses += 1
+            return None
+
+    def put(self, spreadsheet_id, range_name, values, ttl=None):
+        """Lưu kết quả đọc của một phạm vi vào cache (ttl=None dùng TTL mặc định)"""
+        rng = self._parse(range_name)
+        if rng is None or _count_cells(values) > self.max_cells:
+            return
+
+        block = _Block(rng, values, time.monotonic() + (self.ttl if ttl is None else ttl))
+        with self._lock:
+            # Khối mới bao trọn khối cũ thì khối cũ không còn cần thiết
+            for key in [k for k, b in self._blocks.items()
+                        if k[0] == spreadsheet_id and rng.contains(b.rng)]:
+                self._drop(key)
+
+            key = (spreadsheet_id, rng.to_a1())
+            self._blocks[key] = block
+            self._total_cells += block.cells
+            self._evict()
+
+    def _evict(self):
+        while self._blocks and (len(self._blocks) > self.max_entries
+                                or self._total_cells > self.max_cells):
+            self._drop(next(iter(self._blocks)))
+
+    def _affected(self, spreadsheet_id, rng):
+        """Các khóa của khối bị ảnh hưởng khi phạm vi rng thay đổi"""
+        return [key for key, block in self._blocks.items()
+                if key[0] == spreadsheet_id and block.rng.overlaps(rng)]
+
+    def patch(self, spreadsheet_id, range_name, values):
+        """
+        Cập nhật tại chỗ các ô đã cache sau khi ghi
+
+        Args:
+            range_name: Phạm vi đã ghi (phạm vi đóng, ví dụ updatedRange của API)
+            values: Giá trị thực tế của phạm vi đó
+        """
+        rng = self._parse(range_name)
+        if rng is None or rng.sheet is None or not rng.is_bounded:
+            self.invalidate(spreadsheet_id, range_name)
+            return
+        self._apply(spreadsheet_id, rng, values)
+
+    def clear_cells(self, spreadsheet_id, range_name):
+        """Đánh dấu rỗng các ô đã cache trong phạm vi vừa bị xóa"""
+        rng = self._parse(range_name)
+        if rng is None or rng.sheet is None:
+            self.invalidate(spreadsheet_id, range_name)
+            return
+        self._apply(spreadsheet_id, rng, None)
+
+    def _apply(self, spreadsheet_id, rng, values):
+        with self._lock:
+            for key in self._affected(spreadsheet_id, rng):
+                block = self._blocks[key]
+                if block.rng.sheet is None:
+                    # Không biết khối này thuộc sheet nào, bỏ đi cho an toàn
+                    self._drop(key)
+                    continue
+                self._total_cells -= block.cells
+                block.assign(rng, values)
+                self._total_cells += block.cells
+            self._evict()
+
+    def invalidate(self, spreadsheet_id, range_name=None):
+        """
+        Xóa khỏi cache các khối giao với range_name
+
+        Nếu range_name là None hoặc không phân tích được, xóa toàn bộ cache
+        của spreadsheet đó.
+        """
+        rng = self._parse(range_name) if range_name is not None else None
+        with self._lock:
+            if rng is None:
+                keys = [key for key in self._blocks if key[0] == spreadsheet_id]
+            else:
+                keys = self._affected(spreadsheet_id, rng)
+            for key in keys:
+                self._drop(key)
+
+    def clear(self):
+        """Xóa toàn bộ cache"""
+        with self._lock:
+            self._blocks.clear()
+            self._total_cells = 0
@@ -0,0 +1,302 @@
+"""
+Sheets Credentials - Credentials dùng chung giữa các thread/process, tự refresh nền trước khi hết hạn
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import threading
+
+from google.auth.transport.requests import Request
+from google.oauth2 import service_account
+from google.oauth2.credentials import Credentials
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+DEFAULT_SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+
+# Refresh nền khi token còn chừng này giây; lớn hơn ngưỡng coi là hết hạn của
+# google-auth (khoảng 4 phút) nên creds.valid không bao giờ thành False trên đường request
+REFRESH_MARGIN = 600
+
+# Chờ chừng này giây rồi thử lại khi refresh nền bị lỗi (mất mạng...)
+RETRY_DELAY = 30
+
+
+class FileLock:
+    """
+    Khóa độc quyền giữa các process bằng file khóa (flock, hoặc msvcrt trên Windows)
+
+    Dùng lại được trong cùng thread (khóa lồng nhau không tự chặn mình).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        if self._depth == 0:
+            try:
+                self._file = open(self.path, 'a+')
+                if fcntl is not None:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+                else:
+                    self._file.seek(0)
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+            except BaseException:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                self._lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+                else:
+                    self._file.seek(0)
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            finally:
+                self._file.close()
+                self._file = None
+        self._lock.release()
+
+
+def _write_private(path, text):
+    """Ghi file qua file tạm rồi đổi tên (process khác không bao giờ đọc thấy file dở dang)"""
+    temp = f'{path}.{os.getpid()}.tmp'
+    with open(temp, 'w') as f:
+        f.write(text)
+    if os.name == 'posix':
+        os.chmod(temp, 0o600)
+    os.replace(temp, path)
+
+
+class TokenCache:
+    """
+    File JSON {định danh: {'token', 'expiry'}} chứa access token dùng chung giữa các process
+
+    Ghi dưới FileLock và bằng os.replace, nên đọc không cần khóa.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = FileLock(f'{path}.lock')
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def load(self, identity):
+        """(token, expiry) đã lưu của định danh, None nếu chưa có"""
+        entry = self._read().get(identity)
+        if not entry or not entry.get('token') or not entry.get('expiry'):
+            return None
+        return entry['token'], datetime.datetime.fromisoformat(entry['expiry'])
+
+    def store(self, identity, token, expiry):
+        with self.lock:
+            entries = self._read()
+            # Bỏ các token đã hết hạn của định danh khác
+            now = datetime.datetime.utcnow().isoformat()
+            entries = {key: entry for key, entry in entries.items() if entry.get('expiry', '') > now}
+            entries[identity] = {'token': token, 'expiry': expiry.isoformat()}
+            _write_private(self.path, json.dumps(entries))
+
+
+def _seconds_left(expiry):
+    if expiry is None:
+        return 0.0
+    return (expiry - datetime.datetime.utcnow()).total_seconds()
+
+
+class CredentialProvider:
+    """
+    Cung cấp credentials cho service account hoặc user (token.json)
+
+    Access token được giữ trong TokenCache dùng chung theo định danh: process
+    nào refresh trước thì các process khác dùng lại token đó thay vì tự
+    refresh. Một thread nền refresh token khi còn REFRESH_MARGIN giây, nên
+    request không phải chờ refresh. Việc đọc/ghi token.json và đăng nhập lần
+    đầu đều nằm dưới khóa file, các process khởi động cùng lúc không ghi đè
+    lên nhau.
+
+    Ví dụ:
+        provider = CredentialProvider(service_account_file='service-account.json')
+        creds = provider.credentials()
+    """
+
+    def __init__(self, credentials_file=None, token_file=None, service_account_file=None,
+                 scopes=None, cache_file=None, refresh_margin=REFRESH_MARGIN):
+        """
+        Args:
+            credentials_file: File OAuth client tải từ Google Cloud Console (đăng nhập lần đầu)
+            token_file: File token của user (mặc định TOKEN_FILE hoặc token.json)
+            service_account_file: File key của service account (mặc định SERVICE_ACCOUNT_FILE);
+                credentials_file có type 'service_account' cũng được dùng như vậy
+            scopes: List scope (mặc định quyền spreadsheets)
+            cache_file: TokenCache dùng chung (mặc định TOKEN_CACHE_FILE)
+            refresh_margin: Refresh nền khi token còn chừng này giây
+        """
+        self.credentials_file = credentials_file or os.getenv('CREDENTIALS_FILE', 'credentials.json')
+        self.token_file = token_file or os.getenv('TOKEN_FILE', 'token.json')
+        self.service_account_file = service_account_file or os.getenv('SERVICE_ACCOUNT_FILE') or None
+        if self.service_account_file is None and _is_service_account_file(self.credentials_file):
+            self.service_account_file = self.credentials_file
+        self.scopes = list(scopes or DEFAULT_SCOPES)
+        self.cache = TokenCache(cache_file or os.getenv('TOKEN_CACHE_FILE', '.sheets_token_cache.json'))
+        self.refresh_margin = refresh_margin
+
+        self.creds = None
+        self.identity = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def mode(self):
+        """'service_account' hoặc 'user'"""
+        return 'service_account' if self.service_account_file else 'user'
+
+    def credentials(self):
+        """
+        Credentials còn hạn (lần đầu có thể phải đọc file, refresh hoặc đăng nhập)
+
+        Returns:
+            google.oauth2 Credentials, được refresh nền cho đến khi gọi stop()
+        """
+        with self._lock:
+            if self.creds is None:
+                self.creds = self._load()
+                self.identity = self._identity(self.creds)
+            if _seconds_left(self.creds.expiry) <= self.refresh_margin or not self.creds.token:
+                self.refresh()
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='sheets-credentials',
+                                                daemon=True)
+                self._thread.start()
+            return self.creds
+
+    def _load(self):
+        if self.service_account_file:
+            return service_account.Credentials.from_service_account_file(
+                self.service_account_file, scopes=self.scopes)
+
+        # Process khởi động cùng lúc: chỉ một process đăng nhập, các process khác đọc token của nó
+        with self.cache.lock:
+            if os.path.exists(self.token_file):
+                return Credentials.from_authorized_user_file(self.token_file, self.scopes)
+
+            if not os.path.exists(self.credentials_file):
+                raise FileNotFoundError(
+                    f"Không tìm thấy file credentials: {self.credentials_file}\n"
+                    "Vui lòng tải file credentials từ Google Cloud Console"
+                )
+
+            # Import muộn: oauthlib chỉ cần khi phải đăng nhập, tránh làm chậm lúc khởi động
+            from google_auth_oauthlib.flow import InstalledAppFlow
+
+            flow = InstalledAppFlow.from_client_secrets_file(self.credentials_file, self.scopes)
+            creds = flow.run_local_server(port=0)
+            _write_private(self.token_file, creds.to_json())
+            return creds
+
+    @staticmethod
+    def _identity(creds):
+        if isinstance(creds, service_account.Credentials):
+            return f'service_account:{creds.service_account_email}'
+        # Không lưu refresh token vào file cache, chỉ một phần hash để phân biệt
+        secret = hashlib.sha256((creds.refresh_token or '').encode('utf-8')).hexdigest()[:16]
+        return f'user:{creds.client_id}:{secret}'
+
+    def refresh(self):
+        """
+        Làm mới access token dưới khóa file
+
+        Nếu process khác vừa refresh (token trong cache còn hạn hơn
+        refresh_margin), dùng lại token đó mà không gọi mạng.
+        """
+        creds = self.creds
+        with self.cache.lock:
+            cached = self.cache.load(self.identity)
+            if cached is not None and _seconds_left(cached[1]) > self.refresh_margin:
+                creds.token, creds.expiry = cached
+                return creds
+
+            refresh_token = getattr(creds, 'refresh_token', None)
+            creds.refresh(Request())
+            self.cache.store(self.identity, creds.token, creds.expiry)
+            if self.mode == 'user' and creds.refresh_token != refresh_token:
+                # Google đổi refresh token: cập nhật token.json cho lần chạy sau
+                _write_private(self.token_file, creds.to_json())
+                self.identity = self._identity(creds)
+                self.cache.store(self.identity, creds.token, creds.expiry)
+        return creds
+
+    def _run(self):
+        """Thread nền: ngủ đến lúc token còn refresh_margin giây rồi refresh"""
+        while True:
+            delay = _seconds_left(self.creds.expiry) - self.refresh_margin
+            if self._stop.wait(max(delay, 1.0)):
+                return
+            try:
+                self.refresh()
+            except Exception:
+                # Lỗi tạm thời: thử lại sau; token cũ vẫn dùng được đến khi hết hạn
+                if self._stop.wait(RETRY_DELAY):
+                    return
+
+    def stop(self):
+        """Dừng thread refresh nền"""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self._thread = None
+
+
+def _is_service_account_file(path):
+    try:
+        with open(path) as f:
+            return json.load(f).get('type') == 'service_account'
+    except (OSError, ValueError, AttributeError):
+        return False
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(credentials_file=None, token_file=None, service_account_file=None, scopes=None):
+    """
+    CredentialProvider dùng chung trong process cho cùng một bộ tham số
+
+    Mọi service/manager cùng định danh dùng chung credentials và một thread refresh nền.
+    """
+    key = (credentials_file or os.getenv('CREDENTIALS_FILE', 'credentials.json'),
+           token_file or os.getenv('TOKEN_FILE', 'token.json'),
+           service_account_file or os.getenv('SERVICE_ACCOUNT_FILE') or None,
+           tuple(scopes or DEFAULT_SCOPES))
+    with _providers_lock:
+        provider = _providers.get(key)
+        if provider is None:
+            provider = _providers[key] = CredentialProvider(*key[:3], scopes=list(key[3]))
+        return provider
@@ -0,0 +1,488 @@
+"""
+Sheets Journal - Hàng đợi ghi trước (write-ahead) trên đĩa cho append/write
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from sheets_metadata import METADATA_FIELDS, SpreadsheetMetadata
+from sheets_quota import RETRYABLE_STATUSES, RetryPolicy
+from sheets_range import index_to_column, parse_range, quote_sheet_name
+from sheets_sync import _cell_text
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS mutations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    spreadsheet_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    range TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created REAL NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    error TEXT
+)
+"""
+
+# Dòng cuối (tính từ 1) của lần append thành công gần nhất của journal vào mỗi phạm vi
+_TAILS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS append_tails (
+    spreadsheet_id TEXT NOT NULL,
+    range TEXT NOT NULL,
+    end_row INTEGER NOT NULL,
+    PRIMARY KEY (spreadsheet_id, range)
+)
+"""
+
+# Trạng thái của một mutation
+PENDING = 'pending'
+INFLIGHT = 'inflight'
+FAILED = 'failed'
+
+# Append của journal không được thử lại bên trong _execute: lỗi mơ hồ (5xx, mất
+# kết nối) để mutation ở trạng thái inflight và được kiểm tra cuối sheet trước khi gửi lại
+NO_RETRY = RetryPolicy(max_retries=0)
+
+
+def _same_cell(sent, stored):
+    """So sánh giá trị đã gửi (USER_ENTERED) với giá trị hiển thị trên sheet"""
+    sent, stored = _cell_text(sent).strip(), _cell_text(stored).strip()
+    if sent == stored or sent.startswith('='):
+        # Công thức hiển thị kết quả tính, không so sánh được
+        return True
+    try:
+        return float(sent.replace(',', '')) == float(stored.replace(',', ''))
+    except ValueError:
+        return False
+
+
+def _same_row(sent, stored):
+    width = max(len(sent), len(stored))
+    sent = list(sent) + [''] * (width - len(sent))
+    stored = list(stored) + [''] * (width - len(stored))
+    return all(_same_cell(a, b) for a, b in zip(sent, stored))
+
+
+def _is_ambiguous(error):
+    """Lỗi mà request có thể đã được áp dụng (mất kết nối, timeout, 5xx)"""
+    status = getattr(error, 'status', None)
+    return status is None or status >= 500
+
+
+class SheetsJournal:
+    """
+    Nhật ký ghi trước trên SQLite (WAL, fsync khi commit)
+
+    append()/write() ghi mutation xuống đĩa trước rồi mới trả về, một thread
+    nền gửi lần lượt theo đúng thứ tự. Các lần append liên tiếp vào cùng
+    phạm vi được gộp thành một values().append, các lần write liên tiếp được
+    gộp thành một values().batchUpdate. Khi mất mạng hoặc hết quota, mutation
+    nằm lại trên đĩa và được gửi lại sau, kể cả sau khi process khởi động lại.
+
+    Trước khi gửi, các mutation được đánh dấu 'inflight'. Với mỗi phạm vi
+    append, journal lưu dòng cuối của lần append thành công gần nhất (lấy từ
+    updatedRange; lần đầu là dòng cuối có dữ liệu của sheet). Nếu process dừng
+    (hoặc mất kết nối) giữa lúc gửi một lần append, lần chạy sau chỉ tìm các
+    dòng đó ở phía sau dòng đã lưu rồi mới quyết định gửi lại. Các dòng cũ có
+    cùng nội dung nằm trước dòng đã lưu nên một lần append trùng nội dung hợp
+    lệ không bị bỏ qua. Nếu có người khác xóa dòng phía trên giữa hai lần
+    append, lô dở dang có thể bị gửi lại.
+    """
+
+    def __init__(self, service, path='sheets_journal.db', max_batch_rows=500,
+                 max_batch_cells=10000, retry_interval=5.0, max_retry_interval=300.0,
+                 verify_tail_rows=1000, start=True):
+        """
+        Args:
+            service: GoogleSheetsService dùng để gửi
+            path: File SQLite của journal
+            max_batch_rows: Số dòng tối đa trong một lần append gộp
+            max_batch_cells: Số ô tối đa trong một lần batchUpdate gộp
+            retry_interval: Thời gian chờ (giây) trước khi thử lại khi gửi lỗi
+            max_retry_interval: Thời gian chờ tối đa khi lỗi liên tiếp
+            verify_tail_rows: Số dòng (của process khác) có thể nằm giữa dòng đã lưu và
+                lô append dở dang, được đọc thêm khi kiểm tra
+            start: False để không tự chạy thread gửi (gọi drain_once() thủ công)
+        """
+        self.service = service
+        self.path = path
+        self.max_batch_rows = max_batch_rows
+        self.max_batch_cells = max_batch_cells
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self.verify_tail_rows = verify_tail_rows
+
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        # FULL: fsync mỗi lần commit, mutation đã ghi nhận không mất khi mất điện
+        self._db.execute('PRAGMA synchronous=FULL')
+        self._db.execute(_SCHEMA)
+        self._db.execute(_TAILS_SCHEMA)
+        self._db_lock = threading.Lock()
+
+        self._futures = {}
+        # Số mutation cần gửi riêng lẻ để tìm mutation bị API từ chối trong một lô
+        self._isolate = 0
+        self._wakeup = threading.Event()
+        self._idle = threading.Condition()
+        self._closed = False
+        self._thread = None
+        if start:
+            self._thread = threading.Thread(target=self._run, name='sheets-journal', daemon=True)
+            self._thread.start()
+
+    def _query(self, sql, params=()):
+        with self._db_lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def _enqueue(self, kind, range_name, values):
+        payload = json.dumps(values, ensure_ascii=False)
+        future = Future()
+        with self._db_lock:
+            cursor = self._db.execute(
+                'INSERT INTO mutations (spreadsheet_id, kind, range, payload, created) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (self.service.spreadsheet_id, kind, range_name, payload, time.time())
+            )
+            self._futures[cursor.lastrowid] = future
+        self._wakeup.set()
+        return future
+
+    def append(self, range_name, values):
+        """
+        Ghi một lần append vào journal
+
+        Returns:
+            Future trả về số dòng của lần append này sau khi đã gửi thành công
+        """
+        return self._enqueue('append', range_name, values)
+
+    def write(self, range_name, values):
+        """
+        Ghi một lần write (ghi đè) vào journal
+
+        Returns:
+            Future trả về số ô của lần ghi này sau khi đã gửi thành công
+        """
+        return self._enqueue('write', range_name, values)
+
+    @property
+    def pending(self):
+        """Số mutation chưa gửi xong (kể cả đang gửi)"""
+        return self._query('SELECT COUNT(*) FROM mutations WHERE state != ?', (FAILED,))[0][0]
+
+    def failed_entries(self):
+        """
+        Các mutation bị API từ chối (ví dụ range sai), không được gửi lại
+
+        Returns:
+            List of dicts {'id', 'kind', 'range', 'values', 'error'}
+        """
+        rows = self._query(
+            'SELECT id, kind, range, payload, error FROM mutations WHERE state = ? ORDER BY id',
+            (FAILED,)
+        )
+        return [
+            {'id': id_, 'kind': kind, 'range': range_name, 'values': json.loads(payload), 'error': error}
+            for id_, kind, range_name, payload, error in rows
+        ]
+
+    def discard_failed(self):
+        """Xóa các mutation bị từ chối khỏi journal, trả về số mutation đã xóa"""
+        with self._db_lock:
+            return self._db.execute('DELETE FROM mutations WHERE state = ?', (FAILED,)).rowcount
+
+    def wait_until_empty(self, timeout=None):
+        """
+        Chờ đến khi mọi mutation đã được gửi
+
+        Returns:
+            True nếu journal đã trống, False nếu hết thời gian chờ
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._idle:
+            while self.pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._wakeup.set()
+                self._idle.wait(1.0 if remaining is None else min(remaining, 1.0))
+        return True
+
+    def flush(self):
+        """
+        Gửi hết các mutation đang chờ trước khi thao tác khác chạy tiếp
+
+        Khi có thread gửi thì chờ thread đó; khi start=False thì gửi ngay trên
+        thread hiện tại. Lỗi tạm thời khi gửi trực tiếp được ném ra.
+        """
+        if self._thread is None:
+            while self.drain_once():
+                pass
+        elif threading.current_thread() is not self._thread:
+            self.wait_until_empty()
+
+    def close(self):
+        """Dừng thread gửi; mutation chưa gửi vẫn nằm trong file và được gửi ở lần sau"""
+        self._closed = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._db_lock:
+            self._db.close()
+
+    def _run(self):
+        delay = self.retry_interval
+        while not self._closed:
+            try:
+                progressed = self.drain_once()
+            except Exception:
+                # Gửi lỗi tạm thời: giữ mutation lại và thử lại sau, tăng dần thời gian chờ
+                self._wakeup.wait(delay)
+                self._wakeup.clear()
+                delay = min(delay * 2, self.max_retry_interval)
+                continue
+
+            delay = self.retry_interval
+            if not progressed:
+                with self._idle:
+                    self._idle.notify_all()
+                self._wakeup.wait()
+                self._wakeup.clear()
+
+    def drain_once(self):
+        """
+        Gửi một lô mutation
+
+        Returns:
+            True nếu đã xử lý được một lô, False nếu journal trống. Lỗi tạm thời
+            (mất mạng, 429, 5xx) được ném ra và lô được giữ lại để gửi lại sau
+        """
+        rows = self._query(
+            'SELECT id, spreadsheet_id, kind, range, payload, state FROM mutations '
+            'WHERE state != ? ORDER BY id LIMIT ?',
+            (FAILED, self.max_batch_rows)
+        )
+        if not rows:
+            return False
+
+        batch = self._take_batch(rows)
+        ids = [row[0] for row in batch]
+        spreadsheet_id, kind, range_name = batch[0][1], batch[0][2], batch[0][3]
+        values = [json.loads(row[4]) for row in batch]
+
+        if kind == 'append':
+            # Lỗi khi đọc được ném ra, lô giữ nguyên trạng thái và được xử lý lại sau
+            tail = self._tail_row(spreadsheet_id, range_name, values)
+            if batch[0][5] == INFLIGHT:
+                # Lần gửi trước bị ngắt giữa chừng: tìm lô này phía sau dòng đã lưu
+                end_row = self._find_appended(spreadsheet_id, range_name, values, tail)
+                if end_row is not None:
+                    self._complete(ids, [len(rows_) for rows_ in values],
+                                   tail=(spreadsheet_id, range_name, end_row))
+                    return True
+
+        self._mark(ids, INFLIGHT)
+        tail = None
+        try:
+            if kind == 'append':
+                result = self.service._send_append(
+                    range_name, [row for rows_ in values for row in rows_], spreadsheet_id,
+                    retry_policy=NO_RETRY, http=self.service._thread_http()
+                )
+                results = [len(rows_) for rows_ in values]
+                updated = parse_range(result.get('updates', {}).get('updatedRange', ''))
+                if updated is not None and updated.end_row is not None:
+                    tail = (spreadsheet_id, range_name, updated.end_row)
+            else:
+                data = [{'range': row[3], 'values': rows_} for row, rows_ in zip(batch, values)]
+                responses = self.service._send_batch_update(
+                    data, spreadsheet_id, http=self.service._thread_http()
+                ).get('responses', [])
+                results = [responses[i].get('updatedCells', 0) if i < len(responses) else 0
+                           for i in range(len(data))]
+        except Exception as error:
+            status = getattr(error, 'status', None)
+            if status is not None and status not in RETRYABLE_STATUSES:
+                if len(ids) > 1:
+                    # Gửi lại từng mutation để chỉ bỏ đúng mutation bị từ chối
+                    self._mark(ids, PENDING)
+                    self._isolate = len(ids)
+                    return True
+                # API từ chối hẳn (range sai, không có quyền...): bỏ qua để không chặn hàng đợi
+                self._fail(ids, error)
+                return True
+            if kind != 'append' or not _is_ambiguous(error):
+                # Request chắc chắn chưa được áp dụng (hoặc write có thể gửi lại an toàn)
+                self._mark(ids, PENDING)
+            raise
+
+        self._complete(ids, results, tail)
+        return True
+
+    def _take_batch(self, rows):
+        """Lấy các mutation liên tiếp có thể gộp với mutation đầu tiên"""
+        first = rows[0]
+        if self._isolate:
+            self._isolate -= 1
+            return [first]
+
+        batch, size = [], 0
+        for row in rows:
+            if row[1] != first[1] or row[2] != first[2]:
+                break
+            if first[2] == 'append' and (row[3] != first[3] or row[5] != first[5]):
+                break
+            values = json.loads(row[4])
+            weight = len(values) if first[2] == 'append' else sum(len(r) for r in values)
+            limit = self.max_batch_rows if first[2] == 'append' else self.max_batch_cells
+            if batch and size + weight > limit:
+                break
+            batch.append(row)
+            size += weight
+        return batch
+
+    def _columns(self, range_name, values):
+        """Sheet và cột đầu/cuối mà lô append chiếm, None nếu range không có tên sheet"""
+        rng = parse_range(range_name)
+        if rng is None or rng.sheet is None:
+            return None
+        width = max((len(row) for rows_ in values for row in rows_), default=1)
+        return rng.sheet, (index_to_column(rng.start_col),
+                           index_to_column(rng.start_col + max(width, 1) - 1))
+
+    def _tail_row(self, spreadsheet_id, range_name, values):
+        """
+        Dòng cuối đã lưu của phạm vi append, ghi lại trước lần gửi đầu tiên
+
+        Lần đầu (chưa có lần append thành công nào) lấy dòng cuối có dữ liệu
+        của sheet trong các cột của lô, nên luôn có trước khi lô thành inflight.
+        """
+        rows = self._query(
+            'SELECT end_row FROM append_tails WHERE spreadsheet_id = ? AND range = ?',
+            (spreadsheet_id, range_name)
+        )
+        if rows:
+            return rows[0][0]
+        target = self._columns(range_name, values)
+        if target is None:
+            return None
+        end_row = self._last_row(spreadsheet_id, *target)
+        self._set_tail(spreadsheet_id, range_name, end_row)
+        return end_row
+
+    def _set_tail(self, spreadsheet_id, range_name, end_row):
+        with self._db_lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO append_tails (spreadsheet_id, range, end_row) VALUES (?, ?, ?)',
+                (spreadsheet_id, range_name, end_row)
+            )
+
+    def _find_appended(self, spreadsheet_id, range_name, values, tail):
+        """
+        Tìm lô append dở dang trong các dòng ngay sau dòng tail
+
+        Returns:
+            Dòng cuối của lô nếu đã được thêm, None nếu chưa (hoặc không kiểm tra được)
+        """
+        sent = [row for rows_ in values for row in rows_]
+        target = self._columns(range_name, values)
+        if target is None or tail is None:
+            return None
+        sheet, (first, last) = target
+        if not sent:
+            return tail
+
+        service = self.service
+        start = tail + 1
+        # Phạm vi vượt quá lưới bị API từ chối: chỉ đọc đến dòng cuối của lưới
+        end = min(tail + len(sent) + self.verify_tail_rows, self._grid_rows(spreadsheet_id, sheet))
+        if end - start + 1 < len(sent):
+            return None
+        result = service._execute(service.service.spreadsheets().values().get(
+            spreadsheetId=spreadsheet_id,
+            range=f'{quote_sheet_name(sheet)}!{first}{start}:{last}{end}'
+        ), 'read', http=service._thread_http())
+        # Dòng đầu của kết quả là dòng start (dòng trống phía trước vẫn được trả về)
+        rows = result.get('values', [])
+        for offset in range(len(rows) - len(sent) + 1):
+            if all(_same_row(row, rows[offset + i]) for i, row in enumerate(sent)):
+                return tail + offset + len(sent)
+        return None
+
+    def _last_row(self, spreadsheet_id, sheet, columns):
+        """
+        Dòng cuối có dữ liệu của sheet trong các cột columns (0 nếu trống)
+
+        Chỉ đọc phần cuối: lấy số dòng của lưới từ metadata rồi đọc lùi từng
+        cửa sổ (gấp đôi mỗi lần) cho đến khi gặp dòng có dữ liệu. Các dòng
+        trống cuối sheet không được API trả về nên các lần đọc này rất nhỏ.
+        """
+        service = self.service
+        first, last = columns
+        prefix = quote_sheet_name(sheet)
+        end, window = self._grid_rows(spreadsheet_id, sheet), self.verify_tail_rows
+        while end >= 1:
+            start = max(end - window + 1, 1)
+            result = service._execute(service.service.spreadsheets().values().get(
+                spreadsheetId=spreadsheet_id,
+                range=f'{prefix}!{first}{start}:{last}{end}'
+            ), 'read', http=service._thread_http())
+            rows = result.get('values', [])
+            if rows:
+                # Dòng đầu của kết quả là dòng start
+                return start + len(rows) - 1
+            end, window = start - 1, window * 2
+        return 0
+
+    def _grid_rows(self, spreadsheet_id, sheet):
+        """Số dòng hiện tại của lưới (đọc metadata mới, append có thể đã thêm dòng)"""
+        service = self.service
+        response = service._execute(service.service.spreadsheets().get(
+            spreadsheetId=spreadsheet_id,
+            fields=METADATA_FIELDS
+        ), 'read', http=service._thread_http())
+        metadata = SpreadsheetMetadata.from_response(response)
+        service.metadata_cache.put(spreadsheet_id, metadata)
+        info = metadata.sheet(sheet)
+        return info.row_count or 0 if info is not None else 0
+
+    def _mark(self, ids, state):
+        marks = ','.join('?' * len(ids))
+        with self._db_lock:
+            self._db.execute(f'UPDATE mutations SET state = ? WHERE id IN ({marks})', [state, *ids])
+
+    def _complete(self, ids, results, tail=None):
+        marks = ','.join('?' * len(ids))
+        with self._db_lock:
+            # Xóa mutation và lưu dòng cuối trong cùng một transaction
+            self._db.execute('BEGIN')
+            try:
+                self._db.execute(f'DELETE FROM mutations WHERE id IN ({marks})', ids)
+                if tail is not None:
+                    self._db.execute(
+                        'INSERT OR REPLACE INTO append_tails (spreadsheet_id, range, end_row) '
+                        'VALUES (?, ?, ?)', tail
+                    )
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+            self._db.execute('COMMIT')
+            futures = [self._futures.pop(id_, None) for id_ in ids]
+        for future, result in zip(futures, results):
+            if future is not None:
+                future.set_result(result)
+
+    def _fail(self, ids, error):
+        marks = ','.join('?' * len(ids))
+        with self._db_lock:
+            self._db.execute(
+                f'UPDATE mutations SET state = ?, error = ? WHERE id IN ({marks})',
+                [FAILED, str(error), *ids]
+            )
+            futures = [self._futures.pop(id_, None) for id_ in ids]
+        for future in futures:
+            if future is not None:
+                future.set_exception(error)
@@ -0,0 +1,414 @@
+"""
+Sheets Key Index - Chỉ mục khóa -> số dòng cho một cột ID, tra cứu và upsert chỉ chạm một dòng
+"""
+
+import threading
+import time
+
+from googleapiclient.errors import HttpError
+
+from sheets_range import column_to_index, index_to_column, parse_range, quote_sheet_name
+
+# Sheet ẩn chứa ô checksum của các chỉ mục: cột A là nhãn, cột B là công thức
+INDEX_SHEET = '_index'
+
+
+def _key_text(value):
+    """Khóa dạng chuỗi như giá trị hiển thị trên sheet"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    return str(value)
+
+
+# Modulo của phần băm nội dung mỗi ô, giữ tổng trên sheet là số nguyên chính xác
+CHECKSUM_MODULUS = 1000000007
+
+
+def _checksum_formula(column_range):
+    """
+    Công thức checksum của cột khóa: số ô khác rỗng, tổng LEN*ROW và tổng
+    (mã từng ký tự * vị trí ký tự * ROW) mod CHECKSUM_MODULUS của từng ô.
+
+    Phần cuối phụ thuộc mọi ký tự của khóa nên sửa một ký tự bất kỳ
+    ('1001' -> '1009') hay đổi chỗ hai khóa đều làm checksum đổi. Tính lại
+    được ở phía client từ chỉ mục mà không cần đọc cột.
+    """
+    r = column_range
+    width = f'MAX(1,MAX(LEN({r})))'
+    codes = f'IFERROR(UNICODE(MID({r},SEQUENCE(1,{width}),1)),0)'
+    return (f'=COUNTA({r})&"|"&SUMPRODUCT(LEN({r})*ROW({r}))'
+            f'&"|"&SUMPRODUCT(MOD(MMULT({codes},SEQUENCE({width}))*ROW({r}),{CHECKSUM_MODULUS}))')
+
+
+def _contribution(key, row):
+    """Phần đóng góp của một ô khóa vào checksum"""
+    if not key:
+        return (0, 0, 0)
+    digest = sum(ord(char) * position for position, char in enumerate(key, start=1))
+    return (1, len(key) * row, digest * row % CHECKSUM_MODULUS)
+
+
+def _parse_checksum(text):
+    try:
+        count, lengths, codes = str(text).split('|')
+        return (int(float(count)), int(float(lengths)), int(float(codes)))
+    except (TypeError, ValueError):
+        # '#REF!', 'Loading...' hoặc ô chưa có công thức
+        return None
+
+
+class KeyIndex:
+    """
+    Chỉ mục khóa -> số dòng của một sheet theo cột khóa (ví dụ cột ID)
+
+    Được xây một lần bằng cách đọc riêng cột khóa, sau đó tự cập nhật theo các
+    lần write_data/append_data/clear_data/batch_update của service. Thay đổi
+    từ bên ngoài được phát hiện bằng ô checksum trên sheet ẩn INDEX_SHEET: nếu
+    checksum trên sheet khác giá trị chỉ mục tính được, chỉ mục được xây lại.
+
+    Khóa được so sánh dạng chuỗi như giá trị hiển thị (1 và '1' là một khóa).
+    Nếu cột khóa có khóa trùng, chỉ mục giữ dòng đầu tiên.
+
+    Ví dụ:
+        index = service.key_index('Sheet1', key_column='A')
+        index.upsert('5', ['5', 'Hoàng Văn E', 'hoangvane@email.com', '35', 'Huế'])
+        print(index.get_by_key('5'))
+        index.delete_by_key('5')
+    """
+
+    def __init__(self, service, sheet, key_column='A', header_rows=1, first_col='A',
+                 verify_interval=5.0):
+        self.service = service
+        self.spreadsheet_id = service.spreadsheet_id
+        self.sheet = sheet
+        self.key_col = column_to_index(key_column)
+        self.first_col = column_to_index(first_col)
+        if self.key_col < self.first_col:
+            raise ValueError(f"Cột khóa {key_column} nằm trước cột đầu tiên {first_col}")
+        self.header_rows = header_rows
+        self.verify_interval = verify_interval
+
+        prefix = quote_sheet_name(sheet)
+        column = index_to_column(self.key_col)
+        self.key_range = f"{prefix}!{column}{header_rows + 1}:{column}"
+        self.label = f"{sheet}!{column}"
+        self.checksum_cell = None
+
+        self.rows = {}
+        self.keys = {}
+        self.free_rows = set()
+        self.last_row = header_rows
+        self.duplicates = 0
+        self.expected = (0, 0, 0)
+        self.stale = True
+        self._verified = 0.0
+        self._lock = threading.RLock()
+
+    # Xây và kiểm tra chỉ mục
+
+    def _execute(self, request, kind, idempotent=True):
+        try:
+            return self.service._execute(request, kind, idempotent=idempotent)
+        except HttpError as error:
+            # Import muộn để tránh import vòng với google_sheets_service
+            from google_sheets_service import SheetsApiError
+            raise SheetsApiError(f"Lỗi khi cập nhật chỉ mục khóa '{self.label}': {error}", error)
+
+    def _batch_get(self, ranges, major_dimension='ROWS'):
+        service = self.service
+        result = self._execute(service.service.spreadsheets().values().batchGet(
+            spreadsheetId=self.spreadsheet_id,
+            ranges=ranges,
+            majorDimension=major_dimension
+        ), 'read')
+        return [value_range.get('values', []) for value_range in result.get('valueRanges', [])]
+
+    def _ensure_checksum_cell(self):
+        """Tìm (hoặc tạo) dòng của chỉ mục này trên sheet INDEX_SHEET"""
+        service = self.service
+        sheet = service.get_metadata().sheet(INDEX_SHEET)
+        if sheet is None:
+            sheet = service.get_metadata(refresh=True).sheet(INDEX_SHEET)
+        if sheet is None:
+            service.add_sheet(INDEX_SHEET, rows=100, cols=2, hidden=True)
+            labels = []
+        else:
+            labels = self._batch_get([f'{INDEX_SHEET}!A:A'])[0]
+
+        for row, values in enumerate(labels, start=1):
+            if values and values[0] == self.label:
+                # Dòng đã có: vẫn ghi lại công thức phòng khi là công thức cũ
+                break
+        else:
+            row = len(labels) + 1
+        sheet = service.get_metadata().sheet(INDEX_SHEET)
+        if sheet is not None and sheet.row_count is not None and row > sheet.row_count:
+            try:
+                self._execute(service.service.spreadsheets().batchUpdate(
+                    spreadsheetId=self.spreadsheet_id,
+                    body={'requests': [{'appendDimension': {
+                        'sheetId': sheet.sheet_id, 'dimension': 'ROWS', 'length': 100
+                    }}]}
+                ), 'write', idempotent=False)
+            finally:
+                service.metadata_cache.invalidate(self.spreadsheet_id)
+        self._execute(service.service.spreadsheets().values().update(
+            spreadsheetId=self.spreadsheet_id,
+            range=f'{INDEX_SHEET}!A{row}:B{row}',
+            valueInputOption='USER_ENTERED',
+            body={'values': [[self.label, _checksum_formula(self.key_range)]]}
+        ), 'write')
+        self.checksum_cell = f'{INDEX_SHEET}!B{row}'
+
+    def build(self):
+        """Đọc cột khóa (và ô checksum trong cùng request) rồi xây lại chỉ mục"""
+        self.service._flush_pending()
+        with self._lock:
+            if self.checksum_cell is None:
+                self._ensure_checksum_cell()
+            column, checksum = self._batch_get([self.key_range, self.checksum_cell], 'COLUMNS')
+            keys = column[0] if column else []
+
+            self.rows, self.keys, self.free_rows = {}, {}, set()
+            self.duplicates = 0
+            self.last_row = self.header_rows
+            local = [0, 0, 0]
+            for offset, value in enumerate(keys):
+                key = _key_text(value)
+                row = self.header_rows + 1 + offset
+                if not key:
+                    continue
+                self.keys[row] = key
+                if key in self.rows:
+                    self.duplicates += 1
+                else:
+                    self.rows[key] = row
+                self.last_row = row
+                for i, part in enumerate(_contribution(key, row)):
+                    local[i] += part
+
+            # Checksum đọc cùng lúc với cột khóa là mốc; các thay đổi sau được cộng dồn
+            remote = _parse_checksum(checksum[0][0]) if checksum and checksum[0] else None
+            self.expected = remote if remote is not None else tuple(local)
+            self.stale = False
+            self._verified = time.monotonic()
+
+    def _check_checksum(self, value):
+        """So checksum đọc từ sheet với giá trị mong đợi; False nếu chỉ mục đã lệch"""
+        remote = _parse_checksum(value)
+        return remote is None or remote == self.expected
+
+    def verify(self, force=False):
+        """
+        Đọc ô checksum (một ô) và xây lại chỉ mục nếu cột khóa đã bị đổi từ bên ngoài
+
+        Returns:
+            True nếu chỉ mục đã phải xây lại
+        """
+        with self._lock:
+            if self.stale:
+                self.build()
+                return True
+            if not force and time.monotonic() - self._verified < self.verify_interval:
+                return False
+            self.service._flush_pending()
+            values = self._batch_get([self.checksum_cell])[0]
+            if self._check_checksum(values[0][0] if values and values[0] else ''):
+                self._verified = time.monotonic()
+                return False
+            self.build()
+            return True
+
+    # Cập nhật theo các lần ghi của service
+
+    def _set(self, row, key):
+        if row <= self.header_rows:
+            return
+        old = self.keys.get(row, '')
+        if old == key:
+            return
+        if old:
+            del self.keys[row]
+            if self.rows.get(old) == row:
+                del self.rows[old]
+                if self.duplicates:
+                    # Dòng trùng khóa còn lại không được biết vị trí
+                    self.stale = True
+        if key:
+            self.keys[row] = key
+            self.free_rows.discard(row)
+            if key in self.rows and self.rows[key] != row:
+                self.duplicates += 1
+            else:
+                self.rows[key] = row
+            self.last_row = max(self.last_row, row)
+        self.expected = tuple(e - o + n for e, o, n in zip(
+            self.expected, _contribution(old, row), _contribution(key, row)))
+
+    def _covers(self, rng):
+        return (rng is not None and rng.sheet == self.sheet and rng.start_col <= self.key_col
+                and (rng.end_col is None or rng.end_col >= self.key_col))
+
+    def observe_write(self, range_name, values):
+        """Ghi nhận values đã được ghi bắt đầu từ ô đầu của range_name"""
+        rng = parse_range(range_name)
+        if not self._covers(rng):
+            return
+        offset = self.key_col - rng.start_col
+        with self._lock:
+            for i, row in enumerate(values or []):
+                if offset < len(row) and row[offset] is not None:
+                    self._set(rng.start_row + i, _key_text(row[offset]))
+
+    def observe_append(self, updated_range, values):
+        """Ghi nhận một lần append (INSERT_ROWS đẩy các dòng từ vị trí thêm trở xuống)"""
+        rng = parse_range(updated_range or '')
+        if rng is None:
+            self.stale = True
+            return
+        if rng.sheet != self.sheet:
+            return
+        count = len(values or [])
+        with self._lock:
+            shifted = sorted((row for row in self.keys if row >= rng.start_row), reverse=True)
+            for row in shifted:
+                key = self.keys[row]
+                self._set(row, '')
+                self._set(row + count, key)
+            self.free_rows = {row + count if row >= rng.start_row else row for row in self.free_rows}
+        if self._covers(rng):
+            self.observe_write(updated_range, values)
+
+    def observe_clear(self, cleared_range):
+        """Ghi nhận một phạm vi đã bị xóa"""
+        rng = parse_range(cleared_range or '')
+        if rng is None:
+            self.stale = True
+            return
+        if not self._covers(rng):
+            return
+        with self._lock:
+            for row in [row for row in self.keys
+                        if row >= rng.start_row and (rng.end_row is None or row <= rng.end_row)]:
+                self._set(row, '')
+
+    # Thao tác theo khóa
+
+    def row_of(self, key):
+        """Số dòng của khóa trên sheet, None nếu không có"""
+        with self._lock:
+            if self.stale:
+                self.build()
+            return self.rows.get(_key_text(key))
+
+    def _row_range(self, row):
+        return f"{quote_sheet_name(self.sheet)}!{row}:{row}"
+
+    def get_by_key(self, key):
+        """
+        Đọc dòng của một khóa (một request gồm dòng đó và ô checksum)
+
+        Returns:
+            List giá trị của dòng (từ first_col), None nếu không có khóa
+        """
+        key = _key_text(key)
+        self.service._flush_pending()
+        with self._lock:
+            for attempt in range(2):
+                if self.stale:
+                    self.build()
+                row = self.rows.get(key)
+                if row is None:
+                    # Khóa có thể vừa được thêm từ bên ngoài
+                    if attempt == 0 and self.verify(force=True):
+                        continue
+                    return None
+
+                values, checksum = self._batch_get([
+                    f"{quote_sheet_name(self.sheet)}!{index_to_column(self.first_col)}{row}:{row}",
+                    self.checksum_cell
+                ])
+                cells = values[0] if values else []
+                offset = self.key_col - self.first_col
+                found = _key_text(cells[offset]) if offset < len(cells) else ''
+                if found == key and self._check_checksum(checksum[0][0] if checksum and checksum[0] else ''):
+                    self._verified = time.monotonic()
+                    return cells
+                self.stale = True
+            return None
+
+    def upsert(self, key, row):
+        """
+        Ghi đè dòng của khóa, hoặc ghi vào dòng trống/cuối bảng nếu khóa chưa có
+
+        Args:
+            key: Giá trị khóa
+            row: List giá trị của dòng bắt đầu từ first_col; ô khóa được đặt bằng key
+
+        Returns:
+            Số dòng trên sheet đã ghi
+        """
+        key = _key_text(key)
+        if not key:
+            raise ValueError("Khóa không được rỗng")
+        values = list(row)
+        offset = self.key_col - self.first_col
+        values.extend([''] * (offset + 1 - len(values)))
+        values[offset] = key
+
+        with self._lock:
+            # Khóa mới: luôn kiểm tra checksum để không ghi trùng khóa vừa được thêm từ bên ngoài
+            self.verify(force=key not in self.rows)
+            target = self.rows.get(key)
+            if target is None:
+                target = min(self.free_rows) if self.free_rows else self.last_row + 1
+                self._ensure_rows(target)
+            # Cập nhật chỉ mục ngay để upsert tiếp theo thấy dòng này dù lần ghi đang nằm trong bộ đệm
+            self._set(target, key)
+            self.service.write_data(
+                f"{quote_sheet_name(self.sheet)}!{index_to_column(self.first_col)}{target}:"
+                f"{index_to_column(self.first_col + len(values) - 1)}{target}",
+                [values]
+            )
+            return target
+
+    def delete_by_key(self, key):
+        """
+        Xóa nội dung dòng của khóa (không xóa dòng, các dòng khác giữ nguyên vị trí)
+
+        Returns:
+            True nếu đã xóa, False nếu không có khóa
+        """
+        key = _key_text(key)
+        with self._lock:
+            self.verify()
+            row = self.rows.get(key)
+            if row is None:
+                return False
+            self.service.clear_data(self._row_range(row))
+            self._set(row, '')
+            if row < self.last_row:
+                self.free_rows.add(row)
+            else:
+                self.last_row = max(self.keys, default=self.header_rows)
+                self.free_rows = {free for free in self.free_rows if free < self.last_row}
+            return True
+
+    def _ensure_rows(self, row):
+        """Thêm dòng cho sheet nếu row vượt quá lưới hiện tại"""
+        service = self.service
+        sheet = service.get_metadata().sheet(self.sheet)
+        if sheet is None or sheet.row_count is None or row <= sheet.row_count:
+            return
+        try:
+            self._execute(service.service.spreadsheets().batchUpdate(
+                spreadsheetId=self.spreadsheet_id,
+                body={'requests': [{'appendDimension': {
+                    'sheetId': sheet.sheet_id, 'dimension': 'ROWS',
+                    'length': max(row - sheet.row_count, 1000)
+                }}]}
+            ), 'write', idempotent=False)
+        finally:
+            service.metadata_cache.invalidate(self.spreadsheet_id)
@@ -0,0 +1,170 @@
+"""
+Sheets Manager - Quản lý nhiều spreadsheet dùng chung credentials và kết nối HTTP
+"""
+
+import os
+import threading
+import weakref
+
+from google.auth.transport.requests import Request
+from googleapiclient.http import build_http
+from google_auth_httplib2 import AuthorizedHttp
+
+from google_sheets_service import (SCOPES, GoogleSheetsService, build_sheets_resource,
+                                   cache_from_env, limiter_from_env, metadata_cache_from_env)
+from sheets_credentials import get_provider
+from sheets_metrics import SheetsMetrics
+from sheets_quota import QuotaStats, RetryPolicy
+
+
+class SheetsManager:
+    """
+    Cấp handle (GoogleSheetsService) cho nhiều spreadsheet từ một chỗ
+
+    Mọi handle dùng chung một credentials (refresh dưới một khóa), một
+    resource đã build từ discovery document, cache đọc, cache metadata và
+    bộ giới hạn quota (quota tính theo user, không theo spreadsheet). Mỗi thread có
+    một kết nối httplib2 keep-alive riêng, dùng cho mọi spreadsheet, vì
+    httplib2.Http không thread-safe. Mở handle cho spreadsheet mới không tốn
+    thêm lần bắt tay TLS hay parse discovery nào.
+
+    Ví dụ:
+        manager = SheetsManager()
+        manager.authenticate()
+        for spreadsheet_id in ids:
+            print(manager.open(spreadsheet_id).read_data('Sheet1!A1:C10'))
+    """
+
+    def __init__(self, credentials_file=None, api_endpoint=None):
+        """
+        Args:
+            credentials_file: File credentials OAuth (mặc định lấy từ CREDENTIALS_FILE)
+            api_endpoint: Địa chỉ API thay thế (mặc định lấy từ SHEETS_API_ENDPOINT)
+        """
+        self.credentials_file = credentials_file or os.getenv('CREDENTIALS_FILE', 'credentials.json')
+        self.api_endpoint = api_endpoint or os.getenv('SHEETS_API_ENDPOINT')
+        self.creds = None
+        self.provider = None
+        self.resource = None
+
+        self.cache = cache_from_env()
+        self.metadata_cache = metadata_cache_from_env()
+        self.limiter = limiter_from_env()
+        self.retry_policy = RetryPolicy()
+        self.quota_stats = QuotaStats()
+        self.metrics = None
+
+        self._handles = {}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._local = threading.local()
+        # Kết nối của thread đã kết thúc tự được giải phóng
+        self._https = weakref.WeakSet()
+
+    def authenticate(self, creds=None):
+        """
+        Xác thực một lần cho mọi spreadsheet
+
+        Args:
+            creds: Credentials có sẵn; None để lấy từ CredentialProvider dùng chung
+                (service account, token.json hoặc đăng nhập) như GoogleSheetsService.authenticate
+        """
+        with self._lock:
+            if creds is None and self.creds is not None and self.resource is not None:
+                return True
+            if creds is None:
+                self.provider = get_provider(self.credentials_file, scopes=SCOPES)
+                creds = self.provider.credentials()
+            else:
+                self.provider = None
+            self.creds = creds
+            self.resource = build_sheets_resource(self.creds, self.api_endpoint)
+            for handle in self._handles.values():
+                handle.creds = self.creds
+                handle.service = self.resource
+        return True
+
+    def open(self, spreadsheet_id):
+        """
+        Lấy handle cho một spreadsheet (tạo mới nếu chưa có)
+
+        Returns:
+            GoogleSheetsService dùng chung tài nguyên của manager
+        """
+        with self._lock:
+            handle = self._handles.get(spreadsheet_id)
+            if handle is None:
+                handle = GoogleSheetsService(spreadsheet_id, manager=self)
+                self._handles[spreadsheet_id] = handle
+            return handle
+
+    def close_handle(self, spreadsheet_id):
+        """Bỏ handle của một spreadsheet, gửi nốt các lần ghi đang chờ của nó"""
+        with self._lock:
+            handle = self._handles.pop(spreadsheet_id, None)
+        if handle is not None:
+            handle.stop_watching()
+            handle.disable_write_buffer()
+            handle.disable_journal()
+            self.metadata_cache.invalidate(spreadsheet_id)
+            if self.cache is not None:
+                self.cache.invalidate(spreadsheet_id)
+
+    @property
+    def spreadsheet_ids(self):
+        """Các spreadsheet đang có handle"""
+        with self._lock:
+            return list(self._handles)
+
+    def get_quota_stats(self):
+        """Bộ đếm giới hạn tốc độ/thử lại chung của mọi handle"""
+        return self.quota_stats.as_dict()
+
+    def enable_metrics(self, metrics=None, span_file=None, span_endpoint=None):
+        """Bật đo đạc chung cho mọi handle (xem GoogleSheetsService.enable_metrics)"""
+        with self._lock:
+            if metrics is None:
+                metrics = self.metrics or SheetsMetrics(span_file, span_endpoint)
+            self.metrics = metrics
+            for handle in self._handles.values():
+                handle.metrics = metrics
+        return metrics
+
+    def disable_metrics(self):
+        """Tắt đo đạc của mọi handle"""
+        with self._lock:
+            metrics, self.metrics = self.metrics, None
+            for handle in self._handles.values():
+                handle.metrics = None
+        if metrics is not None:
+            metrics.close()
+
+    def refresh_credentials(self):
+        """Refresh access token nếu hết hạn; chỉ một thread refresh, các thread khác chờ"""
+        creds = self.creds
+        if creds is None or creds.valid:
+            return
+        with self._refresh_lock:
+            if not creds.valid:
+                if self.provider is not None:
+                    # Refresh nền chưa kịp (ví dụ mất mạng): refresh dưới khóa file dùng chung
+                    self.provider.refresh()
+                else:
+                    creds.refresh(Request())
+
+    def thread_http(self):
+        """Kết nối HTTP keep-alive của thread hiện tại (tạo ở lần gọi đầu tiên)"""
+        http = getattr(self._local, 'http', None)
+        if http is None or getattr(http, 'credentials', None) is not self.creds:
+            http = AuthorizedHttp(self.creds, http=build_http()) if self.creds else build_http()
+            self._local.http = http
+            self._https.add(http)
+        return http
+
+    def close(self):
+        """Đóng các handle và mọi kết nối HTTP đang mở"""
+        for spreadsheet_id in self.spreadsheet_ids:
+            self.close_handle(spreadsheet_id)
+        self.disable_metrics()
+        for http in list(self._https):
+            getattr(http, 'http', http).close()
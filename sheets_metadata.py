@@ -0,0 +1,125 @@
+"""
+Sheets Metadata - Cache metadata của spreadsheet (danh sách sheet, sheetId, kích thước lưới)
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+# Chỉ lấy những trường cần dùng, không tải định dạng, named range, ...
+METADATA_FIELDS = (
+    'properties(title),'
+    'sheets(properties(sheetId,title,index,gridProperties(rowCount,columnCount)))'
+)
+
+SheetInfo = namedtuple('SheetInfo', ['sheet_id', 'title', 'index', 'row_count', 'column_count'])
+
+
+class SpreadsheetMetadata:
+    """Metadata của một spreadsheet: tiêu đề và thông tin từng sheet"""
+
+    def __init__(self, title, sheets):
+        self.title = title
+        self.sheets = sheets
+        self._by_title = {sheet.title: sheet for sheet in sheets}
+
+    @classmethod
+    def from_response(cls, response):
+        """Tạo từ kết quả spreadsheets().get với METADATA_FIELDS"""
+        sheets = []
+        for sheet in response.get('sheets', []):
+            properties = sheet.get('properties', {})
+            grid = properties.get('gridProperties', {})
+            sheets.append(SheetInfo(
+                sheet_id=properties.get('sheetId'),
+                title=properties.get('title', ''),
+                index=properties.get('index', len(sheets)),
+                row_count=grid.get('rowCount'),
+                column_count=grid.get('columnCount')
+            ))
+        return cls(response.get('properties', {}).get('title', 'Unknown'), sheets)
+
+    @property
+    def sheet_titles(self):
+        return [sheet.title for sheet in self.sheets]
+
+    def sheet(self, title):
+        """SheetInfo theo tên sheet, None nếu không có"""
+        return self._by_title.get(title)
+
+    def clamp(self, rng):
+        """
+        Giới hạn phạm vi mở (ví dụ 'Sheet1!A:C') theo kích thước lưới của sheet
+
+        Args:
+            rng: A1Range có tên sheet
+
+        Returns:
+            A1Range đã có end_row/end_col, hoặc rng nếu không biết sheet
+        """
+        sheet = self.sheet(rng.sheet) if rng.sheet is not None else None
+        if sheet is None or sheet.row_count is None or sheet.column_count is None:
+            return rng
+        end_row = sheet.row_count if rng.end_row is None else min(rng.end_row, sheet.row_count)
+        end_col = sheet.column_count if rng.end_col is None else min(rng.end_col, sheet.column_count)
+        return rng._replace(end_row=end_row, end_col=end_col)
+
+
+class MetadataCache:
+    """
+    Cache metadata theo spreadsheet, hết hạn sau ttl giây
+
+    Các thao tác cấu trúc của chính service (thêm/xóa sheet, mở rộng lưới)
+    gọi invalidate() để lần đọc sau lấy metadata mới; append chèn dòng gọi
+    add_rows() để cập nhật số dòng mà không phải đọc lại.
+    """
+
+    def __init__(self, ttl=300.0):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, spreadsheet_id):
+        """SpreadsheetMetadata còn hạn, hoặc None"""
+        with self._lock:
+            entry = self._entries.get(spreadsheet_id)
+            if entry is None:
+                return None
+            metadata, expires = entry
+            if time.monotonic() >= expires:
+                del self._entries[spreadsheet_id]
+                return None
+            return metadata
+
+    def put(self, spreadsheet_id, metadata):
+        with self._lock:
+            self._entries[spreadsheet_id] = (metadata, time.monotonic() + self.ttl)
+
+    def add_rows(self, spreadsheet_id, title, rows, end_col=None):
+        """
+        Tăng row_count của một sheet đã cache thêm rows dòng (append INSERT_ROWS)
+
+        Nếu end_col vượt số cột đã biết (lưới cũng được mở rộng theo cột) hoặc
+        không biết sheet, metadata của spreadsheet bị bỏ để lần sau đọc lại.
+        """
+        with self._lock:
+            entry = self._entries.get(spreadsheet_id)
+            if entry is None:
+                return
+            metadata, expires = entry
+            sheet = metadata.sheet(title)
+            if (sheet is None or sheet.row_count is None
+                    or (end_col is not None and end_col > (sheet.column_count or 0))):
+                del self._entries[spreadsheet_id]
+                return
+            sheets = [info._replace(row_count=info.row_count + rows) if info.title == title else info
+                      for info in metadata.sheets]
+            self._entries[spreadsheet_id] = (SpreadsheetMetadata(metadata.title, sheets), expires)
+
+    def invalidate(self, spreadsheet_id=None):
+        """Bỏ metadata của một spreadsheet (hoặc tất cả)"""
+        with self._lock:
+            if spreadsheet_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(spreadsheet_id, None)
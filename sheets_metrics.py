@@ -0,0 +1,337 @@
+"""
+Sheets Metrics - Đo thời gian, kích thước payload và số ô của mỗi request Sheets API
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Ngưỡng (giây) của histogram độ trễ
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_COUNTERS = (
+    ('requests_total', 'Số request đã gửi'),
+    ('errors_total', 'Số request lỗi sau khi hết lượt thử lại'),
+    ('quota_errors_total', 'Số lần nhận HTTP 429'),
+    ('retries_total', 'Số lần thử lại'),
+    ('request_bytes_total', 'Tổng số byte gửi đi (URL và body)'),
+    ('response_bytes_total', 'Tổng số byte nhận về'),
+    ('cells_read_total', 'Tổng số ô đọc được'),
+    ('cells_written_total', 'Tổng số ô đã ghi'),
+)
+
+
+def _spreadsheet_of(uri):
+    """Lấy spreadsheet ID từ URL dạng .../v4/spreadsheets/{id}/..."""
+    marker = '/spreadsheets/'
+    start = uri.find(marker)
+    if start < 0:
+        return ''
+    rest = uri[start + len(marker):]
+    for separator in ('/', '?', ':'):
+        end = rest.find(separator)
+        if end >= 0:
+            rest = rest[:end]
+    return rest
+
+
+def _count_values(values):
+    return sum(len(row) for row in values)
+
+
+def count_cells(result):
+    """
+    Đếm số ô đọc/ghi từ kết quả của một request
+
+    Returns:
+        (cells_read, cells_written)
+    """
+    if not isinstance(result, dict):
+        return 0, 0
+    read = _count_values(result.get('values', []))
+    for value_range in result.get('valueRanges', []):
+        read += _count_values(value_range.get('values', []))
+    written = (result.get('updatedCells') or result.get('totalUpdatedCells')
+               or result.get('updates', {}).get('updatedCells') or 0)
+    return read, written
+
+
+class CallStats:
+    """Thông tin của một lần gọi API, được vòng thử lại cập nhật"""
+
+    __slots__ = ('retries', 'quota_errors', 'response_bytes')
+
+    def __init__(self):
+        self.retries = 0
+        self.quota_errors = 0
+        self.response_bytes = 0
+
+
+class SpanExporter:
+    """
+    Ghi span theo kiểu OpenTelemetry ra file JSONL hoặc POST lên một endpoint
+
+    Span được đưa vào hàng đợi và ghi/gửi theo lô bởi một thread nền, nên
+    request không phải chờ I/O của việc xuất span.
+    """
+
+    def __init__(self, path=None, endpoint=None, batch_size=100, flush_interval=1.0):
+        """
+        Args:
+            path: File JSONL nhận span (mỗi dòng một span)
+            endpoint: URL nhận POST JSON {'spans': [...]}
+            batch_size: Số span tối đa mỗi lần ghi/gửi
+            flush_interval: Chu kỳ (giây) ghi/gửi span còn lại
+        """
+        self.path = path
+        self.endpoint = endpoint
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+
+        self._queue = queue.Queue(maxsize=10000)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='sheets-spans', daemon=True)
+        self._thread.start()
+
+    def export(self, span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while not (self._closed and self._queue.empty()):
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=self.flush_interval))
+                while len(batch) < self.batch_size:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            if batch:
+                self._write(batch)
+
+    def _write(self, spans):
+        if self.path:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(''.join(json.dumps(span, ensure_ascii=False) + '\n' for span in spans))
+        if self.endpoint:
+            request = urllib.request.Request(
+                self.endpoint, data=json.dumps({'spans': spans}).encode('utf-8'),
+                headers={'Content-Type': 'application/json'}, method='POST'
+            )
+            try:
+                urllib.request.urlopen(request, timeout=5).close()
+            except OSError:
+                # Không để lỗi của nơi nhận span ảnh hưởng tới ứng dụng
+                self.dropped += len(spans)
+
+    def close(self):
+        """Ghi/gửi nốt các span còn lại và dừng thread nền"""
+        self._closed = True
+        self._thread.join()
+
+
+class SheetsMetrics:
+    """
+    Bộ đếm và histogram độ trễ theo method và spreadsheet
+
+    Chỉ được dùng khi gán vào service (enable_metrics); khi tắt, vòng gửi
+    request chỉ kiểm tra một thuộc tính None.
+
+    Ví dụ:
+        metrics = service.enable_metrics(span_file='spans.jsonl')
+        metrics.serve(9464)           # http://127.0.0.1:9464/metrics
+        print(metrics.to_prometheus())
+    """
+
+    def __init__(self, span_file=None, span_endpoint=None, buckets=LATENCY_BUCKETS):
+        """
+        Args:
+            span_file: File JSONL nhận span của từng request (None = không ghi)
+            span_endpoint: URL nhận span qua POST (None = không gửi)
+            buckets: Ngưỡng (giây) của histogram độ trễ
+        """
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+        self._spans = None
+        if span_file or span_endpoint:
+            self._spans = SpanExporter(span_file, span_endpoint)
+
+    def execute(self, request, run):
+        """
+        Chạy run(call) cho một HttpRequest của googleapiclient và ghi lại số đo
+
+        Kích thước response được lấy bằng cách bọc request.postproc.
+        """
+        call = CallStats()
+        postproc = request.postproc
+
+        def measured_postproc(resp, content):
+            call.response_bytes += len(content or b'')
+            return postproc(resp, content)
+
+        request.postproc = measured_postproc
+        body = request.body or b''
+        request_bytes = len(request.uri) + len(body.encode('utf-8') if isinstance(body, str) else body)
+        method = request.methodId or request.method
+        started_ns = time.time_ns()
+        started = time.perf_counter()
+        result, error = None, None
+        try:
+            result = run(call)
+            return result
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            status = 'ok' if error is None else str(
+                getattr(error, 'status', None) or getattr(getattr(error, 'resp', None), 'status', 'error')
+            )
+            cells_read, cells_written = count_cells(result)
+            self.record(method, _spreadsheet_of(request.uri), time.perf_counter() - started,
+                        status=status, request_bytes=request_bytes,
+                        response_bytes=call.response_bytes, cells_read=cells_read,
+                        cells_written=cells_written, retries=call.retries,
+                        quota_errors=call.quota_errors, started_ns=started_ns)
+
+    def record(self, method, spreadsheet_id, seconds, status='ok', request_bytes=0,
+               response_bytes=0, cells_read=0, cells_written=0, retries=0, quota_errors=0,
+               started_ns=None):
+        """Ghi nhận một lần gọi API (dùng trực tiếp cho client không dùng googleapiclient)"""
+        key = (method, spreadsheet_id)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {
+                    'counters': dict.fromkeys((name for name, _ in _COUNTERS), 0),
+                    'buckets': [0] * len(self.buckets),
+                    'sum': 0.0,
+                    'count': 0,
+                }
+            counters = series['counters']
+            counters['requests_total'] += 1
+            counters['errors_total'] += status != 'ok'
+            counters['quota_errors_total'] += quota_errors
+            counters['retries_total'] += retries
+            counters['request_bytes_total'] += request_bytes
+            counters['response_bytes_total'] += response_bytes
+            counters['cells_read_total'] += cells_read
+            counters['cells_written_total'] += cells_written
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series['buckets'][index] += 1
+                    break
+            series['sum'] += seconds
+            series['count'] += 1
+
+        if self._spans is not None:
+            start = started_ns if started_ns is not None else time.time_ns() - int(seconds * 1e9)
+            self._spans.export({
+                'name': method,
+                'span_id': os.urandom(8).hex(),
+                'trace_id': os.urandom(16).hex(),
+                'start_time_unix_nano': start,
+                'end_time_unix_nano': start + int(seconds * 1e9),
+                'status': 'OK' if status == 'ok' else 'ERROR',
+                'attributes': {
+                    'sheets.spreadsheet_id': spreadsheet_id,
+                    'http.status_code': status,
+                    'sheets.request_bytes': request_bytes,
+                    'sheets.response_bytes': response_bytes,
+                    'sheets.cells_read': cells_read,
+                    'sheets.cells_written': cells_written,
+                    'sheets.retries': retries,
+                    'sheets.quota_errors': quota_errors,
+                },
+            })
+
+    def snapshot(self):
+        """
+        Số đo hiện tại
+
+        Returns:
+            Dict {(method, spreadsheet_id): {'counters', 'buckets', 'sum', 'count'}}
+        """
+        with self._lock:
+            return {
+                key: {'counters': dict(series['counters']), 'buckets': list(series['buckets']),
+                      'sum': series['sum'], 'count': series['count']}
+                for key, series in self._series.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def to_prometheus(self):
+        """Xuất số đo theo định dạng text của Prometheus"""
+        snapshot = sorted(self.snapshot().items())
+        lines = []
+        for name, description in _COUNTERS:
+            metric = f'sheets_api_{name}'
+            lines.append(f'# HELP {metric} {description}')
+            lines.append(f'# TYPE {metric} counter')
+            for (method, spreadsheet_id), series in snapshot:
+                labels = f'method="{method}",spreadsheet="{spreadsheet_id}"'
+                lines.append(f'{metric}{{{labels}}} {series["counters"][name]}')
+
+        metric = 'sheets_api_request_duration_seconds'
+        lines.append(f'# HELP {metric} Độ trễ của request (kể cả thử lại)')
+        lines.append(f'# TYPE {metric} histogram')
+        for (method, spreadsheet_id), series in snapshot:
+            labels = f'method="{method}",spreadsheet="{spreadsheet_id}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, series['buckets']):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {series["count"]}')
+            lines.append(f'{metric}_sum{{{labels}}} {series["sum"]}')
+            lines.append(f'{metric}_count{{{labels}}} {series["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """Ghi số đo ra file (cho textfile collector của node_exporter)"""
+        temp = f'{path}.tmp'
+        with open(temp, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        os.replace(temp, path)
+
+    def serve(self, port=9464, host='127.0.0.1'):
+        """
+        Phục vụ /metrics qua HTTP trong một thread nền
+
+        Returns:
+            ThreadingHTTPServer (gọi shutdown() để dừng)
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.to_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name='sheets-metrics', daemon=True).start()
+        return server
+
+    def close(self):
+        """Ghi nốt span đang chờ"""
+        if self._spans is not None:
+            self._spans.close()
@@ -0,0 +1,344 @@
+"""
+Sheets Query - Chọn cột, lọc và gom nhóm dữ liệu sheet, chỉ đọc những cột cần dùng
+"""
+
+import operator
+import threading
+import time
+
+from googleapiclient.errors import HttpError
+
+from sheets_range import index_to_column, quote_sheet_name
+from sheets_table import SheetTable, _require_numpy as _numpy, build_table
+
+_COMPARISONS = {
+    '==': operator.eq, '!=': operator.ne,
+    '<': operator.lt, '<=': operator.le,
+    '>': operator.gt, '>=': operator.ge,
+}
+
+AGGREGATES = ('count', 'sum', 'mean', 'min', 'max')
+
+
+def _require_numpy():
+    return _numpy('select')
+
+
+def _normalize_where(where):
+    """Chuyển where về list (cột, toán tử, giá trị); dict {cột: giá trị} nghĩa là '=='"""
+    if not where:
+        return []
+    if isinstance(where, dict):
+        return [(column, '==', value) for column, value in where.items()]
+    conditions = []
+    for condition in where:
+        column, op = condition[0], condition[1]
+        value = condition[2] if len(condition) > 2 else None
+        if op not in _COMPARISONS and op not in ('in', 'not in', 'isnull', 'notnull'):
+            raise ValueError(f"Toán tử không hỗ trợ: '{op}'")
+        conditions.append((column, op, value))
+    return conditions
+
+
+def _normalize_aggregates(aggregates):
+    """Chuyển aggregates về list (cột, hàm); dict {cột: hàm hoặc list hàm}"""
+    result = []
+    for column, funcs in (aggregates or {}).items():
+        for func in [funcs] if isinstance(funcs, str) else funcs:
+            if func not in AGGREGATES:
+                raise ValueError(f"Hàm gom nhóm không hỗ trợ: '{func}'. Chọn một trong {', '.join(AGGREGATES)}")
+            result.append((column, func))
+    return result
+
+
+def evaluate_where(table, conditions):
+    """
+    Tính mask lọc cho cả bảng bằng phép toán vector của NumPy
+
+    Ô rỗng không thỏa điều kiện so sánh nào (trừ 'isnull').
+    """
+    np = _require_numpy()
+    keep = np.ones(len(table), dtype=bool)
+    for column, op, value in conditions:
+        data, nulls = table[column], table.null_mask(column)
+        if op == 'isnull':
+            keep &= nulls
+            continue
+        if op == 'notnull':
+            keep &= ~nulls
+            continue
+
+        valid = ~nulls & keep
+        matched = np.zeros(len(table), dtype=bool)
+        if valid.any():
+            values = data[valid]
+            if np.issubdtype(data.dtype, np.datetime64) and op in _COMPARISONS:
+                value = np.datetime64(value, 'ms')
+            if op == 'in':
+                matched[valid] = np.isin(values, list(value))
+            elif op == 'not in':
+                matched[valid] = ~np.isin(values, list(value))
+            else:
+                try:
+                    matched[valid] = _COMPARISONS[op](values, value)
+                except TypeError:
+                    # So sánh thứ tự giữa chuỗi và số: không ô nào thỏa
+                    matched[valid] = False
+        keep &= matched
+    return keep
+
+
+class _GroupState:
+    """Kết quả gom nhóm cộng dồn qua nhiều phần dữ liệu"""
+
+    def __init__(self, group_by, aggregates):
+        self.group_by = group_by
+        self.aggregates = aggregates
+        # {khóa nhóm: [[count, sum, min, max, số giá trị số] cho mỗi aggregate]}
+        self.groups = {}
+
+    def add(self, table, keep):
+        if not keep.any():
+            return
+        np = _require_numpy()
+        keys = []
+        for column in self.group_by:
+            data = table[column][keep]
+            nulls = table.null_mask(column)[keep]
+            if data.dtype == object:
+                data = np.where(nulls, '', data).astype(str)
+            keys.append(data)
+
+        # Mã nhóm cho từng dòng: np.unique trên từng cột khóa rồi trên tổ hợp mã
+        codes = [np.unique(key, return_inverse=True) for key in keys]
+        if codes:
+            combined = np.stack([inverse.reshape(-1) for _, inverse in codes], axis=1)
+            unique_rows, group_index = np.unique(combined, axis=0, return_inverse=True)
+            group_index = group_index.reshape(-1)
+            group_keys = [tuple(codes[i][0][row[i]].item() for i in range(len(codes)))
+                          for row in unique_rows]
+        else:
+            group_index = np.zeros(int(keep.sum()), dtype=np.int64)
+            group_keys = [()]
+        size = len(group_keys)
+
+        partials = []
+        for column, _ in self.aggregates:
+            if column == '*':
+                counts = np.bincount(group_index, minlength=size)
+                partials.append((counts, None, None, None, None))
+                continue
+            data = table[column][keep]
+            valid = ~table.null_mask(column)[keep]
+            counts = np.bincount(group_index[valid], minlength=size)
+            if data.dtype.kind in 'fiub':
+                values = data[valid].astype(np.float64)
+                index = group_index[valid]
+                sums = np.bincount(index, weights=values, minlength=size)
+                mins = np.full(size, np.inf)
+                maxs = np.full(size, -np.inf)
+                np.minimum.at(mins, index, values)
+                np.maximum.at(maxs, index, values)
+                partials.append((counts, sums, mins, maxs, counts))
+            else:
+                # Cột không phải số: không góp vào sum/mean/min/max
+                partials.append((counts, None, None, None, None))
+
+        for g, key in enumerate(group_keys):
+            state = self.groups.get(key)
+            if state is None:
+                state = self.groups[key] = [[0, 0.0, np.inf, -np.inf, 0] for _ in self.aggregates]
+            for slot, (counts, sums, mins, maxs, numeric) in zip(state, partials):
+                slot[0] += int(counts[g])
+                if sums is not None:
+                    slot[4] += int(numeric[g])
+                    slot[1] += float(sums[g])
+                    slot[2] = min(slot[2], float(mins[g]))
+                    slot[3] = max(slot[3], float(maxs[g]))
+
+    def result(self):
+        np = _require_numpy()
+        try:
+            keys = sorted(self.groups)
+        except TypeError:
+            keys = sorted(self.groups, key=lambda k: tuple(str(v) for v in k))
+        names, data, masks = [], {}, {}
+        for i, column in enumerate(self.group_by):
+            values = [key[i] for key in keys]
+            data[column] = np.array(values, dtype=object if any(isinstance(v, str) for v in values) else None)
+            masks[column] = np.zeros(len(keys), dtype=bool)
+            names.append(column)
+
+        for a, (column, func) in enumerate(self.aggregates):
+            name = f'{func}({column})'
+            slots = [self.groups[key][a] for key in keys]
+            if func == 'count':
+                values = np.array([slot[0] for slot in slots], dtype=np.int64)
+                mask = np.zeros(len(keys), dtype=bool)
+            else:
+                if func == 'sum':
+                    values = [slot[1] for slot in slots]
+                elif func == 'mean':
+                    values = [slot[1] / slot[4] if slot[4] else np.nan for slot in slots]
+                elif func == 'min':
+                    values = [slot[2] for slot in slots]
+                else:
+                    values = [slot[3] for slot in slots]
+                values = np.array(values, dtype=np.float64)
+                # Nhóm không có giá trị số nào (cột chữ hoặc toàn ô trống): kết quả rỗng, không phải 0
+                mask = ~np.isfinite(values) | np.array([slot[4] == 0 for slot in slots], dtype=bool)
+                values[mask] = np.nan
+            data[name], masks[name] = values, mask
+            names.append(name)
+        return SheetTable(names, data, masks)
+
+
+class QueryEngine:
+    """
+    Truy vấn trên sheet có dòng tiêu đề: chỉ đọc các cột cần cho select/where/group_by
+
+    Dòng tiêu đề của mỗi sheet được cache (cùng thời hạn với cache metadata)
+    để ánh xạ tên cột sang cột trên sheet mà không cần đọc lại.
+    """
+
+    def __init__(self, service):
+        self.service = service
+        self._headers = {}
+        self._lock = threading.Lock()
+
+    def forget(self, sheet=None):
+        """Bỏ dòng tiêu đề đã cache của một sheet (hoặc tất cả)"""
+        with self._lock:
+            if sheet is None:
+                self._headers.clear()
+            else:
+                for key in [k for k in self._headers if k[1] == sheet]:
+                    del self._headers[key]
+
+    def header(self, sheet, header_row=1, refresh=False):
+        """Tên các cột của sheet (dòng header_row), lấy từ cache nếu còn hạn"""
+        key = (self.service.spreadsheet_id, sheet, header_row)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._headers.get(key)
+        if entry is not None and not refresh and entry[1] > now:
+            return entry[0]
+
+        values = self._batch_get([f"{quote_sheet_name(sheet)}!{header_row}:{header_row}"], 'ROWS')[0]
+        names = [str(value) for value in values[0]] if values else []
+        with self._lock:
+            self._headers[key] = (names, now + self.service.metadata_cache.ttl)
+        return names
+
+    def _batch_get(self, ranges, major_dimension='COLUMNS'):
+        service = self.service
+        results = []
+        for group in service._split_ranges(ranges):
+            try:
+                result = service._execute(service.service.spreadsheets().values().batchGet(
+                    spreadsheetId=service.spreadsheet_id,
+                    ranges=group,
+                    majorDimension=major_dimension,
+                    valueRenderOption='UNFORMATTED_VALUE'
+                ), 'read')
+            except HttpError as error:
+                # Import muộn để tránh import vòng với google_sheets_service
+                from google_sheets_service import SheetsApiError
+                raise SheetsApiError(f"Lỗi khi đọc dữ liệu cho truy vấn: {error}", error)
+            results.extend(value_range.get('values', []) for value_range in result.get('valueRanges', []))
+        return results
+
+    def _plan(self, sheet, header_row, names):
+        """Cột trên sheet (bắt đầu từ 1) của từng tên cột, gộp các cột liền nhau thành khối"""
+        header = self.header(sheet, header_row)
+        missing = [name for name in names if name not in header]
+        if missing:
+            header = self.header(sheet, header_row, refresh=True)
+            missing = [name for name in names if name not in header]
+        if missing:
+            raise ValueError(f"Không tìm thấy cột {missing} trong sheet '{sheet}'. Các cột: {header}")
+
+        indexes = sorted({header.index(name) + 1 for name in names})
+        blocks = []
+        for index in indexes:
+            if blocks and blocks[-1][1] == index - 1:
+                blocks[-1][1] = index
+            else:
+                blocks.append([index, index])
+        return header, blocks
+
+    def _read(self, sheet, header, blocks, first_row, last_row, dtypes):
+        """Đọc các khối cột trong một request batchGet, trả về SheetTable"""
+        prefix = quote_sheet_name(sheet)
+        end = '' if last_row is None else last_row
+        ranges = [f"{prefix}!{index_to_column(start)}{first_row}:{index_to_column(stop)}{end}"
+                  for start, stop in blocks]
+        columns = []
+        for (start, stop), values in zip(blocks, self._batch_get(ranges)):
+            values = list(values) + [[] for _ in range(stop - start + 1 - len(values))]
+            # Gắn tên cột từ dòng tiêu đề đã cache để dtypes theo tên cột vẫn dùng được
+            columns.extend([header[start - 1 + i]] + list(column) for i, column in enumerate(values))
+        return build_table(columns, header=True, dtypes=dtypes, start_col=blocks[0][0] if blocks else 1)
+
+    def _tables(self, sheet, names, header_row, chunk_rows, dtypes):
+        header, blocks = self._plan(sheet, header_row, names)
+        if chunk_rows is None:
+            yield self._read(sheet, header, blocks, header_row + 1, None, dtypes)
+            return
+
+        info = self.service.get_metadata().sheet(sheet)
+        limit = info.row_count if info is not None else None
+        row = header_row + 1
+        while limit is None or row <= limit:
+            last = row + chunk_rows - 1 if limit is None else min(row + chunk_rows - 1, limit)
+            table = self._read(sheet, header, blocks, row, last, dtypes)
+            if not len(table):
+                # Dừng ở phần rỗng đầu tiên giống iter_rows
+                return
+            yield table
+            row = last + 1
+
+    def iter_select(self, sheet, columns=None, where=None, header_row=1, chunk_rows=5000,
+                    dtypes=None):
+        """Xem GoogleSheetsService.iter_select"""
+        _require_numpy()
+        self.service._flush_pending()
+        conditions = _normalize_where(where)
+        columns = list(columns) if columns is not None else self.header(sheet, header_row)
+        needed = list(dict.fromkeys(columns + [column for column, _, _ in conditions]))
+
+        for table in self._tables(sheet, needed, header_row, chunk_rows, dtypes):
+            keep = evaluate_where(table, conditions)
+            yield SheetTable(columns, {name: table[name][keep] for name in columns},
+                             {name: table.null_mask(name)[keep] for name in columns})
+
+    def select(self, sheet, columns=None, where=None, group_by=None, aggregates=None,
+               header_row=1, chunk_rows=None, dtypes=None):
+        """Xem GoogleSheetsService.select"""
+        np = _require_numpy()
+        if group_by is None and not aggregates:
+            parts = list(self.iter_select(sheet, columns, where, header_row, chunk_rows, dtypes))
+            if len(parts) == 1:
+                return parts[0]
+            names = parts[0].columns if parts else list(columns or [])
+            return SheetTable(
+                names,
+                {name: np.concatenate([part[name] for part in parts]) for name in names} if parts else {},
+                {name: np.concatenate([part.null_mask(name) for part in parts]) for name in names} if parts else {}
+            )
+
+        self.service._flush_pending()
+        group_by = [group_by] if isinstance(group_by, str) else list(group_by or [])
+        aggregates = _normalize_aggregates(aggregates or {'*': 'count'})
+        conditions = _normalize_where(where)
+        needed = list(dict.fromkeys(
+            group_by + [column for column, _ in aggregates if column != '*']
+            + [column for column, _, _ in conditions]
+        ))
+        if not needed:
+            needed = self.header(sheet, header_row)[:1]
+
+        state = _GroupState(group_by, aggregates)
+        for table in self._tables(sheet, needed, header_row, chunk_rows, dtypes):
+            state.add(table, evaluate_where(table, conditions))
+        return state.result()
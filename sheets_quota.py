@@ -0,0 +1,136 @@
+"""
+Sheets Quota - Giới hạn tốc độ theo quota và retry với backoff cho Google Sheets API
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+# Các HTTP status nên thử lại: quá quota (429) và lỗi tạm thời phía server
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Status cho biết request đã bị từ chối (chưa được thực hiện): thử lại an toàn cả với
+# request không idempotent như values().append hay insertDimension
+REJECTED_STATUSES = frozenset({429})
+
+
+class TokenBucket:
+    """
+    Token bucket thread-safe
+
+    reserve() luôn trừ token ngay (số dư có thể âm) và trả về thời gian cần
+    chờ, nên cả code đồng bộ (time.sleep) lẫn asyncio (asyncio.sleep) đều
+    dùng được.
+    """
+
+    def __init__(self, rate_per_second, capacity):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        """Lấy tokens, trả về số giây cần chờ trước khi được gửi request"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class QuotaLimiter:
+    """
+    Giới hạn request đọc/ghi theo quota mỗi phút của Sheets API
+
+    Quota mặc định của Google là 60 request đọc và 60 request ghi mỗi phút
+    cho mỗi user. Với bucket chứa tối đa C token, trong 60 giây bất kỳ có thể
+    gửi C + (tốc độ nạp x 60) request, nên tốc độ nạp được đặt là
+    (quota - C) / phút để không bao giờ vượt quota.
+    """
+
+    def __init__(self, read_per_minute=60, write_per_minute=60):
+        self.buckets = {
+            'read': self._bucket(read_per_minute),
+            'write': self._bucket(write_per_minute),
+        }
+
+    @staticmethod
+    def _bucket(per_minute):
+        capacity = max(1, per_minute // 6)
+        return TokenBucket(max(per_minute - capacity, 1) / 60.0, capacity)
+
+    def reserve(self, kind):
+        """Trả về số giây cần chờ trước request loại kind ('read' hoặc 'write')"""
+        return self.buckets[kind].reserve()
+
+
+class RetryPolicy:
+    """Exponential backoff có jitter, ưu tiên Retry-After khi server gửi về"""
+
+    def __init__(self, max_retries=5, base_delay=1.0, max_delay=64.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def should_retry(self, status, attempt, idempotent=True):
+        """
+        Có thử lại sau HTTP status này không
+
+        Với request không idempotent, 5xx không cho biết request đã được thực
+        hiện hay chưa; gửi lại có thể ghi trùng nên chỉ thử lại khi bị 429.
+        """
+        statuses = RETRYABLE_STATUSES if idempotent else REJECTED_STATUSES
+        return status in statuses and attempt < self.max_retries
+
+    def should_retry_network_error(self, attempt, idempotent=True):
+        """Có thử lại sau lỗi kết nối/timeout không (không biết request đã tới server chưa)"""
+        return idempotent and attempt < self.max_retries
+
+    def delay(self, attempt, retry_after=None):
+        """Thời gian chờ (giây) trước lần thử lại thứ attempt + 1"""
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        # Full jitter: chọn ngẫu nhiên trong [0, base * 2^attempt]
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+def parse_retry_after(value):
+    """Đọc header Retry-After (số giây hoặc ngày HTTP), trả về số giây hoặc None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class QuotaStats:
+    """Bộ đếm request bị giới hạn tốc độ và request phải thử lại"""
+
+    FIELDS = ('requests', 'throttled', 'throttled_seconds', 'retried', 'rate_limited', 'failed')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            for name in self.FIELDS:
+                setattr(self, name, 0)
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def as_dict(self):
+        with self._lock:
+            return {name: getattr(self, name) for name in self.FIELDS}
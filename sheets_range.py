@@ -0,0 +1,244 @@
+"""
+Sheets Range - Phân tích và chuẩn hóa phạm vi A1 của Google Sheets
+"""
+
+import re
+from collections import namedtuple
+
+# Phần tham chiếu ô: cột (chữ) và/hoặc dòng (số), ví dụ: 'A1', 'A', '5'
+_CELL_REF = re.compile(r'^([A-Za-z]{0,3})(\d*)$')
+
+
+def column_to_index(column):
+    """Chuyển tên cột sang số thứ tự (bắt đầu từ 1), ví dụ: 'A' -> 1, 'AA' -> 27"""
+    index = 0
+    for char in column.upper():
+        index = index * 26 + (ord(char) - ord('A') + 1)
+    return index
+
+
+def index_to_column(index):
+    """Chuyển số thứ tự cột (bắt đầu từ 1) sang tên cột, ví dụ: 28 -> 'AB'"""
+    letters = ''
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+def quote_sheet_name(sheet_name):
+    """Đặt tên sheet trong dấu nháy đơn nếu cần (có khoảng trắng, ký tự đặc biệt...)"""
+    looks_like_cell = re.fullmatch(r'[A-Za-z]{1,3}\d+', sheet_name)
+    if re.fullmatch(r'[A-Za-z_][A-Za-z0-9_]*', sheet_name) and not looks_like_cell:
+        return sheet_name
+    return "'" + sheet_name.replace("'", "''") + "'"
+
+
+class A1Range(namedtuple('A1Range', ['sheet', 'start_row', 'start_col', 'end_row', 'end_col'])):
+    """
+    Phạm vi A1 đã được phân tích
+
+    Dòng và cột bắt đầu từ 1. end_row/end_col bằng None nghĩa là phạm vi
+    mở đến hết sheet theo chiều đó. sheet bằng None khi range không ghi tên
+    sheet (API sẽ hiểu là sheet đầu tiên).
+    """
+
+    __slots__ = ()
+
+    @property
+    def is_bounded(self):
+        return self.end_row is not None and self.end_col is not None
+
+    @property
+    def row_count(self):
+        return None if self.end_row is None else self.end_row - self.start_row + 1
+
+    @property
+    def col_count(self):
+        return None if self.end_col is None else self.end_col - self.start_col + 1
+
+    def contains(self, other):
+        """Kiểm tra phạm vi này có bao trọn phạm vi other hay không"""
+        if self.sheet != other.sheet:
+            return False
+        if other.start_row < self.start_row or other.start_col < self.start_col:
+            return False
+        if self.end_row is not None and (other.end_row is None or other.end_row > self.end_row):
+            return False
+        if self.end_col is not None and (other.end_col is None or other.end_col > self.end_col):
+            return False
+        return True
+
+    def overlaps(self, other):
+        """Kiểm tra hai phạm vi có giao nhau hay không (sheet None được coi là có thể trùng)"""
+        if self.sheet is not None and other.sheet is not None and self.sheet != other.sheet:
+            return False
+        if self.end_row is not None and other.start_row > self.end_row:
+            return False
+        if other.end_row is not None and self.start_row > other.end_row:
+            return False
+        if self.end_col is not None and other.start_col > self.end_col:
+            return False
+        if other.end_col is not None and self.start_col > other.end_col:
+            return False
+        return True
+
+    def with_shape(self, rows, cols):
+        """Tạo phạm vi có cùng ô bắt đầu với kích thước rows x cols"""
+        return self._replace(
+            end_row=self.start_row + max(rows, 1) - 1,
+            end_col=self.start_col + max(cols, 1) - 1
+        )
+
+    def to_a1(self):
+        """Chuyển về chuỗi A1 chuẩn hóa (ví dụ: 'Sheet1!A1:E10')"""
+        whole_sheet = (self.start_row == 1 and self.start_col == 1
+                       and self.end_row is None and self.end_col is None)
+        if whole_sheet:
+            cells = ''
+        elif self.end_col is None:
+            cells = f"{self.start_row}:{self.end_row if self.end_row is not None else ''}"
+        else:
+            start = index_to_column(self.start_col)
+            end = index_to_column(self.end_col)
+            if self.end_row is None:
+                start_row = self.start_row if self.start_row > 1 else ''
+                cells = f"{start}{start_row}:{end}"
+            elif (self.start_row, self.start_col) == (self.end_row, self.end_col):
+                cells = f"{start}{self.start_row}"
+            else:
+                cells = f"{start}{self.start_row}:{end}{self.end_row}"
+
+        if self.sheet is None:
+            return cells
+        sheet = quote_sheet_name(self.sheet)
+        return f"{sheet}!{cells}" if cells else sheet
+
+
+def _split_sheet(range_name):
+    """Tách tên sheet và phần ô của range, trả về (sheet, cells)"""
+    if range_name.startswith("'"):
+        i = 1
+        while i < len(range_name):
+            if range_name[i] == "'":
+                if range_name[i + 1:i + 2] == "'":
+                    i += 2
+                    continue
+                break
+            i += 1
+        sheet = range_name[1:i].replace("''", "'")
+        rest = range_name[i + 1:]
+        if rest.startswith('!'):
+            return sheet, rest[1:]
+        return sheet, ''
+
+    if '!' in range_name:
+        sheet, cells = range_name.split('!', 1)
+        return sheet, cells
+
+    # Không có '!': là tham chiếu ô nếu đúng cú pháp A1, ngược lại là tên sheet
+    if ':' in range_name or _parse_cells(range_name) is not None:
+        return None, range_name
+    return range_name, ''
+
+
+def _parse_cells(cells):
+    """Phân tích phần ô ('A1:E10', 'A:D', '1:5', 'A1') thành (sr, sc, er, ec)"""
+    parts = cells.split(':')
+    if len(parts) > 2:
+        return None
+
+    refs = []
+    for part in parts:
+        match = _CELL_REF.match(part.strip())
+        if not match or not (match.group(1) or match.group(2)):
+            return None
+        col = column_to_index(match.group(1)) if match.group(1) else None
+        row = int(match.group(2)) if match.group(2) else None
+        if row == 0:
+            return None
+        refs.append((row, col))
+
+    (start_row, start_col) = refs[0]
+    if len(refs) == 1:
+        # Một ô đơn lẻ phải có đủ cột và dòng
+        if start_row is None or start_col is None:
+            return None
+        return start_row, start_col, start_row, start_col
+
+    (end_row, end_col) = refs[1]
+    return start_row or 1, start_col or 1, end_row, end_col
+
+
+def parse_range(range_name):
+    """
+    Phân tích chuỗi range A1
+
+    Args:
+        range_name: Phạm vi (ví dụ: 'Sheet1!A1:D10', 'Sheet1', "'My Sheet'!A:B")
+
+    Returns:
+        A1Range, hoặc None nếu không phân tích được (ví dụ named range)
+    """
+    if not range_name or not range_name.strip():
+        return None
+
+    sheet, cells = _split_sheet(range_name.strip())
+    if sheet is not None and not sheet:
+        return None
+    if not cells:
+        return A1Range(sheet, 1, 1, None, None)
+
+    parsed = _parse_cells(cells)
+    if parsed is None:
+        return None
+    start_row, start_col, end_row, end_col = parsed
+    if end_row is not None and end_row < start_row:
+        start_row, end_row = end_row, start_row
+    if end_col is not None and end_col < start_col:
+        start_col, end_col = end_col, start_col
+    return A1Range(sheet, start_row, start_col, end_row, end_col)
+
+
+def normalize_range(range_name):
+    """Chuẩn hóa chuỗi range; trả về nguyên bản (đã strip) nếu không phân tích được"""
+    parsed = parse_range(range_name)
+    return parsed.to_a1() if parsed is not None else range_name.strip()
+
+
+def merge_cells(cells):
+    """
+    Gộp các ô đơn lẻ liền kề thành các hình chữ nhật
+
+    Args:
+        cells: Dict {(row, col): value} của các ô trên cùng một sheet
+
+    Returns:
+        List các tuple (start_row, start_col, values) với values là list of lists
+        hình chữ nhật
+    """
+    # Gom các ô liền nhau trên cùng dòng thành các đoạn
+    rows = {}
+    for (row, col) in sorted(cells):
+        runs = rows.setdefault(row, [])
+        if runs and runs[-1][1] == col - 1:
+            runs[-1][1] = col
+        else:
+            runs.append([col, col])
+
+    # Nối các đoạn cùng khoảng cột ở các dòng liên tiếp
+    rectangles = []
+    open_rects = {}
+    for row in sorted(rows):
+        next_open = {}
+        for start_col, end_col in rows[row]:
+            values = [cells[(row, col)] for col in range(start_col, end_col + 1)]
+            rect = open_rects.get((start_col, end_col))
+            if rect is not None and rect[0] + len(rect[2]) == row:
+                rect[2].append(values)
+            else:
+                rect = (row, start_col, [values])
+                rectangles.append(rect)
+            next_open[(start_col, end_col)] = rect
+        open_rects = next_open
+    return rectangles
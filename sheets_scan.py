@@ -0,0 +1,222 @@
+"""
+Sheets Scan - Đọc song song cả sheet hoặc cả workbook theo các khối (shard) rời nhau
+"""
+
+import threading
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from googleapiclient.errors import HttpError
+from googleapiclient.http import build_http
+from google_auth_httplib2 import AuthorizedHttp
+
+from sheets_range import index_to_column, quote_sheet_name
+
+# Kích thước mặc định của một shard theo từng chiều
+DEFAULT_SHARD_ROWS = 5000
+DEFAULT_SHARD_COLS = 10
+
+Shard = namedtuple('Shard', ['index', 'sheet', 'start_row', 'start_col', 'end_row', 'end_col'])
+Shard.__doc__ = "Một khối ô của sheet (dòng/cột bắt đầu từ 1, end_* bao gồm cả ô cuối)"
+
+ShardResult = namedtuple('ShardResult', ['shard', 'values'])
+
+
+def _range_of(shard):
+    return (f"{quote_sheet_name(shard.sheet)}!{index_to_column(shard.start_col)}{shard.start_row}:"
+            f"{index_to_column(shard.end_col)}{shard.end_row}")
+
+
+def plan_shards(metadata, sheets=None, axis='rows', shard_size=None):
+    """
+    Chia các sheet thành các shard rời nhau theo kích thước lưới
+
+    Args:
+        metadata: SpreadsheetMetadata (service.get_metadata())
+        sheets: Tên sheet hoặc list tên sheet (None = mọi sheet)
+        axis: 'rows' (mỗi shard một khối dòng, đủ các cột) hoặc 'columns'
+        shard_size: Số dòng (hoặc số cột) mỗi shard
+
+    Returns:
+        List Shard theo thứ tự sheet rồi vị trí
+    """
+    if axis not in ('rows', 'columns'):
+        raise ValueError(f"axis phải là 'rows' hoặc 'columns', không phải '{axis}'")
+    if shard_size is None:
+        shard_size = DEFAULT_SHARD_ROWS if axis == 'rows' else DEFAULT_SHARD_COLS
+    if isinstance(sheets, str):
+        sheets = [sheets]
+    titles = metadata.sheet_titles if sheets is None else sheets
+
+    shards = []
+    for title in titles:
+        info = metadata.sheet(title)
+        if info is None:
+            raise ValueError(f"Không tìm thấy sheet '{title}'")
+        rows, cols = info.row_count or 0, info.column_count or 0
+        if not rows or not cols:
+            continue
+        total = rows if axis == 'rows' else cols
+        for start in range(1, total + 1, shard_size):
+            end = min(start + shard_size - 1, total)
+            if axis == 'rows':
+                shards.append(Shard(len(shards), title, start, 1, end, cols))
+            else:
+                shards.append(Shard(len(shards), title, 1, start, rows, end))
+    return shards
+
+
+class AimdConcurrency:
+    """
+    Số request đồng thời điều chỉnh theo kiểu AIMD
+
+    Tăng thêm 1 sau mỗi `limit` shard xong mà không có 429 mới, giảm một nửa
+    khi thấy 429 (bộ đếm rate_limited của service tăng). Quota Sheets API tính
+    theo user, nên 429 của các thao tác khác cùng service cũng làm giảm.
+    """
+
+    def __init__(self, initial=4, minimum=1, maximum=16):
+        self.minimum = minimum
+        self.maximum = max(maximum, minimum)
+        self.limit = min(max(initial, minimum), self.maximum)
+        self._successes = 0
+
+    def update(self, throttled):
+        """Ghi nhận một shard đã xong; throttled=True nếu có 429 kể từ lần trước"""
+        if throttled:
+            self.limit = max(self.minimum, self.limit // 2)
+            self._successes = 0
+            return
+        self._successes += 1
+        if self._successes >= self.limit:
+            self.limit = min(self.maximum, self.limit + 1)
+            self._successes = 0
+
+
+def iter_scan(service, sheets=None, axis='rows', shard_size=None, max_workers=16,
+              initial_workers=4, ordered=False, value_render_option='FORMATTED_VALUE'):
+    """
+    Đọc song song các shard, trả về từng shard khi xong (generator)
+
+    Mỗi thread có kết nối HTTP riêng (hoặc kết nối theo thread của
+    SheetsManager). Số shard đang gửi bắt đầu từ initial_workers và được
+    AimdConcurrency điều chỉnh trong khoảng [1, max_workers].
+
+    Args:
+        service: GoogleSheetsService
+        sheets: Tên sheet, list tên sheet, hoặc None cho mọi sheet
+        axis, shard_size: Cách chia shard (xem plan_shards)
+        max_workers: Số request đồng thời tối đa
+        initial_workers: Số request đồng thời lúc bắt đầu
+        ordered: True để trả shard theo đúng thứ tự của plan_shards
+        value_render_option: 'FORMATTED_VALUE', 'UNFORMATTED_VALUE' hoặc 'FORMULA'
+
+    Yields:
+        ShardResult(shard, values); values đã bỏ ô/dòng trống ở cuối như API
+    """
+    service._flush_pending()
+    # Kích thước lưới phải mới: sheet có thể đã được thêm dòng (kể cả từ nơi khác) sau khi cache
+    shards = plan_shards(service.get_metadata(refresh=True), sheets, axis, shard_size)
+    if not shards:
+        return
+
+    concurrency = AimdConcurrency(initial_workers, 1, max_workers)
+    local = threading.local()
+
+    def thread_http():
+        if service.manager is not None:
+            # _execute tự dùng kết nối theo thread của manager
+            return None
+        if not hasattr(local, 'http'):
+            local.http = AuthorizedHttp(service.creds, http=build_http()) if service.creds else build_http()
+        return local.http
+
+    def fetch(shard):
+        range_name = _range_of(shard)
+        try:
+            result = service._execute(service.service.spreadsheets().values().get(
+                spreadsheetId=service.spreadsheet_id,
+                range=range_name,
+                valueRenderOption=value_render_option
+            ), 'read', http=thread_http())
+        except HttpError as error:
+            # Import muộn để tránh import vòng với google_sheets_service
+            from google_sheets_service import SheetsApiError
+            raise SheetsApiError(f"Lỗi khi đọc {range_name}: {error}", error)
+        return ShardResult(shard, result.get('values', []))
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    inflight = {}
+    finished = {}
+    next_submit = next_yield = 0
+    rate_limited = service.quota_stats.as_dict()['rate_limited']
+    try:
+        while next_yield < len(shards):
+            # Ở chế độ ordered, không để kết quả chờ trả về dồn quá nhiều
+            while (next_submit < len(shards) and len(inflight) < concurrency.limit
+                   and (not ordered or next_submit - next_yield < max_workers * 4)):
+                shard = shards[next_submit]
+                inflight[executor.submit(fetch, shard)] = shard
+                next_submit += 1
+
+            done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+            for future in done:
+                del inflight[future]
+                result = future.result()
+                current = service.quota_stats.as_dict()['rate_limited']
+                concurrency.update(current > rate_limited)
+                rate_limited = current
+
+                if not ordered:
+                    next_yield += 1
+                    yield result
+                else:
+                    finished[result.shard.index] = result
+
+            while next_yield in finished:
+                yield finished.pop(next_yield)
+                next_yield += 1
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def scan(service, sheets=None, axis='rows', shard_size=None, max_workers=16, initial_workers=4,
+         value_render_option='FORMATTED_VALUE'):
+    """
+    Đọc song song rồi ghép lại toàn bộ dữ liệu của từng sheet
+
+    Returns:
+        Dict {tên sheet: list of lists} giống read_data của cả sheet
+    """
+    pieces = {}
+    for result in iter_scan(service, sheets, axis, shard_size, max_workers, initial_workers,
+                            ordered=False, value_render_option=value_render_option):
+        pieces.setdefault(result.shard.sheet, []).append(result)
+
+    if isinstance(sheets, str):
+        sheets = [sheets]
+    titles = service.get_metadata().sheet_titles if sheets is None else sheets
+    return {title: _assemble(sorted(pieces.get(title, []), key=lambda r: r.shard.index))
+            for title in titles}
+
+
+def _assemble(results):
+    """Ghép các shard của một sheet theo vị trí, bỏ ô/dòng trống ở cuối"""
+    rows = []
+    for shard, values in results:
+        row_offset = shard.start_row - 1
+        col_offset = shard.start_col - 1
+        if len(rows) < row_offset + len(values):
+            rows.extend([] for _ in range(row_offset + len(values) - len(rows)))
+        for index, cells in enumerate(values):
+            row = rows[row_offset + index]
+            if cells and len(row) < col_offset:
+                row.extend([''] * (col_offset - len(row)))
+            row.extend(cells)
+
+    for row in rows:
+        while row and row[-1] == '':
+            row.pop()
+    while rows and not rows[-1]:
+        rows.pop()
+    return rows
@@ -0,0 +1,314 @@
+"""
+Sheets Snapshot - Lưu dữ liệu của một phạm vi thành file nhị phân dạng cột, đọc lại bằng mmap
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+
+MAGIC = b'SHSNAP01'
+FORMAT_VERSION = 1
+
+# Loại giá trị của ô trong cột 'mixed'
+_EMPTY, _STR, _INT, _FLOAT, _BOOL = range(5)
+
+_INT64_MIN, _INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+# Cuối file: độ dài header (u32) và MAGIC
+_FOOTER = struct.Struct('<I8s')
+
+
+class _ChecksumWriter:
+    """Bọc file đang ghi, tính CRC32 của mọi byte đã ghi"""
+
+    def __init__(self, f):
+        self.f = f
+        self.crc = 0
+
+    def write(self, data):
+        self.crc = zlib.crc32(data, self.crc)
+        return self.f.write(data)
+
+    def tell(self):
+        return self.f.tell()
+
+
+def _pad(f):
+    """Căn vị trí ghi về bội số của 8 byte"""
+    extra = -f.tell() % 8
+    if extra:
+        f.write(b'\0' * extra)
+
+
+def _kind(value):
+    if value is None or value == '':
+        return _EMPTY
+    if isinstance(value, bool):
+        return _BOOL
+    if isinstance(value, int) and _INT64_MIN <= value <= _INT64_MAX:
+        return _INT
+    if isinstance(value, float):
+        return _FLOAT
+    return _STR
+
+
+class _Dictionary:
+    """Từ điển chuỗi của một cột: mỗi chuỗi khác nhau chỉ lưu một lần"""
+
+    def __init__(self):
+        self.codes = {}
+        self.offsets = array('I', [0])
+        self.blob = bytearray()
+
+    def code(self, text):
+        code = self.codes.get(text)
+        if code is None:
+            code = self.codes[text] = len(self.codes)
+            self.blob += text.encode('utf-8')
+            self.offsets.append(len(self.blob))
+        return code
+
+
+def _write_column(f, values, num_rows):
+    """Ghi một cột, trả về mô tả các phần của cột (vị trí tính từ đầu file)"""
+    dictionary = _Dictionary()
+    kinds = [_kind(value) for value in values]
+    kinds.extend([_EMPTY] * (num_rows - len(kinds)))
+
+    section = {}
+    if all(kind in (_EMPTY, _STR) for kind in kinds):
+        # Cột toàn chuỗi (mặc định của read_data): chỉ cần mã từ điển, -1 là ô trống
+        layout = 'str'
+        codes = [dictionary.code(str(value)) if kind == _STR else -1
+                 for value, kind in zip(values, kinds)]
+        codes.extend([-1] * (num_rows - len(codes)))
+        # Mã nhỏ nhất đủ chứa từ điển: 1, 2 hoặc 4 byte mỗi ô
+        count = len(dictionary.codes)
+        code_type = 'b' if count < 2 ** 7 else 'h' if count < 2 ** 15 else 'i'
+        _pad(f)
+        section['codes'] = f.tell()
+        section['code_type'] = code_type
+        f.write(array(code_type, codes).tobytes())
+    else:
+        layout = 'mixed'
+        slots = array('q')
+        for value, kind in zip(values, kinds):
+            if kind == _STR:
+                slots.append(dictionary.code(str(value)))
+            elif kind == _FLOAT:
+                slots.append(struct.unpack('<q', struct.pack('<d', value))[0])
+            elif kind in (_INT, _BOOL):
+                slots.append(int(value))
+            else:
+                slots.append(0)
+        slots.extend([0] * (num_rows - len(slots)))
+        _pad(f)
+        section['slots'] = f.tell()
+        f.write(slots.tobytes())
+        section['kinds'] = f.tell()
+        f.write(bytes(kinds))
+
+    _pad(f)
+    section['dict_offsets'] = f.tell()
+    f.write(dictionary.offsets.tobytes())
+    section['dict_count'] = len(dictionary.codes)
+    section['blob'] = f.tell()
+    f.write(dictionary.blob)
+    section['layout'] = layout
+    return section
+
+
+def save_snapshot(path, values, spreadsheet_id, range_name, revision=None):
+    """
+    Lưu values (list of lists như read_data) thành file snapshot dạng cột
+
+    Mỗi cột có từ điển chuỗi riêng (offsets + blob UTF-8) và mảng mã có độ
+    rộng cố định, nên đọc lại một ô hay một cột không cần parse cả file.
+    File được ghi ra file tạm rồi đổi tên, không bao giờ dở dang.
+
+    Args:
+        path: File đích
+        values: List of lists
+        spreadsheet_id: Spreadsheet nguồn
+        range_name: Phạm vi nguồn (ví dụ: 'Sheet1!A1:F')
+        revision: Phiên bản của dữ liệu (None = checksum của nội dung)
+
+    Returns:
+        Snapshot đã mở từ file vừa ghi
+    """
+    num_rows = len(values)
+    num_cols = max((len(row) for row in values), default=0)
+    temp = f'{path}.tmp'
+    with open(temp, 'wb') as f:
+        writer = _ChecksumWriter(f)
+        writer.write(MAGIC)
+        columns = []
+        for col in range(num_cols):
+            column = [row[col] if col < len(row) else '' for row in values]
+            columns.append(_write_column(writer, column, num_rows))
+        if revision is None:
+            revision = f'crc32:{writer.crc:08x}'
+
+        header = json.dumps({
+            'version': FORMAT_VERSION,
+            'byteorder': sys.byteorder,
+            'spreadsheet_id': spreadsheet_id,
+            'range': range_name,
+            'revision': revision,
+            'created': time.time(),
+            'rows': num_rows,
+            'cols': num_cols,
+            'columns': columns,
+        }, ensure_ascii=False).encode('utf-8')
+        f.write(header)
+        f.write(_FOOTER.pack(len(header), MAGIC))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, path)
+    return Snapshot(path)
+
+
+class Snapshot:
+    """
+    File snapshot mở bằng mmap: đọc ô, cột, dòng mà không nạp cả file vào bộ nhớ
+
+    Chỉ số dòng/cột bắt đầu từ 0 và tính từ ô đầu của phạm vi đã lưu. Ô trống
+    trả về ''.
+
+    Ví dụ:
+        with Snapshot('sales.snap') as snap:
+            print(snap.spreadsheet_id, snap.range, snap.revision)
+            print(snap.cell(10, 2), snap.column(0)[:5])
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"File snapshot rỗng: '{path}'")
+        self._view = memoryview(self._mmap)
+
+        header_len, magic = _FOOTER.unpack_from(self._mmap, len(self._mmap) - _FOOTER.size)
+        if self._mmap[:len(MAGIC)] != MAGIC or magic != MAGIC:
+            self.close()
+            raise ValueError(f"Không phải file snapshot: '{path}'")
+        start = len(self._mmap) - _FOOTER.size - header_len
+        header = json.loads(bytes(self._mmap[start:start + header_len]).decode('utf-8'))
+        if header.get('version') != FORMAT_VERSION or header.get('byteorder') != sys.byteorder:
+            self.close()
+            raise ValueError(f"Snapshot '{path}' không tương thích (phiên bản hoặc thứ tự byte khác)")
+
+        self.spreadsheet_id = header['spreadsheet_id']
+        self.range = header['range']
+        self.revision = header['revision']
+        self.created = header['created']
+        self.num_rows = header['rows']
+        self.num_cols = header['cols']
+        self._columns = [self._open_column(section) for section in header['columns']]
+
+    def _open_column(self, section):
+        rows = self.num_rows
+        count = section['dict_count']
+        column = {
+            'layout': section['layout'],
+            'dict_offsets': self._view[section['dict_offsets']:section['dict_offsets'] + 4 * (count + 1)].cast('I'),
+            'blob': section['blob'],
+        }
+        if section['layout'] == 'str':
+            code_type = section['code_type']
+            size = array(code_type).itemsize
+            column['codes'] = self._view[section['codes']:section['codes'] + size * rows].cast(code_type)
+        else:
+            column['slots'] = self._view[section['slots']:section['slots'] + 8 * rows].cast('q')
+            column['kinds'] = self._view[section['kinds']:section['kinds'] + rows]
+        return column
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        # Phải giải phóng mọi memoryview trước khi đóng mmap
+        for column in getattr(self, '_columns', []):
+            for part in column.values():
+                if isinstance(part, memoryview):
+                    part.release()
+        self._columns = []
+        if getattr(self, '_view', None) is not None:
+            self._view.release()
+            self._view = None
+        if getattr(self, '_mmap', None) is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+    @property
+    def age(self):
+        """Số giây kể từ lúc lưu snapshot"""
+        return max(0.0, time.time() - self.created)
+
+    def _string(self, column, code):
+        offsets = column['dict_offsets']
+        start = column['blob'] + offsets[code]
+        return bytes(self._view[start:column['blob'] + offsets[code + 1]]).decode('utf-8')
+
+    def cell(self, row, col):
+        """Giá trị của ô (row, col), '' nếu trống hoặc ngoài phạm vi đã lưu"""
+        if not (0 <= row < self.num_rows and 0 <= col < self.num_cols):
+            return ''
+        column = self._columns[col]
+        if column['layout'] == 'str':
+            code = column['codes'][row]
+            return '' if code < 0 else self._string(column, code)
+
+        kind = column['kinds'][row]
+        slot = column['slots'][row]
+        if kind == _STR:
+            return self._string(column, slot)
+        if kind == _INT:
+            return slot
+        if kind == _FLOAT:
+            return struct.unpack('<d', struct.pack('<q', slot))[0]
+        if kind == _BOOL:
+            return bool(slot)
+        return ''
+
+    def column(self, col):
+        """Toàn bộ giá trị của một cột (độ dài num_rows, ô trống là '')"""
+        column = self._columns[col]
+        # Giải mã mỗi chuỗi của từ điển một lần cho cả cột
+        offsets = column['dict_offsets'].tolist()
+        blob = self._view[column['blob']:column['blob'] + offsets[-1]].tobytes()
+        strings = [blob[start:end].decode('utf-8') for start, end in zip(offsets, offsets[1:])]
+        if column['layout'] == 'str':
+            return ['' if code < 0 else strings[code] for code in column['codes']]
+        return [self.cell(row, col) if kind != _STR else strings[column['slots'][row]]
+                for row, kind in enumerate(column['kinds'])]
+
+    def row(self, row):
+        """Một dòng, đã bỏ các ô trống ở cuối như read_data"""
+        values = [self.cell(row, col) for col in range(self.num_cols)]
+        while values and values[-1] == '':
+            values.pop()
+        return values
+
+    def to_rows(self):
+        """Toàn bộ dữ liệu dạng list of lists, giống kết quả read_data lúc lưu"""
+        rows = [[] for _ in range(self.num_rows)]
+        for col in range(self.num_cols):
+            for row, value in zip(rows, self.column(col)):
+                row.append(value)
+        for row in rows:
+            while row and row[-1] == '':
+                row.pop()
+        return rows
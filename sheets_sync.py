@@ -0,0 +1,198 @@
+"""
+Sheets Sync - Đồng bộ bảng cục bộ lên sheet, chỉ gửi các ô thay đổi
+"""
+
+import threading
+
+from sheets_range import A1Range, merge_cells, normalize_range, parse_range
+
+
+def _cell_text(value):
+    """Giá trị ô dạng chuỗi để so sánh (sheet trả về giá trị đã format dạng chuỗi)"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    return str(value)
+
+
+def diff_rows(old_rows, new_rows):
+    """
+    So sánh hai bảng theo vị trí
+
+    Returns:
+        Dict {(row, col): giá trị mới} (chỉ số từ 0) của các ô khác nhau;
+        ô bị xóa có giá trị mới là ''
+    """
+    changes = {}
+    for r in range(max(len(old_rows), len(new_rows))):
+        old = old_rows[r] if r < len(old_rows) else []
+        new = new_rows[r] if r < len(new_rows) else []
+        for c in range(max(len(old), len(new))):
+            old_value = _cell_text(old[c]) if c < len(old) else ''
+            new_value = new[c] if c < len(new) else ''
+            if old_value != _cell_text(new_value):
+                changes[(r, c)] = '' if new_value is None else new_value
+    return changes
+
+
+def keyed_layout(sheet_rows, local_rows, key_index, header_rows=1):
+    """
+    Tính bố cục mới của sheet khi khớp dòng theo khóa
+
+    Dòng có khóa đã tồn tại giữ nguyên vị trí trên sheet. Dòng mới lấp vào
+    chỗ của dòng bị xóa trước, phần còn lại được thêm vào cuối. Nếu số dòng
+    bị xóa nhiều hơn, các dòng cuối bảng được chuyển lên lấp chỗ trống để
+    bảng liền mạch. Nhờ vậy thêm/xóa vài dòng chỉ làm thay đổi vài dòng.
+
+    Returns:
+        List of lists: nội dung mới của sheet theo vị trí
+    """
+    def key_of(row):
+        return _cell_text(row[key_index]) if key_index < len(row) else ''
+
+    local_body = local_rows[header_rows:]
+    local_by_key = {}
+    for row in local_body:
+        key = key_of(row)
+        if key in local_by_key:
+            raise ValueError(f"Khóa bị trùng trong dữ liệu cục bộ: '{key}'")
+        local_by_key[key] = row
+
+    layout = [list(row) for row in local_rows[:header_rows]]
+    layout.extend([None] * (len(sheet_rows) - header_rows))
+
+    placed = set()
+    holes = []
+    for position in range(header_rows, len(sheet_rows)):
+        key = key_of(sheet_rows[position])
+        if key in local_by_key and key not in placed:
+            layout[position] = local_by_key[key]
+            placed.add(key)
+        else:
+            holes.append(position)
+
+    # Dòng mới: lấp chỗ trống trước, còn lại thêm vào cuối bảng
+    inserted = [row for row in local_body if key_of(row) not in placed]
+    for row in inserted:
+        if holes:
+            layout[holes.pop(0)] = row
+        else:
+            layout.append(row)
+
+    # Còn chỗ trống: chuyển các dòng cuối lên lấp để bảng không bị thủng
+    while True:
+        while len(layout) > header_rows and layout[-1] is None:
+            layout.pop()
+        holes = [hole for hole in holes if hole < len(layout)]
+        if not holes:
+            break
+        layout[holes.pop(0)] = layout.pop()
+
+    return [row if row is not None else [] for row in layout]
+
+
+class DeltaSync:
+    """
+    Đồng bộ dữ liệu cục bộ với sheet bằng cách gửi phần chênh lệch
+
+    Giữ snapshot lần cuối của mỗi phạm vi, so sánh với dữ liệu mới và chỉ
+    ghi các ô thay đổi (gộp thành hình chữ nhật) trong một batch_update.
+    """
+
+    def __init__(self, service):
+        self.service = service
+        self._snapshots = {}
+        self._lock = threading.Lock()
+
+    def _key(self, range_name):
+        return (self.service.spreadsheet_id, normalize_range(range_name))
+
+    def seed(self, range_name, rows, spreadsheet_id=None):
+        """Đặt snapshot của một phạm vi từ dữ liệu có sẵn (ví dụ file snapshot đã lưu)"""
+        key = (spreadsheet_id or self.service.spreadsheet_id, normalize_range(range_name))
+        with self._lock:
+            self._snapshots[key] = [[_cell_text(value) for value in row] for row in rows]
+
+    def forget(self, range_name=None):
+        """Bỏ snapshot của một phạm vi (hoặc tất cả) để lần sync sau đọc lại từ sheet"""
+        with self._lock:
+            if range_name is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(self._key(range_name), None)
+
+    def invalidate(self, range_name=None, spreadsheet_id=None):
+        """
+        Bỏ snapshot của các phạm vi chồng lên range_name (service vừa ghi, thêm hoặc xóa ở đó)
+
+        range_name None hoặc không phân tích được: bỏ mọi snapshot của spreadsheet.
+        """
+        spreadsheet_id = spreadsheet_id or self.service.spreadsheet_id
+        rng = parse_range(range_name) if range_name else None
+        with self._lock:
+            for key in list(self._snapshots):
+                if key[0] != spreadsheet_id:
+                    continue
+                if rng is not None:
+                    snapshot_range = parse_range(key[1])
+                    if snapshot_range is not None and not snapshot_range.overlaps(rng):
+                        continue
+                del self._snapshots[key]
+
+    def sync(self, range_name, local_rows, key_column=None, header_rows=1, refresh=False):
+        """
+        Đồng bộ local_rows lên phạm vi range_name
+
+        Args:
+            range_name: Phạm vi của bảng trên sheet (ví dụ: 'Sheet1!A1:E')
+            local_rows: Toàn bộ bảng cục bộ (kể cả dòng header), list of lists
+            key_column: Tên cột (theo header) hoặc chỉ số cột dùng làm khóa dòng,
+                ví dụ 'ID'. None để so sánh theo vị trí
+            header_rows: Số dòng header ở đầu bảng (luôn so sánh theo vị trí)
+            refresh: True để đọc lại sheet thay vì dùng snapshot đã lưu
+
+        Returns:
+            Dict {'changed_cells', 'ranges', 'updated_cells'}
+        """
+        rng = parse_range(range_name)
+        if rng is None or rng.sheet is None:
+            raise ValueError(f"Range không hợp lệ cho sync: '{range_name}'. Cần dạng 'Sheet1!A1:E'")
+
+        key = self._key(range_name)
+        with self._lock:
+            snapshot = None if refresh else self._snapshots.get(key)
+        if snapshot is None:
+            snapshot = self.service.read_data(range_name, use_cache=False)
+
+        if key_column is None:
+            target = [list(row) for row in local_rows]
+        else:
+            if isinstance(key_column, int):
+                key_index = key_column
+            else:
+                header = local_rows[0] if local_rows and header_rows else []
+                if key_column not in header:
+                    raise ValueError(f"Không tìm thấy cột khóa '{key_column}' trong header")
+                key_index = header.index(key_column)
+            target = keyed_layout(snapshot, local_rows, key_index, header_rows)
+
+        changes = diff_rows(snapshot, target)
+        data = []
+        for start_row, start_col, values in merge_cells(changes):
+            cell = A1Range(rng.sheet, rng.start_row + start_row, rng.start_col + start_col, None, None)
+            data.append({
+                'range': cell.with_shape(len(values), len(values[0])).to_a1(),
+                'values': values
+            })
+
+        updated_cells = self.service.batch_update(data) if data else 0
+
+        with self._lock:
+            self._snapshots[key] = [[_cell_text(value) for value in row] for row in target]
+
+        return {
+            'changed_cells': len(changes),
+            'ranges': len(data),
+            'updated_cells': updated_cells
+        }
@@ -0,0 +1,203 @@
+"""
+Sheets Table - Kết quả đọc dạng cột dựa trên NumPy
+"""
+
+from datetime import datetime
+
+from sheets_range import index_to_column
+
+# Ngày gốc của số serial ngày giờ trong Google Sheets
+_SERIAL_EPOCH = datetime(1899, 12, 30)
+
+_NUMBER = (int, float)
+
+
+def _require_numpy(feature='read_table'):
+    """Import numpy ở lần dùng đầu: import ngay khi nạp module làm chậm khởi động khoảng 100 ms"""
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError(f"{feature} cần thư viện numpy. Vui lòng chạy: pip install numpy") from None
+    return numpy
+
+
+def _is_null(value):
+    return value is None or value == ''
+
+
+def _to_float(value):
+    if isinstance(value, _NUMBER) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value.replace(',', ''))
+        except ValueError:
+            return None
+    return None
+
+
+def _to_bool(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.upper() in ('TRUE', 'FALSE'):
+        return value.upper() == 'TRUE'
+    return None
+
+
+def _infer_dtype(column):
+    """Đoán kiểu của cột từ các giá trị khác rỗng"""
+    kinds = set()
+    for value in column:
+        if _is_null(value):
+            continue
+        if isinstance(value, bool):
+            kinds.add('bool')
+        elif isinstance(value, int) or (isinstance(value, float) and value.is_integer()):
+            kinds.add('int')
+        elif isinstance(value, float):
+            kinds.add('float')
+        else:
+            return 'str'
+    if not kinds:
+        return 'str'
+    if kinds == {'bool'}:
+        return 'bool'
+    if kinds == {'int'}:
+        return 'int'
+    if kinds <= {'int', 'float'}:
+        return 'float'
+    return 'str'
+
+
+def _convert(column, dtype):
+    """Chuyển một cột (list) sang (ndarray, null mask) theo dtype"""
+    np = _require_numpy()
+    size = len(column)
+    mask = np.zeros(size, dtype=bool)
+
+    if dtype in ('float', 'int', 'datetime'):
+        try:
+            # Đường nhanh: để NumPy chuyển cả cột một lần
+            data = np.array([np.nan if _is_null(value) else value for value in column],
+                            dtype=np.float64)
+            mask = np.isnan(data)
+        except (TypeError, ValueError):
+            data = np.empty(size, dtype=np.float64)
+            for i, value in enumerate(column):
+                number = None if _is_null(value) else _to_float(value)
+                if number is None:
+                    mask[i] = True
+                    data[i] = np.nan
+                else:
+                    data[i] = number
+        if dtype == 'int':
+            data = np.where(mask, 0, data).astype(np.int64)
+        elif dtype == 'datetime':
+            millis = np.where(mask, 0, np.round(data * 86_400_000)).astype(np.int64)
+            data = np.datetime64(_SERIAL_EPOCH, 'ms') + millis.astype('timedelta64[ms]')
+            data[mask] = np.datetime64('NaT')
+        return data, mask
+
+    if dtype == 'bool':
+        data = np.zeros(size, dtype=bool)
+        for i, value in enumerate(column):
+            flag = None if _is_null(value) else _to_bool(value)
+            if flag is None:
+                mask[i] = True
+            else:
+                data[i] = flag
+        return data, mask
+
+    data = np.empty(size, dtype=object)
+    for i, value in enumerate(column):
+        if _is_null(value):
+            mask[i] = True
+            data[i] = None
+        else:
+            data[i] = value if isinstance(value, str) else str(value)
+    return data, mask
+
+
+class SheetTable:
+    """
+    Bảng dữ liệu dạng cột: mỗi cột là một mảng NumPy kèm null mask
+
+    Ví dụ:
+        table = service.read_table('Sheet1!A1:E', dtypes={'Tuổi': 'int'})
+        ages = table['Tuổi'][~table.null_mask('Tuổi')]
+        print(ages.mean())
+    """
+
+    def __init__(self, columns, data, masks):
+        self.columns = columns
+        self.data = data
+        self.masks = masks
+
+    def __len__(self):
+        if not self.columns:
+            return 0
+        return len(self.data[self.columns[0]])
+
+    def __getitem__(self, name):
+        return self.data[name]
+
+    def __contains__(self, name):
+        return name in self.data
+
+    @property
+    def num_rows(self):
+        return len(self)
+
+    def null_mask(self, name):
+        """Mảng bool, True tại các ô rỗng của cột name"""
+        return self.masks[name]
+
+    def dtypes(self):
+        """Dict {tên cột: dtype của NumPy}"""
+        return {name: self.data[name].dtype for name in self.columns}
+
+    def to_rows(self):
+        """Chuyển lại thành list of lists (ô rỗng là None)"""
+        columns = [
+            [None if null else value for value, null in zip(self.data[name].tolist(), self.masks[name])]
+            for name in self.columns
+        ]
+        return [list(row) for row in zip(*columns)]
+
+
+def build_table(columns, header=True, dtypes=None, start_col=1):
+    """
+    Tạo SheetTable từ dữ liệu dạng cột (majorDimension=COLUMNS)
+
+    Args:
+        columns: List các cột, mỗi cột là list giá trị (có thể ngắn hơn số dòng)
+        header: True nếu phần tử đầu mỗi cột là tên cột
+        dtypes: Dict {tên cột: 'float' | 'int' | 'bool' | 'datetime' | 'str'};
+            cột không chỉ định sẽ được tự đoán kiểu
+        start_col: Số thứ tự cột đầu tiên, dùng để đặt tên cột khi không có header
+
+    Returns:
+        SheetTable
+    """
+    _require_numpy()
+
+    dtypes = dtypes or {}
+    offset = 1 if header else 0
+    num_rows = max((len(column) - offset for column in columns), default=0)
+
+    names, data, masks = [], {}, {}
+    for index, column in enumerate(columns):
+        name = ''
+        if header and column and not _is_null(column[0]):
+            name = str(column[0])
+        if not name or name in data:
+            name = index_to_column(start_col + index)
+
+        body = list(column[offset:])
+        body.extend([None] * (num_rows - len(body)))
+
+        dtype = dtypes.get(name) or _infer_dtype(body)
+        data[name], masks[name] = _convert(body, dtype)
+        names.append(name)
+
+    return SheetTable(names, data, masks)
@@ -0,0 +1,375 @@
+"""
+Sheets Transfer - Xuất/nhập dữ liệu giữa sheet và file CSV, JSONL, Parquet
+"""
+
+import csv
+import datetime
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from googleapiclient.errors import HttpError
+from googleapiclient.http import build_http
+from google_auth_httplib2 import AuthorizedHttp
+
+from sheets_range import index_to_column, parse_range, quote_sheet_name
+
+FORMATS = ('csv', 'jsonl', 'parquet')
+
+# Một request ghi nên nhỏ hơn ~2MB; để dư cho phần JSON bao ngoài
+DEFAULT_BATCH_BYTES = 1_000_000
+DEFAULT_BATCH_ROWS = 10_000
+
+# Thêm dòng cho sheet theo từng bước ít nhất chừng này, tránh gọi appendDimension liên tục
+GRID_GROWTH_ROWS = 10_000
+
+
+def _detect_format(path, format):
+    if format is None:
+        format = os.path.splitext(path)[1].lstrip('.').lower()
+    if format not in FORMATS:
+        raise ValueError(f"Định dạng không hỗ trợ: '{format}'. Chọn một trong {', '.join(FORMATS)}")
+    if format == 'parquet':
+        _require_pyarrow()
+    return format
+
+
+def _require_pyarrow():
+    """Import pyarrow khi cần định dạng parquet (import sẵn làm chậm khởi động)"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Định dạng parquet cần thư viện pyarrow. Vui lòng chạy: pip install pyarrow") from None
+    return pyarrow, pyarrow.parquet
+
+
+class _Progress:
+    """Đếm số dòng và báo tốc độ (dòng/giây) qua callback"""
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.rows = 0
+        self.started = time.perf_counter()
+
+    def add(self, rows):
+        self.rows += rows
+        stats = self.stats()
+        if self.callback is not None:
+            self.callback(stats)
+        return stats
+
+    def stats(self):
+        seconds = time.perf_counter() - self.started
+        return {
+            'rows': self.rows,
+            'seconds': seconds,
+            'rows_per_second': self.rows / seconds if seconds > 0 else 0.0
+        }
+
+
+def _column_names(header, width, start_col):
+    names = []
+    for index in range(width):
+        name = str(header[index]) if index < len(header) and header[index] != '' else ''
+        if not name or name in names:
+            name = index_to_column(start_col + index)
+        names.append(name)
+    return names
+
+
+def _fit(row, width):
+    row = list(row[:width])
+    row.extend([''] * (width - len(row)))
+    return row
+
+
+def _iter_chunks(service, range_name, chunk_rows):
+    """Đọc phạm vi theo từng phần (list of rows); trả về (chunks, start_col)"""
+    rng = parse_range(range_name)
+    if rng is None or rng.sheet is None:
+        # Named range hoặc không có tên sheet: đọc một lần
+        return iter([service.read_data(range_name, use_cache=False)]), 1
+
+    rows = service.iter_rows(
+        rng.sheet,
+        chunk_rows=chunk_rows,
+        first_col=index_to_column(rng.start_col),
+        # Không giới hạn cột: iter_rows đọc đến cột cuối của lưới
+        last_col=index_to_column(rng.end_col) if rng.end_col else None,
+        start_row=rng.start_row,
+        end_row=rng.end_row
+    )
+
+    def chunks():
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    return chunks(), rng.start_col
+
+
+def export_range(service, range_name, path, format=None, header=True, chunk_rows=5000,
+                 progress=None):
+    """
+    Xuất một phạm vi ra file, ghi từng phần xuống đĩa ngay khi đọc xong
+
+    Args:
+        service: GoogleSheetsService
+        range_name: Phạm vi cần xuất (ví dụ: 'Sheet1' hoặc 'Sheet1!A1:F')
+        path: File đích
+        format: 'csv', 'jsonl' hoặc 'parquet' (None = theo đuôi file)
+        header: True nếu dòng đầu là tên cột (jsonl ghi mỗi dòng thành object,
+            parquet dùng làm tên cột); csv luôn ghi nguyên các dòng
+        chunk_rows: Số dòng đọc mỗi lần
+        progress: Callback(stats) nhận {'rows', 'seconds', 'rows_per_second'} sau mỗi phần
+
+    Returns:
+        Dict {'rows', 'seconds', 'rows_per_second'}
+    """
+    format = _detect_format(path, format)
+    chunks, start_col = _iter_chunks(service, range_name, chunk_rows)
+    tracker = _Progress(progress)
+
+    if format == 'csv':
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            for chunk in chunks:
+                writer.writerows(chunk)
+                tracker.add(len(chunk))
+        return tracker.stats()
+
+    names = None
+    if format == 'jsonl':
+        with open(path, 'w', encoding='utf-8') as f:
+            for chunk in chunks:
+                body = chunk
+                if header and names is None:
+                    names = _column_names(chunk[0], len(chunk[0]), start_col) if chunk else []
+                    body = chunk[1:]
+                lines = [
+                    json.dumps(dict(zip(names, _fit(row, len(names)))) if header else row,
+                             ensure_ascii=False)
+                    for row in body
+                ]
+                if lines:
+                    f.write('\n'.join(lines) + '\n')
+                tracker.add(len(body))
+        return tracker.stats()
+
+    pa, pq = _require_pyarrow()
+    writer = None
+    try:
+        for chunk in chunks:
+            body = chunk
+            if names is None:
+                if header:
+                    head, body = (chunk[0], chunk[1:]) if chunk else ([], [])
+                    names = _column_names(head, len(head), start_col)
+                else:
+                    names = _column_names([], max((len(row) for row in chunk), default=0), start_col)
+                schema = pa.schema([(name, pa.string()) for name in names])
+                writer = pq.ParquetWriter(path, schema)
+
+            # Mỗi phần là một row group; dòng được cắt/đệm theo số cột
+            columns = list(zip(*(_fit(row, len(names)) for row in body))) or [()] * len(names)
+            arrays = [pa.array([None if v == '' else str(v) for v in col], type=pa.string())
+                      for col in columns]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=writer.schema))
+            tracker.add(len(body))
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        pq.write_table(pa.table({}), path)
+    return tracker.stats()
+
+
+def _cell_value(value):
+    """Chuyển giá trị đọc từ file thành giá trị gửi được qua API"""
+    if value is None:
+        return ''
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat(sep=' ') if isinstance(value, datetime.datetime) else value.isoformat()
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def _read_rows(path, format, header):
+    """Đọc file từng dòng (generator), không nạp cả file vào bộ nhớ"""
+    if format == 'csv':
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            yield from csv.reader(f)
+        return
+
+    if format == 'jsonl':
+        names = None
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                if isinstance(item, dict):
+                    if names is None:
+                        names = list(item)
+                        if header:
+                            yield names
+                    yield [_cell_value(item.get(name)) for name in names]
+                else:
+                    yield [_cell_value(value) for value in item]
+        return
+
+    _, pq = _require_pyarrow()
+    parquet = pq.ParquetFile(path)
+    if header:
+        yield parquet.schema_arrow.names
+    for batch in parquet.iter_batches():
+        for row in zip(*(column.to_pylist() for column in batch.columns)):
+            yield [_cell_value(value) for value in row]
+
+
+def _batches(rows, batch_bytes, batch_rows):
+    """Gom dòng thành lô theo ước lượng kích thước payload"""
+    batch, size = [], 0
+    for row in rows:
+        batch.append(row)
+        size += sum(len(str(value)) + 4 for value in row) + 2
+        if size >= batch_bytes or len(batch) >= batch_rows:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+
+class _GridSizer:
+    """Giữ kích thước lưới của sheet và mở rộng khi sắp ghi vượt quá"""
+
+    def __init__(self, service, spreadsheet_id, sheet_name):
+        self.service = service
+        self.spreadsheet_id = spreadsheet_id
+        sheet = service.get_metadata(refresh=True).sheet(sheet_name)
+        if sheet is None:
+            raise ValueError(f"Không tìm thấy sheet '{sheet_name}'")
+        self.sheet_id = sheet.sheet_id
+        self.rows = sheet.row_count or 0
+        self.cols = sheet.column_count or 0
+
+    def ensure(self, last_row, last_col):
+        """Mở rộng lưới để chứa được ô (last_row, last_col)"""
+        add_rows = max(last_row - self.rows, GRID_GROWTH_ROWS) if last_row > self.rows else 0
+        add_cols = max(last_col - self.cols, 0)
+        requests = [
+            {'appendDimension': {'sheetId': self.sheet_id, 'dimension': dimension, 'length': length}}
+            for dimension, length in (('ROWS', add_rows), ('COLUMNS', add_cols)) if length
+        ]
+        if not requests:
+            return
+        try:
+            self.service._execute(self.service.service.spreadsheets().batchUpdate(
+                spreadsheetId=self.spreadsheet_id,
+                body={'requests': requests}
+            ), 'write', idempotent=False)
+        finally:
+            self.service.metadata_cache.invalidate(self.spreadsheet_id)
+        self.rows += add_rows
+        self.cols += add_cols
+
+
+def import_file(service, path, sheet_name, format=None, header=True, start_row=1, start_col=1,
+                batch_bytes=DEFAULT_BATCH_BYTES, batch_rows=DEFAULT_BATCH_ROWS,
+                value_input_option='USER_ENTERED', max_workers=1, progress=None):
+    """
+    Nhập file vào sheet theo từng lô ghi, bộ nhớ chỉ giữ vài lô cùng lúc
+
+    File được đọc dần từng dòng và gom thành lô có kích thước payload khoảng
+    batch_bytes. Mỗi lô ghi vào một khối dòng riêng (values().batchUpdate),
+    lưới của sheet được mở rộng trước khi ghi nếu cần. Với max_workers > 1,
+    các khối dòng rời nhau được gửi song song, mỗi thread một kết nối HTTP.
+
+    Args:
+        service: GoogleSheetsService
+        path: File nguồn
+        sheet_name: Sheet đích
+        format: 'csv', 'jsonl' hoặc 'parquet' (None = theo đuôi file)
+        header: Ghi dòng tên cột (jsonl: khóa của object đầu tiên, parquet: tên cột)
+        start_row, start_col: Ô bắt đầu ghi trên sheet
+        batch_bytes: Kích thước ước lượng của mỗi lô ghi
+        batch_rows: Số dòng tối đa mỗi lô
+        value_input_option: 'USER_ENTERED' hoặc 'RAW'
+        max_workers: Số lô gửi song song
+        progress: Callback(stats) nhận {'rows', 'seconds', 'rows_per_second'} sau mỗi lô
+
+    Returns:
+        Dict {'rows', 'seconds', 'rows_per_second'}
+    """
+    format = _detect_format(path, format)
+    service._flush_pending()
+
+    spreadsheet_id = service.spreadsheet_id
+    sheet = quote_sheet_name(sheet_name)
+    sizer = _GridSizer(service, spreadsheet_id, sheet_name)
+    tracker = _Progress(progress)
+
+    local = threading.local()
+
+    def thread_http():
+        # httplib2.Http không thread-safe: mỗi thread một kết nối
+        if max_workers <= 1:
+            return None
+        if not hasattr(local, 'http'):
+            local.http = AuthorizedHttp(service.creds, http=build_http()) if service.creds else build_http()
+        return local.http
+
+    def send(row, values):
+        width = max((len(r) for r in values), default=1) or 1
+        range_name = (f"{sheet}!{index_to_column(start_col)}{row}:"
+                      f"{index_to_column(start_col + width - 1)}{row + len(values) - 1}")
+        try:
+            service._execute(service.service.spreadsheets().values().batchUpdate(
+                spreadsheetId=spreadsheet_id,
+                body={'valueInputOption': value_input_option,
+                      'data': [{'range': range_name, 'values': values}]}
+            ), 'write', http=thread_http())
+        except HttpError as error:
+            # Import muộn để tránh import vòng với google_sheets_service
+            from google_sheets_service import SheetsApiError
+            raise SheetsApiError(f"Lỗi khi nhập dữ liệu vào {range_name}: {error}", error)
+        return len(values)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers) if max_workers > 1 else None
+    inflight = set()
+    row = start_row
+    try:
+        for values in _batches(_read_rows(path, format, header), batch_bytes, batch_rows):
+            width = max((len(r) for r in values), default=1)
+            sizer.ensure(row + len(values) - 1, start_col + width - 1)
+
+            if executor is None:
+                tracker.add(send(row, values))
+            else:
+                # Giới hạn số lô đang chờ để bộ nhớ không tăng theo kích thước file
+                if len(inflight) >= max_workers * 2:
+                    done, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        tracker.add(future.result())
+                inflight.add(executor.submit(send, row, values))
+            row += len(values)
+
+        for future in inflight:
+            tracker.add(future.result())
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        if service.cache is not None:
+            service.cache.invalidate(spreadsheet_id, sheet)
+        service.delta_sync.invalidate(sheet, spreadsheet_id)
+
+    return tracker.stats()
@@ -0,0 +1,389 @@
+"""
+Sheets Watch - Theo dõi thay đổi của một phạm vi mà không đọc lại toàn bộ mỗi lần
+"""
+
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+from googleapiclient.errors import HttpError
+from googleapiclient.http import build_http
+from google_auth_httplib2 import AuthorizedHttp
+
+from sheets_range import A1Range, index_to_column, parse_range
+from sheets_sync import diff_rows
+
+CellChange = namedtuple('CellChange', ['row', 'col', 'old', 'new'])
+CellChange.__doc__ = "Một ô thay đổi (dòng/cột trên sheet, bắt đầu từ 1); ô trống là ''"
+
+# Sheet ẩn chứa công thức fingerprint của các khối đang theo dõi: mỗi Watch một
+# dòng, cột A là nhãn của Watch, các cột tiếp theo là fingerprint của từng khối
+FINGERPRINT_SHEET = '_watch'
+
+
+def _fingerprint_formula(block):
+    """
+    Công thức tóm tắt một khối ô thành một chuỗi ngắn
+
+    Kết hợp độ dài, mã ký tự đầu (có trọng số theo vị trí), tổng số và số ô
+    khác rỗng. Đổi ký tự ở giữa chuỗi mà giữ nguyên độ dài có thể không làm
+    đổi fingerprint; lần làm mới toàn bộ định kỳ sẽ bắt được các trường hợp này.
+    """
+    r = block.to_a1()
+    return (f'=SUMPRODUCT(LEN({r})*ROW({r})*COLUMN({r}))'
+            f'&"|"&SUMPRODUCT(IFERROR(CODE({r}),0)*ROW({r})*COLUMN({r}))'
+            f'&"|"&SUM({r})&"|"&COUNTA({r})')
+
+
+def cell_changes(old_rows, new_rows, start_row=1, start_col=1):
+    """
+    So sánh hai bảng và trả về các ô khác nhau
+
+    Returns:
+        List CellChange theo thứ tự dòng rồi cột
+    """
+    changes = []
+    for (r, c), new in sorted(diff_rows(old_rows, new_rows).items()):
+        old = old_rows[r][c] if r < len(old_rows) and c < len(old_rows[r]) else ''
+        changes.append(CellChange(start_row + r, start_col + c, old, new))
+    return changes
+
+
+class Watch:
+    """
+    Một phạm vi đang được theo dõi (trả về bởi service.watch)
+
+    Chu kỳ poll giảm một nửa mỗi lần thấy thay đổi (không nhỏ hơn
+    min_interval) và tăng dần 1.5 lần mỗi lần không có gì mới (không lớn hơn
+    max_interval).
+    """
+
+    def __init__(self, watcher, rng, callback, min_interval, max_interval, on_error):
+        self.watcher = watcher
+        self.range = rng
+        self.callback = callback
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.on_error = on_error
+        self.interval = min_interval
+        self.next_poll = time.monotonic()
+        self.polls = 0
+        self.changes_seen = 0
+        self.last_error = None
+        self.active = True
+
+    @property
+    def service(self):
+        return self.watcher.service
+
+    def stop(self):
+        """Ngừng theo dõi phạm vi này"""
+        self.watcher.remove(self)
+
+    def start(self):
+        """Đọc trạng thái ban đầu (gọi một lần trước lần poll đầu tiên)"""
+
+    def release(self):
+        """Dọn tài nguyên khi ngừng theo dõi"""
+
+    def poll(self):
+        """Kiểm tra thay đổi, trả về list CellChange"""
+        raise NotImplementedError
+
+    def run_once(self):
+        """Poll một lần, gọi callback nếu có thay đổi và tính thời điểm poll tiếp theo"""
+        try:
+            changes = self.poll()
+            self.polls += 1
+            if changes:
+                self.changes_seen += len(changes)
+                self.interval = max(self.min_interval, self.interval / 2)
+                self.callback(changes)
+            else:
+                self.interval = min(self.max_interval, self.interval * 1.5)
+        except Exception as error:
+            # Lỗi tạm thời (mất mạng, quota...) hoặc lỗi trong callback: chờ lâu rồi thử lại
+            self.last_error = error
+            self.interval = self.max_interval
+            if self.on_error is not None:
+                self.on_error(error)
+        self.next_poll = time.monotonic() + self.interval
+
+
+class TailWatch(Watch):
+    """
+    Theo dõi sheet chỉ thêm dòng (log do append_data tạo ra)
+
+    Chỉ nhớ số dòng cuối đã thấy và mỗi lần poll chỉ đọc các dòng sau đó,
+    nên request không lớn lên theo kích thước sheet.
+    """
+
+    def __init__(self, watcher, rng, callback, min_interval, max_interval, on_error,
+                 from_row=None):
+        super().__init__(watcher, rng, callback, min_interval, max_interval, on_error)
+        self.last_row = from_row
+
+    def start(self):
+        if self.last_row is not None:
+            return
+        # Tìm dòng cuối bằng cột đầu tiên của phạm vi, không đọc cả bảng
+        rng = self.range
+        column = A1Range(rng.sheet, rng.start_row, rng.start_col, rng.end_row, rng.start_col)
+        values = self.service.read_data(column.to_a1(), use_cache=False)
+        self.last_row = rng.start_row - 1 + len(values)
+
+    def poll(self):
+        rng = self.range
+        if rng.end_row is not None and self.last_row >= rng.end_row:
+            return []
+        tail = rng._replace(start_row=self.last_row + 1)
+        try:
+            result = self.service._execute(self.service.service.spreadsheets().values().get(
+                spreadsheetId=self.service.spreadsheet_id,
+                range=tail.to_a1()
+            ), 'read', http=self.watcher.http())
+        except HttpError as error:
+            if error.resp.status == 400:
+                # Dòng bắt đầu đã vượt lưới của sheet: chưa có dòng mới
+                return []
+            raise
+
+        rows = result.get('values', [])
+        if not rows:
+            return []
+        changes = cell_changes([], rows, tail.start_row, tail.start_col)
+        self.last_row += len(rows)
+        if self.service.cache is not None:
+            self.service.cache.invalidate(self.service.spreadsheet_id,
+                                          tail._replace(end_row=self.last_row))
+        return changes
+
+
+class BlockWatch(Watch):
+    """
+    Theo dõi một phạm vi bất kỳ bằng fingerprint của từng khối dòng
+
+    Mỗi khối có một ô công thức trên dòng của Watch này ở sheet ẩn
+    FINGERPRINT_SHEET; mỗi lần poll chỉ đọc dòng fingerprint (vài chục byte)
+    và chỉ tải lại các khối có fingerprint đổi. Cứ full_refresh_every lần poll
+    thì tải lại mọi khối.
+    """
+
+    def __init__(self, watcher, rng, callback, min_interval, max_interval, on_error,
+                 block_rows=500, full_refresh_every=30):
+        super().__init__(watcher, rng, callback, min_interval, max_interval, on_error)
+        self.block_rows = block_rows
+        self.full_refresh_every = full_refresh_every
+        self.blocks = [
+            rng._replace(start_row=row, end_row=min(row + block_rows - 1, rng.end_row))
+            for row in range(rng.start_row, rng.end_row + 1, block_rows)
+        ]
+        self.fingerprints = []
+        self.values = []
+        # Nhãn riêng của Watch này (cột A) và dòng của nó trên FINGERPRINT_SHEET
+        self.label = f'{rng.to_a1()}#{uuid.uuid4().hex[:12]}'
+        self.row = None
+
+    @property
+    def fingerprint_range(self):
+        last = index_to_column(len(self.blocks) + 1)
+        return f"{FINGERPRINT_SHEET}!B{self.row}:{last}{self.row}"
+
+    def start(self):
+        self.row = self.watcher.claim_row(
+            [self.label] + [_fingerprint_formula(block) for block in self.blocks]
+        )
+        # Đọc fingerprint trước dữ liệu: thay đổi xen giữa sẽ được thấy ở lần poll sau
+        self.fingerprints = self._read_fingerprints()
+        self.values = self.watcher.batch_get([block.to_a1() for block in self.blocks])
+
+    def release(self):
+        if self.row is not None:
+            row, self.row = self.row, None
+            last = index_to_column(len(self.blocks) + 1)
+            self.watcher.release_row(row, self.label, f"{FINGERPRINT_SHEET}!A{row}:{last}{row}")
+
+    def _read_fingerprints(self):
+        values = self.watcher.batch_get([self.fingerprint_range])[0]
+        row = values[0] if values else []
+        return list(row) + [''] * (len(self.blocks) - len(row))
+
+    def poll(self):
+        fingerprints = self._read_fingerprints()
+        if self.full_refresh_every and (self.polls + 1) % self.full_refresh_every == 0:
+            changed = list(range(len(self.blocks)))
+        else:
+            changed = [i for i, (old, new) in enumerate(zip(self.fingerprints, fingerprints))
+                       if old != new]
+        self.fingerprints = fingerprints
+        if not changed:
+            return []
+
+        fresh = self.watcher.batch_get([self.blocks[i].to_a1() for i in changed])
+        changes = []
+        for index, values in zip(changed, fresh):
+            block = self.blocks[index]
+            block_changes = cell_changes(self.values[index], values, block.start_row, block.start_col)
+            self.values[index] = values
+            if block_changes:
+                changes.extend(block_changes)
+                if self.service.cache is not None:
+                    self.service.cache.invalidate(self.service.spreadsheet_id, block)
+        return changes
+
+
+class Watcher:
+    """
+    Thread nền poll mọi Watch của một service, lần lượt theo thời điểm đến hạn
+
+    Callback được gọi trong thread này; ứng dụng GUI nên chuyển kết quả về
+    main loop (ví dụ TaskScheduler.call_in_main).
+    """
+
+    def __init__(self, service):
+        self.service = service
+        self._watches = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._http = None
+        self._thread = threading.Thread(target=self._run, name='sheets-watch', daemon=True)
+        self._thread.start()
+
+    def http(self):
+        """Kết nối HTTP riêng của thread poll (httplib2.Http không thread-safe); None ở thread khác"""
+        if threading.current_thread() is not self._thread or self.service.manager is not None:
+            return None
+        if self._http is None:
+            creds = self.service.creds
+            self._http = AuthorizedHttp(creds, http=build_http()) if creds else build_http()
+        return self._http
+
+    def add(self, range_name, callback, tail=False, min_interval=2.0, max_interval=60.0,
+            on_error=None, **options):
+        """Tạo và bắt đầu một Watch (xem GoogleSheetsService.watch)"""
+        rng = parse_range(range_name)
+        if rng is None or rng.sheet is None:
+            raise ValueError(f"Range không hợp lệ cho watch: '{range_name}'. Cần dạng 'Sheet1!A1:E'")
+
+        if tail:
+            watch = TailWatch(self, rng, callback, min_interval, max_interval, on_error, **options)
+        else:
+            # Phạm vi mở được giới hạn theo lưới hiện tại của sheet
+            rng = self.service.get_metadata().clamp(rng)
+            if not rng.is_bounded:
+                raise ValueError(f"Không tìm thấy sheet '{rng.sheet}'")
+            watch = BlockWatch(self, rng, callback, min_interval, max_interval, on_error, **options)
+
+        try:
+            watch.start()
+        except Exception:
+            watch.release()
+            raise
+        with self._lock:
+            self._watches.append(watch)
+        self._wakeup.set()
+        return watch
+
+    def remove(self, watch):
+        with self._lock:
+            if watch not in self._watches:
+                return
+            self._watches.remove(watch)
+            watch.active = False
+        watch.release()
+
+    @property
+    def watches(self):
+        with self._lock:
+            return list(self._watches)
+
+    def close(self):
+        """Dừng thread poll và ngừng mọi Watch"""
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        for watch in self.watches:
+            self.remove(watch)
+
+    def claim_row(self, values):
+        """
+        Ghi một dòng (nhãn + công thức) vào FINGERPRINT_SHEET, trả về số dòng
+
+        Dòng được cấp bằng values().append: API tự chọn dòng trống sau bảng một
+        cách nguyên tử, nên nhiều process dùng chung spreadsheet không ghi đè
+        dòng của nhau. OVERWRITE (không phải INSERT_ROWS) để không đẩy dòng
+        của các Watch khác xuống.
+        """
+        service = self.service
+        sheet = service.get_metadata().sheet(FINGERPRINT_SHEET)
+        if sheet is None:
+            sheet = service.get_metadata(refresh=True).sheet(FINGERPRINT_SHEET)
+        if sheet is None:
+            service.add_sheet(FINGERPRINT_SHEET, rows=100, cols=max(len(values), 10), hidden=True)
+        elif len(values) > sheet.column_count:
+            try:
+                service._execute(service.service.spreadsheets().batchUpdate(
+                    spreadsheetId=service.spreadsheet_id,
+                    body={'requests': [{'appendDimension': {
+                        'sheetId': sheet.sheet_id, 'dimension': 'COLUMNS',
+                        'length': len(values) - sheet.column_count
+                    }}]}
+                ), 'write', idempotent=False)
+            finally:
+                service.metadata_cache.invalidate(service.spreadsheet_id)
+
+        try:
+            result = service._execute(service.service.spreadsheets().values().append(
+                spreadsheetId=service.spreadsheet_id,
+                range=f'{FINGERPRINT_SHEET}!A1',
+                valueInputOption='USER_ENTERED',
+                insertDataOption='OVERWRITE',
+                body={'values': [values]}
+            ), 'write', idempotent=False)
+        finally:
+            # Lưới có thể đã được thêm dòng
+            service.metadata_cache.invalidate(service.spreadsheet_id)
+        updated = parse_range(result.get('updates', {}).get('updatedRange', ''))
+        if updated is None:
+            # Import muộn để tránh import vòng với google_sheets_service
+            from google_sheets_service import SheetsApiError
+            raise SheetsApiError(f"Không xác định được dòng đã ghi trên sheet '{FINGERPRINT_SHEET}'")
+        return updated.start_row
+
+    def release_row(self, row, label, range_name):
+        """Xóa dòng của một Watch nếu nhãn ở cột A vẫn là của Watch đó"""
+        values = self.batch_get([f'{FINGERPRINT_SHEET}!A{row}'])[0]
+        if values and values[0] and values[0][0] == label:
+            self.service.clear_data(range_name)
+
+    def batch_get(self, ranges):
+        """values().batchGet không qua cache, trả về list values theo thứ tự ranges"""
+        service = self.service
+        results = []
+        for group in service._split_ranges(ranges):
+            result = service._execute(service.service.spreadsheets().values().batchGet(
+                spreadsheetId=service.spreadsheet_id,
+                ranges=group
+            ), 'read', http=self.http())
+            results.extend(value_range.get('values', []) for value_range in result.get('valueRanges', []))
+        return results
+
+    def _run(self):
+        while not self._closed:
+            watches = self.watches
+            if not watches:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            watch = min(watches, key=lambda w: w.next_poll)
+            delay = watch.next_poll - time.monotonic()
+            if delay > 0:
+                # Thức dậy sớm khi có Watch mới hoặc khi đóng
+                if self._wakeup.wait(delay):
+                    self._wakeup.clear()
+                continue
+            if watch.active:
+                watch.run_once()
@@ -0,0 +1,182 @@
+"""
+Sheets Write Buffer - Gom nhiều lần ghi thành một values().batchUpdate
+"""
+
+import threading
+from concurrent.futures import Future
+
+from sheets_range import A1Range, merge_cells, parse_range
+
+
+def _count_cells(values):
+    return sum(len(row) for row in values)
+
+
+class WriteBuffer:
+    """
+    Bộ đệm ghi: giữ các lần ghi đang chờ và gửi chúng trong một request
+
+    Bộ đệm được flush khi số ô đang chờ vượt max_cells, khi lần ghi đầu tiên
+    đã chờ quá max_delay giây, hoặc khi gọi flush(). Các lần ghi một ô liền
+    kề được gộp thành phạm vi hình chữ nhật. Mỗi lần ghi nhận một Future
+    trả về updatedCells của phạm vi tương ứng trong response (giống kết quả
+    của write_data khi không có bộ đệm).
+    """
+
+    def __init__(self, send_batch, max_cells=1000, max_delay=1.0):
+        """
+        Args:
+            send_batch: Hàm nhận list {'range', 'values'}, gửi một batchUpdate và trả
+                về response của API ('responses', 'totalUpdatedCells')
+            max_cells: Số ô đang chờ tối đa trước khi tự động flush
+            max_delay: Thời gian chờ tối đa (giây) trước khi tự động flush
+        """
+        self.send_batch = send_batch
+        self.max_cells = max_cells
+        self.max_delay = max_delay
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer = None
+        self._reset()
+
+    def _reset(self):
+        # Ô đơn lẻ theo sheet: {sheet: {(row, col): value}}
+        self._cells = {}
+        # Future của các lần ghi từng ô: {sheet: {(row, col): [Future]}}
+        self._cell_futures = {}
+        # Các lần ghi nhiều ô, giữ nguyên thứ tự: [(A1Range, range_name, values, Future, số ô)]
+        self._ranges = []
+        self._futures = []
+        self._pending_cells = 0
+
+    @property
+    def pending(self):
+        """Số lần ghi đang chờ gửi"""
+        return len(self._futures)
+
+    def submit(self, range_name, values):
+        """
+        Đưa một lần ghi vào bộ đệm
+
+        Returns:
+            Future trả về số cells đã cập nhật của lần ghi này
+        """
+        future = Future()
+        count = _count_cells(values)
+        rng = parse_range(range_name)
+
+        if rng is None or rng.sheet is None:
+            # Không xác định được vị trí ghi: gửi các lần ghi trước rồi ghi riêng
+            self._flush_quietly()
+            try:
+                self._send([{'range': range_name, 'values': values}], [[(future, count)]])
+            except Exception:
+                pass
+            return future
+
+        target = rng.with_shape(len(values), max((len(row) for row in values), default=1))
+        single = target.row_count == 1 and target.col_count == 1 and count == 1
+
+        if self._conflicts(target, single):
+            # Giữ đúng thứ tự ghi khi các phạm vi chồng lên nhau
+            self._flush_quietly()
+
+        with self._lock:
+            if single:
+                cell = (target.start_row, target.start_col)
+                self._cells.setdefault(target.sheet, {})[cell] = values[0][0]
+                self._cell_futures.setdefault(target.sheet, {}).setdefault(cell, []).append(future)
+            else:
+                self._ranges.append((target, range_name, values, future, count))
+            self._futures.append(future)
+            self._pending_cells += count
+
+            should_flush = self._pending_cells >= self.max_cells
+            if not should_flush and self._timer is None and self.max_delay is not None:
+                self._timer = threading.Timer(self.max_delay, self._flush_quietly)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if should_flush:
+            self._flush_quietly()
+        return future
+
+    def _conflicts(self, target, single):
+        """Kiểm tra lần ghi mới có chồng lên lần ghi đang chờ (trừ ô đơn ghi đè ô đơn)"""
+        with self._lock:
+            for pending, *_ in self._ranges:
+                if pending.overlaps(target):
+                    return True
+            if single:
+                return False
+            for (row, col) in self._cells.get(target.sheet, {}):
+                if target.overlaps(A1Range(target.sheet, row, col, row, col)):
+                    return True
+            return False
+
+    def flush(self):
+        """
+        Gửi tất cả các lần ghi đang chờ trong một batchUpdate
+
+        Returns:
+            Tổng số cells đã cập nhật
+        """
+        with self._flush_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._futures:
+                    return 0
+                cells, cell_futures, ranges = self._cells, self._cell_futures, self._ranges
+                self._reset()
+
+            # groups[i]: các (Future, số ô) nhận kết quả từ phạm vi data[i]
+            data, groups = [], []
+            for _, range_name, values, future, count in ranges:
+                data.append({'range': range_name, 'values': values})
+                groups.append([(future, count)])
+            for sheet, sheet_cells in cells.items():
+                futures = cell_futures[sheet]
+                for start_row, start_col, values in merge_cells(sheet_cells):
+                    rng = A1Range(sheet, start_row, start_col, None, None)
+                    rng = rng.with_shape(len(values), len(values[0]))
+                    data.append({'range': rng.to_a1(), 'values': values})
+                    groups.append([
+                        (future, 1)
+                        for row in range(rng.start_row, rng.end_row + 1)
+                        for col in range(rng.start_col, rng.end_col + 1)
+                        for future in futures.get((row, col), [])
+                    ])
+
+            return self._send(data, groups)
+
+    def _flush_quietly(self):
+        # Lỗi đã được gắn vào Future của từng lần ghi, không ném ra ở luồng gọi
+        try:
+            self.flush()
+        except Exception:
+            pass
+
+    def _send(self, data, groups):
+        try:
+            result = self.send_batch(data)
+        except Exception as error:
+            for group in groups:
+                for future, _ in group:
+                    future.set_exception(error)
+            raise
+
+        responses = result.get('responses', [])
+        for index, (item, group) in enumerate(zip(data, groups)):
+            updated = responses[index].get('updatedCells', 0) if index < len(responses) else 0
+            size = _count_cells(item['values'])
+            for future, count in group:
+                # Phạm vi gộp từ nhiều lần ghi từng ô: chia updatedCells theo số ô
+                future.set_result(updated * count // size if size else 0)
+        return result.get('totalUpdatedCells', 0)
+
+    def close(self):
+        """Flush phần còn lại và dừng bộ đếm thời gian"""
+        self.flush()
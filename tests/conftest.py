@@ -0,0 +1,61 @@
+"""
+Fixture dùng chung: server Sheets giả lập (benchmarks/fake_sheets_server.py) và service trỏ tới nó
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+# Request tới server giả lập không được đi qua proxy của môi trường
+os.environ.setdefault('NO_PROXY', '127.0.0.1')
+
+from fake_sheets_server import FakeSheetsServer  # noqa: E402
+
+SPREADSHEET_ID = 'test'
+
+
+@pytest.fixture
+def server():
+    """Server giả lập với Sheet1 (100 dòng x 5 cột, 3 dòng dữ liệu mẫu)"""
+    with FakeSheetsServer() as server:
+        server.create_spreadsheet(SPREADSHEET_ID, {'Sheet1': {'rows': 100, 'cols': 5, 'fill_rows': 3}})
+        yield server
+
+
+@pytest.fixture
+def make_service(server):
+    """Tạo GoogleSheetsService trỏ tới server giả lập (không giới hạn tốc độ, retry nhanh)"""
+    from google.oauth2.credentials import Credentials
+
+    from google_sheets_service import GoogleSheetsService, build_sheets_resource
+    from sheets_quota import QuotaLimiter, RetryPolicy
+
+    services = []
+
+    def make(cache=False):
+        creds = Credentials(token='test')
+        service = GoogleSheetsService(SPREADSHEET_ID)
+        service.api_endpoint = server.url
+        service.creds = creds
+        service.service = build_sheets_resource(creds, server.url)
+        if not cache:
+            service.cache = None
+        service.limiter = QuotaLimiter(read_per_minute=10 ** 9, write_per_minute=10 ** 9)
+        service.retry_policy = RetryPolicy(max_retries=3, base_delay=0.01, max_delay=0.05)
+        services.append(service)
+        return service
+
+    yield make
+    for service in services:
+        service.disable_journal()
+        service.disable_write_buffer()
+
+
+@pytest.fixture
+def service(make_service):
+    return make_service()
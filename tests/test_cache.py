@@ -0,0 +1,58 @@
+"""
+Cache đọc: đọc lại không gửi request, ghi/xóa/thêm cập nhật cache theo kết quả của API
+"""
+
+import pytest
+
+from conftest import SPREADSHEET_ID
+
+
+@pytest.fixture
+def cached(make_service):
+    return make_service(cache=True)
+
+
+def test_repeated_read_hits_cache(server, cached):
+    first = cached.read_data('Sheet1!A1:B3')
+    requests = server.stats['requests']
+    assert cached.read_data('Sheet1!A1:B3') == first
+    # Phạm vi nằm trong phạm vi đã cache cũng không cần request
+    assert cached.read_data('Sheet1!A2:B2') == [first[1]]
+    assert server.stats['requests'] == requests
+
+
+def test_use_cache_false_reads_from_api(server, cached):
+    cached.read_data('Sheet1!A1:B3')
+    requests = server.stats['requests']
+    cached.read_data('Sheet1!A1:B3', use_cache=False)
+    assert server.stats['requests'] == requests + 1
+
+
+def test_write_patches_cache(server, cached):
+    cached.read_data('Sheet1!A1:B3')
+    cached.write_data('Sheet1!A2:B2', [['moi', '42']])
+    requests = server.stats['requests']
+    # Giá trị trong cache là giá trị API trả về sau khi ghi (updatedData)
+    assert cached.read_data('Sheet1!A2:B2') == [['moi', '42']]
+    assert server.stats['requests'] == requests
+    assert cached.read_data('Sheet1!A2:B2', use_cache=False) == [['moi', '42']]
+
+
+def test_clear_updates_cache(server, cached):
+    cached.read_data('Sheet1!A1:B3')
+    cached.clear_data('Sheet1!A3:B3')
+    assert cached.read_data('Sheet1!A1:B3')[2:] == []
+
+
+def test_append_invalidates_rows_below(server, cached):
+    cached.read_data('Sheet1!A1:B10')
+    cached.append_data('Sheet1!A1', [['them', 1]])
+    assert cached.read_data('Sheet1!A1:B10')[3] == ['them', '1']
+
+
+def test_write_from_other_client_is_seen_after_invalidate(server, cached, make_service):
+    cached.read_data('Sheet1!A1:B3')
+    make_service().write_data('Sheet1!A2:B2', [['khac', 'x']])
+    assert cached.read_data('Sheet1!A2:B2') != [['khac', 'x']]
+    cached.cache.invalidate(SPREADSHEET_ID)
+    assert cached.read_data('Sheet1!A2:B2') == [['khac', 'x']]
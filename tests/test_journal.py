@@ -0,0 +1,111 @@
+"""
+Journal ghi trước: gửi theo thứ tự, gửi lại sau khi mất kết nối, không thêm trùng khi khôi phục
+"""
+
+import pytest
+
+from conftest import SPREADSHEET_ID
+from sheets_journal import INFLIGHT, SheetsJournal
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / 'journal.db')
+
+
+def _ids(journal):
+    return [row[0] for row in journal._query('SELECT id FROM mutations ORDER BY id')]
+
+
+def test_mutations_are_sent_in_order(server, service, journal_path):
+    service.enable_journal(journal_path)
+    first = service.write_data('Sheet1!A10:B10', [['cũ', 1]])
+    appended = service.append_data('Sheet1!A1', [['thêm', 2]])
+    last = service.write_data('Sheet1!A10:B10', [['mới', 3]])
+    assert service.journal.wait_until_empty(5)
+    assert (first.result(), appended.result(), last.result()) == (2, 1, 2)
+    assert server.values(SPREADSHEET_ID, 'Sheet1!A10:B10') == [['mới', 3]]
+
+
+def test_other_operations_wait_for_the_journal(server, service, journal_path):
+    service.enable_journal(journal_path)
+    service.write_data('Sheet1!A20:B20', [['a', 'b']])
+    service.clear_data('Sheet1!A20:B20')
+    assert server.values(SPREADSHEET_ID, 'Sheet1!A20:B20') == []
+    service.write_data('Sheet1!A21:B21', [['c', 'd']])
+    assert service.read_data('Sheet1!A21:B21') == [['c', 'd']]
+
+
+def test_consecutive_appends_are_batched(server, service, journal_path):
+    journal = SheetsJournal(service, journal_path, start=False)
+    futures = [journal.append('Sheet1!A1', [[f'r{i}', i]]) for i in range(5)]
+    journal.flush()
+    assert server.stats['values.append'] == 1
+    assert [future.result() for future in futures] == [1] * 5
+    journal.close()
+
+
+def test_pending_mutations_survive_restart(server, service, journal_path):
+    journal = SheetsJournal(service, journal_path, start=False)
+    journal.append('Sheet1!A1', [['sau khởi động lại', 1]])
+    journal.close()
+
+    journal = SheetsJournal(service, journal_path, start=False)
+    assert journal.pending == 1
+    journal.flush()
+    assert server.values(SPREADSHEET_ID, 'Sheet1!A4:A4') == [['sau khởi động lại']]
+    journal.close()
+
+
+def test_transient_errors_keep_mutations(server, service, journal_path):
+    journal = SheetsJournal(service, journal_path, start=False)
+    journal.write('Sheet1!A30:B30', [['x', 'y']])
+    server.reject_rate = 1.0
+    with pytest.raises(Exception):
+        journal.drain_once()
+    assert journal.pending == 1
+    server.reject_rate = 0.0
+    journal.flush()
+    assert server.values(SPREADSHEET_ID, 'Sheet1!A30:B30') == [['x', 'y']]
+    journal.close()
+
+
+def test_rejected_mutation_is_isolated(server, service, journal_path):
+    journal = SheetsJournal(service, journal_path, start=False)
+    good = journal.write('Sheet1!A40:B40', [['ok', 1]])
+    bad = journal.write('Sheet1!F1', [['ngoài lưới']])
+    journal.flush()
+    assert good.result() == 2
+    assert bad.exception() is not None
+    assert [entry['range'] for entry in journal.failed_entries()] == ['Sheet1!F1']
+    assert journal.discard_failed() == 1
+    journal.close()
+
+
+def test_interrupted_append_is_not_sent_twice(server, service, journal_path):
+    journal = SheetsJournal(service, journal_path, start=False)
+    journal.append('Sheet1!A1', [['một lần', 1]])
+    journal.flush()
+
+    # Lần gửi trước đã tới API nhưng process dừng trước khi nhận response
+    journal.append('Sheet1!A1', [['dở dang', 2]])
+    journal._mark(_ids(journal), INFLIGHT)
+    service._send_append('Sheet1!A1', [['dở dang', 2]])
+    journal.flush()
+
+    assert [row[0] for row in server.values(SPREADSHEET_ID, 'Sheet1!A4:A10')] == ['một lần', 'dở dang']
+    journal.close()
+
+
+def test_identical_append_is_not_dropped(server, service, journal_path):
+    journal = SheetsJournal(service, journal_path, start=False)
+    journal.append('Sheet1!A1', [['giống', 1]])
+    journal.flush()
+
+    # Lần append giống hệt dòng trước, bị ngắt trước khi tới API: phải được gửi
+    journal.append('Sheet1!A1', [['giống', 1]])
+    journal._mark(_ids(journal), INFLIGHT)
+    journal.flush()
+
+    assert [row[0] for row in server.values(SPREADSHEET_ID, 'Sheet1!A4:A10')] == ['giống', 'giống']
+    journal.close()
@@ -0,0 +1,91 @@
+"""
+Thử lại khi bị 429 và khi request quá thời gian chờ
+"""
+
+import asyncio
+
+import httplib2
+import pytest
+from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.errors import HttpError
+
+from async_google_sheets_service import AsyncGoogleSheetsService
+from conftest import SPREADSHEET_ID
+from google_sheets_service import SheetsApiError
+from sheets_quota import RetryPolicy
+
+
+def _short_timeout_http(service, timeout=0.2):
+    return AuthorizedHttp(service.creds, http=httplib2.Http(timeout=timeout))
+
+
+def test_read_retries_after_429(server, service):
+    server.reject_rate = 0.5
+    for _ in range(5):
+        assert service.read_data('Sheet1!A1:B1')[0] == ['Cột 1', 'Cột 2']
+    stats = service.get_quota_stats()
+    assert server.stats['rejected'] > 0
+    assert stats['rate_limited'] == server.stats['rejected']
+    assert stats['retried'] == stats['rate_limited']
+
+
+def test_429_is_raised_after_max_retries(server, service):
+    server.reject_rate = 1.0
+    with pytest.raises(SheetsApiError) as info:
+        service.read_data('Sheet1!A1:B1')
+    assert info.value.status == 429
+    assert service.get_quota_stats()['retried'] == service.retry_policy.max_retries
+
+
+def test_append_is_retried_only_when_rejected(server, service):
+    server.reject_rate = 0.5
+    for i in range(4):
+        assert service.append_data('Sheet1!A1', [[f'x{i}', i]]) == 1
+    # 429 nghĩa là chưa được thực hiện: thử lại không làm thêm trùng dòng
+    assert [row[0] for row in server.values(SPREADSHEET_ID, 'Sheet1!A4:A7')] == ['x0', 'x1', 'x2', 'x3']
+
+
+def test_timeout_is_retried_for_reads(server, service):
+    server.latency = 0.5
+    request = service.service.spreadsheets().values().get(spreadsheetId=SPREADSHEET_ID, range='Sheet1!A1')
+    with pytest.raises(TimeoutError):
+        service._execute(request, 'read', http=_short_timeout_http(service))
+    stats = service.get_quota_stats()
+    assert stats['retried'] == service.retry_policy.max_retries
+    assert stats['failed'] == 1
+
+
+def test_timeout_is_not_retried_for_appends(server, service):
+    server.latency = 0.5
+    request = service.service.spreadsheets().values().append(
+        spreadsheetId=SPREADSHEET_ID, range='Sheet1!A1', valueInputOption='RAW',
+        body={'values': [['y']]}
+    )
+    with pytest.raises(TimeoutError):
+        service._execute(request, 'write', http=_short_timeout_http(service), idempotent=False)
+    assert service.get_quota_stats()['retried'] == 0
+
+
+def test_client_error_is_not_retried(service):
+    with pytest.raises(SheetsApiError) as info:
+        service.read_data('Sheet1!A1:Z1000')
+    assert isinstance(info.value.__context__, HttpError)
+    assert info.value.status == 400
+    assert service.get_quota_stats()['retried'] == 0
+
+
+def test_async_timeout_is_retried(server):
+    server.latency = 0.5
+
+    async def run():
+        async with AsyncGoogleSheetsService(SPREADSHEET_ID, creds=Credentials(token='test'),
+                                            api_endpoint=server.url, timeout=0.2) as sheets:
+            sheets.retry_policy = RetryPolicy(max_retries=2, base_delay=0.01, max_delay=0.05)
+            with pytest.raises(SheetsApiError):
+                await sheets.read_data('Sheet1!A1:B1')
+            return sheets.get_quota_stats()
+
+    stats = asyncio.run(run())
+    assert stats['retried'] == 2
+    assert stats['failed'] == 1
@@ -0,0 +1,49 @@
+"""
+Bộ đệm ghi: gom write_data thành một batchUpdate, gửi trước khi đọc và sau max_delay
+"""
+
+import pytest
+
+from conftest import SPREADSHEET_ID
+from google_sheets_service import SheetsApiError
+
+
+def test_writes_are_coalesced_into_one_batch(server, service):
+    service.enable_write_buffer(max_cells=1000, max_delay=60)
+    futures = [service.write_data(f'Sheet1!A{row}:B{row}', [[f'r{row}', row]]) for row in range(10, 15)]
+    assert server.stats['values.batchUpdate'] == 0
+
+    assert service.flush() == 10
+    assert server.stats['values.batchUpdate'] == 1
+    assert [future.result(1) for future in futures] == [2] * 5
+    assert server.values(SPREADSHEET_ID, 'Sheet1!A10:B14') == [[f'r{row}', row] for row in range(10, 15)]
+
+
+def test_buffer_is_flushed_when_full(server, service):
+    service.enable_write_buffer(max_cells=4, max_delay=60)
+    service.write_data('Sheet1!A10:B10', [['a', 'b']])
+    service.write_data('Sheet1!A11:B11', [['c', 'd']])
+    future = service.write_data('Sheet1!A12:B12', [['e', 'f']])
+    assert server.stats['values.batchUpdate'] == 1
+    assert not future.done()
+
+
+def test_read_sees_buffered_writes(server, service):
+    service.enable_write_buffer(max_delay=60)
+    service.write_data('Sheet1!A20:B20', [['x', 'y']])
+    assert service.read_data('Sheet1!A20:B20') == [['x', 'y']]
+
+
+def test_max_delay_flushes_from_timer_thread(server, service):
+    service.enable_write_buffer(max_delay=0.05)
+    future = service.write_data('Sheet1!A30:B30', [['t', '1']])
+    assert future.result(5) == 2
+    assert server.values(SPREADSHEET_ID, 'Sheet1!A30:B30') == [['t', 1]]
+
+
+def test_rejected_batch_fails_its_futures(server, service):
+    service.enable_write_buffer(max_delay=60)
+    future = service.write_data('Sheet1!F1', [['ngoài lưới']])
+    with pytest.raises(SheetsApiError):
+        service.flush()
+    assert isinstance(future.exception(1), SheetsApiError)